@@ -0,0 +1,144 @@
+"""Backpressure between the raw OpenFlow input and the msg_in buffer."""
+from collections import Counter
+
+from napps.kytos.of_core import settings
+from napps.kytos.of_core.msg_prios import of_msg_prio
+from pyof.v0x04.common.header import Type
+
+
+class MsgInBackpressure:
+    """Track whether the consumption of raw OpenFlow data is paused.
+
+    Consumption is paused once the msg_in buffer reaches the high watermark
+    and it's only resumed after the buffer drains down to the low watermark.
+    While msg_in is above its watermark, only the connections with at least
+    the connection high watermark of events in msg_in are paused, until
+    their events drain down to the connection low watermark. While a
+    connection is paused its raw data keeps being buffered in its framer,
+    and the lowest priority types that can be shed are dropped once the
+    framer goes above ``settings.CONN_PAUSED_HIGH_BYTES``.
+
+    The events of a connection in msg_in are estimated from the ones it put,
+    scaled down along with the msg_in size as they're consumed.
+    """
+
+    def __init__(self, high_watermark=None, low_watermark=None,
+                 shed_types=None, conn_high_watermark=None,
+                 conn_low_watermark=None):
+        """Initialize the watermarks and the counters.
+
+        Args:
+            high_watermark (int): msg_in size that pauses consumption.
+                Defaults to ``settings.MSG_IN_HIGH_WATERMARK``, 0 disables it.
+            low_watermark (int): msg_in size that resumes consumption.
+                Defaults to ``settings.MSG_IN_LOW_WATERMARK``.
+            shed_types (list): Names of the OpenFlow types that can be shed.
+                Defaults to ``settings.MSG_IN_SHED_TYPES``.
+            conn_high_watermark (int): Events of a connection in msg_in that
+                pause it while consumption is paused. Defaults to
+                ``settings.MSG_IN_CONN_HIGH_WATERMARK``, 0 pauses every
+                connection.
+            conn_low_watermark (int): Events of a paused connection in
+                msg_in that resume it. Defaults to
+                ``settings.MSG_IN_CONN_LOW_WATERMARK``.
+        """
+        if high_watermark is None:
+            high_watermark = settings.MSG_IN_HIGH_WATERMARK
+        if low_watermark is None:
+            low_watermark = settings.MSG_IN_LOW_WATERMARK
+        if shed_types is None:
+            shed_types = settings.MSG_IN_SHED_TYPES
+        if conn_high_watermark is None:
+            conn_high_watermark = settings.MSG_IN_CONN_HIGH_WATERMARK
+        if conn_low_watermark is None:
+            conn_low_watermark = settings.MSG_IN_CONN_LOW_WATERMARK
+        self.high_watermark = high_watermark
+        self.low_watermark = low_watermark
+        self.conn_high_watermark = conn_high_watermark
+        self.conn_low_watermark = conn_low_watermark
+        # Lowest priority first, so they're the first ones to be shed
+        self.shed_types = sorted((Type[name].value for name in shed_types),
+                                 key=of_msg_prio, reverse=True)
+        self.is_paused = False
+        self.paused_connections = set()
+        self.pauses = 0
+        self.shed = Counter()
+        # Estimated events of each connection in msg_in
+        self.queued = Counter()
+        self._queued_total = 0
+
+    def check(self, msg_in_size, connection_id=None):
+        """Update and return whether consumption is paused.
+
+        If a connection id is given, return whether that connection in
+        particular is paused.
+        """
+        self._drain(msg_in_size)
+        if not self.high_watermark:
+            self.is_paused = False
+        elif not self.is_paused and msg_in_size >= self.high_watermark:
+            self.is_paused = True
+        elif self.is_paused and msg_in_size <= self.low_watermark:
+            self.is_paused = False
+        if (
+            connection_id is None
+            or not self.is_paused
+            or not self.conn_high_watermark
+        ):
+            return self.is_paused
+        queued = self.queued.get(connection_id, 0)
+        if connection_id in self.paused_connections:
+            return queued > self.conn_low_watermark
+        return queued >= self.conn_high_watermark
+
+    def count_in(self, connection_id, count):
+        """Count events of a connection put in msg_in."""
+        self.queued[connection_id] += count
+        self._queued_total += count
+
+    def discard(self, connection_id):
+        """Forget the events in msg_in of a closed connection."""
+        self._queued_total -= self.queued.pop(connection_id, 0)
+
+    def _drain(self, msg_in_size):
+        """Scale the events of each connection down to the msg_in size.
+
+        The events consumed since the last check aren't known by
+        connection, so every connection is assumed to have been drained in
+        proportion to its events.
+        """
+        if self._queued_total <= msg_in_size:
+            return
+        ratio = msg_in_size / self._queued_total
+        self.queued = Counter({connection_id: queued * ratio
+                               for connection_id, queued
+                               in self.queued.items()
+                               if queued * ratio >= 1})
+        self._queued_total = sum(self.queued.values())
+
+    def pause(self, connection_id):
+        """Count a connection being paused."""
+        self.paused_connections.add(connection_id)
+        self.pauses += 1
+
+    def resume(self, connection_id):
+        """Count a connection being resumed."""
+        self.paused_connections.discard(connection_id)
+
+    def count_shed(self, shed):
+        """Count shed frames given by type value."""
+        for message_type, count in shed.items():
+            self.shed[Type(message_type).name.lower()] += count
+
+    def as_dict(self):
+        """Return the backpressure state and counters as a dict."""
+        return {
+            'is_paused': self.is_paused,
+            'high_watermark': self.high_watermark,
+            'low_watermark': self.low_watermark,
+            'conn_high_watermark': self.conn_high_watermark,
+            'conn_low_watermark': self.conn_low_watermark,
+            'paused_connections': len(self.paused_connections),
+            'pauses': self.pauses,
+            'shed': dict(self.shed),
+        }
@@ -0,0 +1,143 @@
+"""Per connection state used to consume the raw OpenFlow input."""
+import asyncio
+
+from napps.kytos.of_core import settings
+from napps.kytos.of_core.utils import OFFramer
+
+from kytos.core import log
+
+
+class ConnectionContext:
+    """State of an OpenFlow connection, kept while the connection is open.
+
+    The raw data of the connection is put in ``queue`` and a single task
+    consumes it in order, so there's no need to lock the framer. Once the
+    connection is established, another task polls the stats of its switch.
+    """
+
+    def __init__(self, connection):
+        """Create the state of a connection.
+
+        Args:
+            connection: kytos.core.connection.Connection instance.
+        """
+        self.connection = connection
+        self.queue = asyncio.Queue()
+        self.framer = OFFramer()
+        self.task = None
+        self.stats_task = None
+        self.is_reading_paused = False
+
+    def start(self, consumer):
+        """Start the task consuming the raw data of the connection.
+
+        Args:
+            consumer: Coroutine function called with this context.
+        """
+        self.task = asyncio.create_task(
+            consumer(self), name=f"of_core.raw_in.{self.connection.id}")
+
+    def start_stats(self, poller):
+        """Start the task polling the stats of the switch of the connection.
+
+        Args:
+            poller: Coroutine function called with this context.
+        """
+        self.stats_task = asyncio.create_task(
+            poller(self), name=f"of_core.stats.{self.connection.id}")
+
+    def pause_reading(self):
+        """Stop reading from the transport of the connection."""
+        if not self.is_reading_paused:
+            self.connection.socket.pause_reading()
+            self.is_reading_paused = True
+
+    def resume_reading(self):
+        """Resume reading from the transport of the connection."""
+        if self.is_reading_paused:
+            self.is_reading_paused = False
+            if self.connection.is_alive():
+                self.connection.socket.resume_reading()
+
+    def stop(self):
+        """Cancel the consumer and stats tasks, if they're still running."""
+        for task in (self.task, self.stats_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+class ConnectionContexts:
+    """Registry of the contexts of the open connections by connection id.
+
+    A context is created when the first raw data (the hello) of a connection
+    arrives, and it's removed when the connection is lost or fails. Contexts
+    of connections that aren't alive anymore are also pruned whenever the
+    registry reaches ``settings.MAX_CONNECTION_CONTEXTS``. The tasks of a
+    context are cancelled when it's removed.
+    """
+
+    def __init__(self, consumer=None, max_size=None):
+        """Initialize an empty registry.
+
+        Args:
+            consumer: Coroutine function started as the task of each new
+                context. No task is started if it's None.
+            max_size (int): Size that triggers pruning. Defaults to
+                ``settings.MAX_CONNECTION_CONTEXTS``.
+        """
+        if max_size is None:
+            max_size = settings.MAX_CONNECTION_CONTEXTS
+        self.consumer = consumer
+        self.max_size = max_size
+        self._contexts = {}
+
+    def __len__(self):
+        return len(self._contexts)
+
+    def __contains__(self, connection_id):
+        return connection_id in self._contexts
+
+    def get(self, connection_id):
+        """Return the context of a connection id, or None."""
+        return self._contexts.get(connection_id)
+
+    def get_or_create(self, connection):
+        """Return the context of a connection, creating it if needed."""
+        context = self._contexts.get(connection.id)
+        if context is not None:
+            return context
+        if len(self._contexts) >= self.max_size:
+            pruned = self.prune()
+            log.warning(f"{len(self._contexts)} connection contexts after "
+                        f"pruning {pruned} of dead connections")
+        context = ConnectionContext(connection)
+        self._contexts[connection.id] = context
+        if self.consumer is not None:
+            context.start(self.consumer)
+        return context
+
+    def pop(self, connection_id):
+        """Remove and return the context of a connection id, or None."""
+        context = self._contexts.pop(connection_id, None)
+        if context is not None:
+            context.stop()
+        return context
+
+    def prune(self):
+        """Remove the contexts of connections that aren't alive anymore.
+
+        Returns:
+            int: Number of removed contexts.
+        """
+        dead = [connection_id for connection_id, context
+                in self._contexts.items()
+                if not context.connection.is_alive()]
+        for connection_id in dead:
+            self._contexts.pop(connection_id).stop()
+        return len(dead)
+
+    def clear(self):
+        """Remove every context."""
+        for context in self._contexts.values():
+            context.stop()
+        self._contexts.clear()
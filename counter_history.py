@@ -0,0 +1,246 @@
+"""History of the flow, port and table counters of a switch."""
+import heapq
+import time
+from array import array
+
+from napps.kytos.of_core import settings
+
+#: Counters kept by kind of stats
+COUNTER_COLUMNS = {
+    'flows': ('packet_count', 'byte_count'),
+    'ports': ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+              'rx_errors', 'tx_errors'),
+    'tables': ('lookup_count', 'matched_count'),
+}
+
+
+class CounterRing:
+    """Fixed-size columnar ring of the samples of the counters of a flow,
+    port or table.
+
+    The timestamps and each counter are kept in their own preallocated
+    ``array``, so a sample doesn't allocate any object.
+    """
+
+    def __init__(self, capacity, columns):
+        """Preallocate the columns.
+
+        Args:
+            capacity (int): Number of samples kept, the oldest sample is
+                overwritten once it's full.
+            columns (tuple): Names of the counters.
+        """
+        self.capacity = capacity
+        self.columns = columns
+        self.timestamps = array('d', bytes(8 * capacity))
+        self._values = {column: array('Q', bytes(8 * capacity))
+                        for column in columns}
+        self._next = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    @property
+    def last_timestamp(self):
+        """Return the timestamp of the newest sample, or None."""
+        if not self._len:
+            return None
+        return self.timestamps[self._next - 1]
+
+    def append(self, timestamp, values):
+        """Add a sample, overwriting the oldest one if it's full.
+
+        Args:
+            timestamp (float): Time of the sample, in seconds.
+            values (tuple): Counters, in the order of the columns.
+        """
+        index = self._next
+        self.timestamps[index] = timestamp
+        for column, value in zip(self.columns, values):
+            self._values[column][index] = value
+        self._next = (index + 1) % self.capacity
+        self._len = min(self._len + 1, self.capacity)
+
+    def samples(self, column, since=None):
+        """Return the ``(timestamp, value)`` samples of a counter, oldest
+        first.
+
+        Args:
+            column (str): Name of the counter.
+            since (float): Only samples taken at or after this time.
+        """
+        values = self._values[column]
+        start = self._next - self._len
+        samples = []
+        for offset in range(self._len):
+            index = (start + offset) % self.capacity
+            timestamp = self.timestamps[index]
+            if since is None or timestamp >= since:
+                samples.append((timestamp, values[index]))
+        return samples
+
+
+class CounterHistory:
+    """Rings of the counters of the flows, ports and tables of a switch.
+
+    Flows are kept by ``Flow.id``, ports by port number and tables by table
+    id. Rings that haven't got any sample for ``max_age`` seconds, such as
+    the ones of deleted flows, are dropped by ``expire``, once per dump of
+    the switch. Rates are per second, and the intervals in which a counter
+    went backwards are ignored.
+    """
+
+    def __init__(self, capacity=None, max_age=None):
+        """Initialize an empty history.
+
+        Args:
+            capacity (int): Samples kept per flow, port or table. Defaults
+                to ``settings.COUNTER_HISTORY_SIZE``.
+            max_age (float): Seconds without samples after which a ring is
+                dropped. Defaults to the capacity times
+                ``settings.STATS_INTERVAL``.
+        """
+        if capacity is None:
+            capacity = settings.COUNTER_HISTORY_SIZE
+        if max_age is None:
+            max_age = capacity * settings.STATS_INTERVAL
+        self.capacity = capacity
+        self.max_age = max_age
+        self._rings = {kind: {} for kind in COUNTER_COLUMNS}
+
+    def __len__(self):
+        return sum(len(rings) for rings in self._rings.values())
+
+    def keys(self, kind):
+        """Return the keys with samples of a kind of stats."""
+        return list(self._rings[kind])
+
+    def ring(self, kind, key):
+        """Return the ring of a flow, port or table, or None."""
+        return self._rings[kind].get(key)
+
+    def record(self, kind, samples, timestamp=None):
+        """Add a sample of each key.
+
+        Args:
+            kind (str): One of ``COUNTER_COLUMNS``.
+            samples (iterable): ``(key, values)`` pairs, with the values in
+                the order of the columns of the kind.
+            timestamp (float): Time of the samples. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        rings = self._rings[kind]
+        columns = COUNTER_COLUMNS[kind]
+        for key, values in samples:
+            ring = rings.get(key)
+            if ring is None:
+                ring = rings[key] = CounterRing(self.capacity, columns)
+            ring.append(timestamp, values)
+
+    def expire(self, kind, now=None):
+        """Drop the rings of a kind without samples for ``max_age`` seconds.
+
+        It scans every ring of the kind, so it's meant to be called once per
+        dump rather than once per recorded reply.
+
+        Args:
+            kind (str): One of ``COUNTER_COLUMNS``.
+            now (float): Current time. Defaults to now.
+        """
+        if now is None:
+            now = time.time()
+        rings = self._rings[kind]
+        expired = now - self.max_age
+        for key in [key for key, ring in rings.items()
+                    if ring.last_timestamp < expired]:
+            del rings[key]
+
+    def record_flows(self, flows, timestamp=None):
+        """Add the packet and byte counts of flows."""
+        self.record('flows', ((flow.id, (flow.stats.packet_count,
+                                         flow.stats.byte_count))
+                              for flow in flows), timestamp)
+
+    def record_ports(self, port_stats, timestamp=None):
+        """Add the counters of port stats records."""
+        self.record('ports', ((stats.port_no,
+                               tuple(getattr(stats, column) for column
+                                     in COUNTER_COLUMNS['ports']))
+                              for stats in port_stats), timestamp)
+
+    def record_tables(self, tables, timestamp=None):
+        """Add the lookup and matched counts of table stats."""
+        self.record('tables', ((table.table_id, (table.lookup_count,
+                                                 table.matched_count))
+                               for table in tables), timestamp)
+
+    def rates(self, kind, key, column, window=None, now=None):
+        """Return the rates of a counter between consecutive samples.
+
+        Args:
+            kind (str): One of ``COUNTER_COLUMNS``.
+            key: Flow id, port number or table id.
+            column (str): Name of the counter.
+            window (float): Only the samples of the last seconds, or all.
+            now (float): End of the window. Defaults to now.
+        """
+        samples = self._samples(kind, key, column, window, now)
+        rates = []
+        for (start, first), (end, last) in zip(samples, samples[1:]):
+            if end > start and last >= first:
+                rates.append((last - first) / (end - start))
+        return rates
+
+    def rate(self, kind, key, column, window=None, now=None):
+        """Return the rate of a counter over a window, or None.
+
+        None is returned if there are less than two samples in the window
+        or if the counter went backwards.
+        """
+        samples = self._samples(kind, key, column, window, now)
+        if len(samples) < 2:
+            return None
+        (start, first), (end, last) = samples[0], samples[-1]
+        if end <= start or last < first:
+            return None
+        return (last - first) / (end - start)
+
+    def percentile(self, kind, key, column, percent, window=None, now=None):
+        """Return a percentile of the rates of a counter, or None.
+
+        The nearest-rank method is used, e.g. 95 for the 95th percentile.
+        """
+        rates = sorted(self.rates(kind, key, column, window, now))
+        if not rates:
+            return None
+        rank = max(1, -(-percent * len(rates) // 100))
+        return rates[min(int(rank), len(rates)) - 1]
+
+    def top(self, kind, column, count, window=None, now=None):
+        """Return the ``(key, rate)`` pairs of the highest rates of a counter.
+
+        Args:
+            kind (str): One of ``COUNTER_COLUMNS``.
+            column (str): Name of the counter.
+            count (int): Maximum number of pairs.
+            window (float): Only the samples of the last seconds, or all.
+            now (float): End of the window. Defaults to now.
+        """
+        rates = ((key, self.rate(kind, key, column, window, now))
+                 for key in self.keys(kind))
+        return heapq.nlargest(count, ((key, rate) for key, rate in rates
+                                      if rate is not None),
+                              key=lambda pair: pair[1])
+
+    def _samples(self, kind, key, column, window, now):
+        ring = self._rings[kind].get(key)
+        if ring is None:
+            return []
+        since = None
+        if window is not None:
+            if now is None:
+                now = time.time()
+            since = now - window
+        return ring.samples(column, since)
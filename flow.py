@@ -5,13 +5,120 @@ Use common fields of FlowStats/FlowMod of supported OF versions. ``match`` and
 inherited in v0x04 modules.
 """
 import json
+import struct
 from abc import ABC, abstractmethod
-from hashlib import md5
+from hashlib import blake2b, md5
+from inspect import signature
 from ipaddress import AddressValueError, IPv4Network, IPv6Network
+from operator import itemgetter
 
 from napps.kytos.of_core import v0x04
 from pyof.v0x04.controller2switch.flow_mod import FlowModCommand
 
+#: Structs of the tagged values of Flow.as_binary, in network byte order
+_PACK_INT = struct.Struct('!cq').pack
+_PACK_LEN = struct.Struct('!cI').pack
+_PACK_FLOAT = struct.Struct('!cd').pack
+_PACK_HEADER = struct.Struct('!' + 'cq' * 5).pack
+_INT_MIN, _INT_MAX = -2 ** 63, 2 ** 63 - 1
+_PAIR = _PACK_LEN(b't', 2)
+#: Encoded heads of the (name, value) pairs by name, see _pack_name
+_PACKED_NAMES = {}
+_PACKED_NAMES_MAX = 1024
+
+
+def pack_value(value, append):
+    """Append the binary encoding of a flow attribute value.
+
+    Strings, such as MAC addresses, are lowercased, and the attributes of
+    objects, such as actions, and the items of dicts are sorted by name.
+    Each value is a one byte tag followed by its ``struct`` packing: a
+    signed 64 bits int, a length prefixed UTF-8 string or a count prefixed
+    sequence of values, the (name, value) pairs of objects being sequences
+    of two values. Ints that don't fit in 64 bits are packed as decimal
+    strings. The encoding doesn't depend on the Python version.
+    """
+    # pylint: disable=too-many-branches
+    cls = value.__class__
+    if cls is int and _INT_MIN <= value <= _INT_MAX:
+        append(_PACK_INT(b'i', value))
+    elif cls is str:
+        data = value.lower().encode()
+        append(_PACK_LEN(b's', len(data)))
+        append(data)
+    elif cls is list or cls is tuple:
+        append(_PACK_LEN(b't', len(value)))
+        for item in value:
+            if item.__class__ is int and _INT_MIN <= item <= _INT_MAX:
+                append(_PACK_INT(b'i', item))
+            else:
+                pack_value(item, append)
+    elif value is None:
+        append(b'n')
+    elif cls is bool:
+        append(b'T' if value else b'F')
+    elif isinstance(value, int):
+        value = int(value)
+        if _INT_MIN <= value <= _INT_MAX:
+            append(_PACK_INT(b'i', value))
+        else:
+            data = str(value).encode()
+            append(_PACK_LEN(b'l', len(data)))
+            append(data)
+    elif cls is float:
+        append(_PACK_FLOAT(b'f', value))
+    else:
+        if not isinstance(value, dict):
+            value = attributes(value)
+        append(_PACK_LEN(b't', len(value)))
+        for name, item in sorted(value.items(), key=itemgetter(0)):
+            append(_pack_name(name))
+            if item.__class__ is int and _INT_MIN <= item <= _INT_MAX:
+                append(_PACK_INT(b'i', item))
+            else:
+                pack_value(item, append)
+
+
+def _pack_name(name):
+    """Return the encoding of the head of a (name, value) pair.
+
+    The attribute names of the flows are few, so they're encoded once.
+    """
+    packed = _PACKED_NAMES.get(name)
+    if packed is None:
+        parts = [_PAIR]
+        pack_value(name, parts.append)
+        packed = b''.join(parts)
+        if name.__class__ is str and len(_PACKED_NAMES) < _PACKED_NAMES_MAX:
+            _PACKED_NAMES[name] = packed
+    return packed
+
+
+#: Slots of the classes read by attributes(), including the inherited ones
+_SLOTS = {}
+
+
+def attributes(obj):
+    """Return the attributes of an object as a dict, like ``vars``.
+
+    The slots of the classes that declare ``__slots__``, such as the actions
+    and the stats, are included, along with the ``__dict__`` of their
+    subclasses that don't.
+    """
+    cls = obj.__class__
+    slots = _SLOTS.get(cls)
+    if slots is None:
+        slots = _SLOTS[cls] = tuple(
+            name for klass in reversed(cls.__mro__)
+            for name in getattr(klass, '__slots__', ())
+            if name not in ('__dict__', '__weakref__'))
+    if not slots:
+        return vars(obj)
+    values = {name: getattr(obj, name) for name in slots
+              if hasattr(obj, name)}
+    values.update(getattr(obj, '__dict__', ()))
+    return values
+
 
 class FlowFactory(ABC):  # pylint: disable=too-few-public-methods
     """Choose the correct Flow according to OpenFlow version."""
@@ -46,6 +153,10 @@ class FlowBase(ABC):  # pylint: disable=too-many-instance-attributes
     This class represents a Flow installed or to be installed inside the
     switch. A flow, in this case is represented by a Match object and a set of
     actions that should occur in case any match happen.
+
+    ``id``, ``match_id`` and ``fingerprint`` are cached along with a flat
+    snapshot of the attributes they hash, see ``_hashed_state``, and only
+    recomputed once one of them is reassigned or mutated in place.
     """
 
     # of_version number: 0x04
@@ -84,6 +195,24 @@ class FlowBase(ABC):  # pylint: disable=too-many-instance-attributes
         self.cookie = cookie
         self.stats = stats or FlowStats()  # pylint: disable=E1102
 
+    def _hashed_state(self):
+        """Return a flat snapshot of the attributes hashed by ``id``.
+
+        It's compared to the snapshot taken when the cached ids were
+        computed, which is much cheaper than hashing the flow again.
+        """
+        state = [self.switch, self.table_id, self.priority,
+                 self.idle_timeout, self.hard_timeout, self.cookie]
+        state.extend(vars(self.match).items())
+        return state
+
+    def _cached(self, name, state):
+        """Return the cached value of an id if the flow didn't change."""
+        cache = self.__dict__.get(name)
+        if cache is not None and cache[0] == state:
+            return cache[1]
+        return None
+
     @property
     def id(self):  # pylint: disable=invalid-name
         """Return this flow unique identifier.
@@ -96,10 +225,62 @@ class FlowBase(ABC):  # pylint: disable=too-many-instance-attributes
             str: Flow unique identifier (md5sum).
 
         """
-        flow_str = self.as_json(sort_keys=True, include_id=False)
-        md5sum = md5()
-        md5sum.update(flow_str.encode('utf-8'))
-        return md5sum.hexdigest()
+        state = self._hashed_state()
+        flow_id = self._cached('_id_cache', state)
+        if flow_id is None:
+            flow_str = self.as_json(sort_keys=True, include_id=False)
+            md5sum = md5()
+            md5sum.update(flow_str.encode('utf-8'))
+            flow_id = md5sum.hexdigest()
+            self.__dict__['_id_cache'] = (state, flow_id)
+        return flow_id
+
+    @property
+    def fingerprint(self):
+        """Return a faster unique identifier of this flow.
+
+        It hashes ``as_binary`` with blake2b instead of the sorted JSON of
+        the flow with md5, so it differs from ``id`` although it identifies
+        the same attributes. ``flow_index.FlowIdMap`` maps it to ``id``.
+
+        Returns:
+            str: Flow fingerprint (128 bits blake2b hexdigest).
+
+        """
+        state = self._hashed_state()
+        fingerprint = self._cached('_fingerprint_cache', state)
+        if fingerprint is None:
+            fingerprint = blake2b(self.as_binary(),
+                                  digest_size=16).hexdigest()
+            self.__dict__['_fingerprint_cache'] = (state, fingerprint)
+        return fingerprint
+
+    def _pack_canonical(self, append):
+        """Append the binary encoding of the attributes hashed by
+        ``fingerprint``."""
+        pack_value(self.switch.id, append)
+        values = (self.table_id, self.priority, self.idle_timeout,
+                  self.hard_timeout, self.cookie)
+        try:
+            append(_PACK_HEADER(b'i', values[0], b'i', values[1], b'i',
+                                values[2], b'i', values[3], b'i', values[4]))
+        except struct.error:
+            for value in values:
+                pack_value(value, append)
+        self.match.pack_canonical(append)
+
+    def as_binary(self):
+        """Return the canonical binary encoding of the attributes hashed by
+        ``fingerprint``.
+
+        The canonical attributes, such as the priority, the table_id, the
+        cookie, the match fields as (OXM field, value) pairs and the
+        instructions, are packed with ``struct`` by ``pack_value``, so
+        the encoding is stable across Python versions.
+        """
+        parts = []
+        self._pack_canonical(parts.append)
+        return b''.join(parts)
 
     @property
     def match_id(self):
@@ -111,16 +292,21 @@ class FlowBase(ABC):  # pylint: disable=too-many-instance-attributes
             str: Flow unique match identifier (md5sum).
 
         """
-        flow_match_fields = {
-            'switch': self.switch.id,
-            'table_id': self.table_id,
-            'match': self.match.as_dict(),
-            'priority': self.priority,
-        }
-        flow_str = json.dumps(flow_match_fields, sort_keys=True)
-        md5sum = md5()
-        md5sum.update(flow_str.encode('utf-8'))
-        return md5sum.hexdigest()
+        state = self._hashed_state()
+        match_id = self._cached('_match_id_cache', state)
+        if match_id is None:
+            flow_match_fields = {
+                'switch': self.switch.id,
+                'table_id': self.table_id,
+                'match': self.match.as_dict(),
+                'priority': self.priority,
+            }
+            flow_str = json.dumps(flow_match_fields, sort_keys=True)
+            md5sum = md5()
+            md5sum.update(flow_str.encode('utf-8'))
+            match_id = md5sum.hexdigest()
+            self.__dict__['_match_id_cache'] = (state, match_id)
+        return match_id
 
     def as_dict(self, include_id=True):
         """Return the Flow as a serializable Python dictionary.
@@ -285,11 +471,17 @@ class InstructionFactoryBase(ABC):
 
 
 class ActionBase(ABC):
-    """Base class for a flow action."""
+    """Base class for a flow action.
+
+    Subclasses may declare ``__slots__`` to save the ``__dict__`` of each
+    action, ``attributes`` reads both.
+    """
+
+    __slots__ = ()
 
     def as_dict(self):
         """Return a dict that can be dumped as JSON."""
-        return vars(self)
+        return attributes(self)
 
     @classmethod
     def from_dict(cls, action_dict):
@@ -342,8 +534,17 @@ class ActionFactoryBase(ABC):
         return action_class.from_of_action(of_action) if action_class else None
 
 
-class MatchBase:  # pylint: disable=too-many-instance-attributes
-    """Base class with common high-level Match fields."""
+#: Codes of the match fields by Match class, see MatchBase._field_codes
+_FIELD_CODES = {}
+
+
+class MatchBase:
+    """Base class with common high-level Match fields.
+
+    Only the fields that are set are stored in the ``__dict__`` of a match,
+    the other fields read as None, so a match takes the memory of the few
+    fields it usually has instead of the memory of all of them.
+    """
 
     def __init__(self, in_port=None, dl_src=None, dl_dst=None, dl_vlan=None,
                  dl_vlan_pcp=None, dl_type=None, nw_proto=None, nw_src=None,
@@ -358,58 +559,74 @@ class MatchBase:  # pylint: disable=too-many-instance-attributes
                  metadata=None, tun_id=None):
         """Make it possible to set all attributes from the constructor."""
         # pylint: disable=too-many-arguments
-        # pylint: disable=too-many-locals
-        self.in_port = in_port
-        self.dl_src = dl_src
-        self.dl_dst = dl_dst
-        self.dl_vlan = dl_vlan
-        self.dl_vlan_pcp = dl_vlan_pcp
-        self.dl_type = dl_type
-        self.nw_proto = nw_proto
-        self.nw_src = nw_src
-        self.nw_dst = nw_dst
-        self.tp_src = tp_src
-        self.tp_dst = tp_dst
-        self.in_phy_port = in_phy_port
-        self.ip_dscp = ip_dscp
-        self.ip_ecn = ip_ecn
-        self.udp_src = udp_src
-        self.udp_dst = udp_dst
-        self.sctp_src = sctp_src
-        self.sctp_dst = sctp_dst
-        self.icmpv4_type = icmpv4_type
-        self.icmpv4_code = icmpv4_code
-        self.arp_op = arp_op
-        self.arp_spa = arp_spa
-        self.arp_tpa = arp_tpa
-        self.arp_sha = arp_sha
-        self.arp_tha = arp_tha
-        self.ipv6_src = ipv6_src
-        self.ipv6_dst = ipv6_dst
-        self.ipv6_flabel = ipv6_flabel
-        self.icmpv6_type = icmpv6_type
-        self.icmpv6_code = icmpv6_code
-        self.nd_tar = nd_tar
-        self.nd_sll = nd_sll
-        self.nd_tll = nd_tll
-        self.mpls_lab = mpls_lab
-        self.mpls_tc = mpls_tc
-        self.mpls_bos = mpls_bos
-        self.pbb_isid = pbb_isid
-        self.v6_hdr = v6_hdr
-        self.metadata = metadata
-        self.tun_id = tun_id
+        # pylint: disable=too-many-locals,unused-argument
+        fields = locals()
+        for name in self._fields:
+            if fields[name] is not None:
+                setattr(self, name, fields[name])
+
+    #: Names of the match fields, in the order of the constructor
+    _fields = tuple(signature(__init__).parameters)[1:]
+    _field_names = frozenset(_fields)
+
+    def __getattr__(self, name):
+        """Return None for the match fields that aren't set."""
+        if name in self._field_names:
+            return None
+        raise AttributeError(f"'{self.__class__.__name__}' object has no "
+                             f"attribute '{name}'")
+
+    def __setattr__(self, name, value):
+        """Remove the match fields set to None instead of storing them."""
+        if value is None and name in self._field_names:
+            self.__dict__.pop(name, None)
+        else:
+            super().__setattr__(name, value)
 
     def as_dict(self):
         """Return a dictionary excluding ``None`` values."""
         return {k: v for k, v in self.__dict__.items() if v is not None}
 
+    @classmethod
+    def _field_codes(cls):
+        """Return the code of each field name, by default its position."""
+        return {name: code for code, name in enumerate(MatchBase._fields)}
+
+    def pack_canonical(self, append):
+        """Append the binary encoding of the fields that are set.
+
+        They're packed as (code, value) pairs sorted by code, like OXM TLVs,
+        followed by the fields without a code as (name, value) pairs sorted
+        by name.
+        """
+        codes = _FIELD_CODES.get(self.__class__)
+        if codes is None:
+            codes = _FIELD_CODES[self.__class__] = self._field_codes()
+        fields, extra = [], []
+        for name, value in self.__dict__.items():
+            if value is not None:
+                code = codes.get(name)
+                if code is None:
+                    extra.append((name, value))
+                else:
+                    fields.append((code, value))
+        append(_PACK_LEN(b't', len(fields) + len(extra)))
+        fields.sort(key=itemgetter(0))
+        for code, value in fields:
+            append(_PAIR)
+            append(_PACK_INT(b'i', code))
+            pack_value(value, append)
+        extra.sort(key=itemgetter(0))
+        for name, value in extra:
+            append(_pack_name(name))
+            pack_value(value, append)
+
     @classmethod
     def from_dict(cls, match_dict):
         """Return a Match instance from a dictionary."""
         match = cls()
         for key, value in match_dict.items():
-            if key in match.__dict__:
+            if key in match._field_names:
                 setattr(match, key, value)
         return match
 
@@ -425,13 +642,13 @@ class MatchBase:  # pylint: disable=too-many-instance-attributes
     @property
     def nw_src(self):
         """The nw_src property."""
-        return self.__dict__["nw_src"]
+        return self.__dict__.get("nw_src")
 
     @nw_src.setter
     def nw_src(self, value):
         """The nw_src setter."""
         if value is None:
-            self.__dict__["nw_src"] = None
+            self.__dict__.pop("nw_src", None)
             return
         try:
             self.__dict__["nw_src"] = str(
@@ -443,13 +660,13 @@ class MatchBase:  # pylint: disable=too-many-instance-attributes
     @property
     def nw_dst(self):
         """The nw_dst property."""
-        return self.__dict__["nw_dst"]
+        return self.__dict__.get("nw_dst")
 
     @nw_dst.setter
     def nw_dst(self, value):
         """The nw_dst setter."""
         if value is None:
-            self.__dict__["nw_dst"] = None
+            self.__dict__.pop("nw_dst", None)
             return
         try:
             self.__dict__["nw_dst"] = str(
@@ -461,13 +678,13 @@ class MatchBase:  # pylint: disable=too-many-instance-attributes
     @property
     def ipv6_src(self):
         """The ipv6_src property."""
-        return self.__dict__["ipv6_src"]
+        return self.__dict__.get("ipv6_src")
 
     @ipv6_src.setter
     def ipv6_src(self, value):
         """The ipv6_src setter."""
         if value is None:
-            self.__dict__["ipv6_src"] = None
+            self.__dict__.pop("ipv6_src", None)
             return
         try:
             self.__dict__["ipv6_src"] = str(
@@ -479,13 +696,13 @@ class MatchBase:  # pylint: disable=too-many-instance-attributes
     @property
     def ipv6_dst(self):
         """The ipv6_dst property."""
-        return self.__dict__["ipv6_dst"]
+        return self.__dict__.get("ipv6_dst")
 
     @ipv6_dst.setter
     def ipv6_dst(self, value):
         """The ipv6_dst setter."""
         if value is None:
-            self.__dict__["ipv6_dst"] = None
+            self.__dict__.pop("ipv6_dst", None)
             return
         try:
             self.__dict__["ipv6_dst"] = str(
@@ -498,10 +715,12 @@ class MatchBase:  # pylint: disable=too-many-instance-attributes
 class Stats:
     """Simple class to store statistics as attributes and values."""
 
+    __slots__ = ()
+
     def as_dict(self):
         """Return a dict excluding attributes with ``None`` value."""
         return {attribute: value
-                for attribute, value in vars(self).items()
+                for attribute, value in attributes(self).items()
                 if value is not None}
 
     @classmethod
@@ -525,9 +744,10 @@ class Stats:
         instances whose native values can be accessed by `.value`.
         """
         # Generator for GenericType values
+        names = attributes(self)
         attr_name_value = ((attr_name, gen_type.value)
                            for attr_name, gen_type in vars(of_stats).items()
-                           if attr_name in vars(self))
+                           if attr_name in names)
         self._update(self, attr_name_value)
 
     @staticmethod
@@ -541,6 +761,9 @@ class Stats:
 class FlowStats(Stats):
     """Fields for 1.3 FlowStats."""
 
+    __slots__ = ('byte_count', 'duration_sec', 'duration_nsec',
+                 'packet_count')
+
     def __init__(self):
         """Initialize all statistics as ``None``."""
         self.byte_count = None
@@ -552,6 +775,10 @@ class FlowStats(Stats):
 class PortStats(Stats):  # pylint: disable=too-many-instance-attributes
     """Fields for 1.3 PortStats."""
 
+    __slots__ = ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+                 'rx_dropped', 'tx_dropped', 'rx_errors', 'tx_errors',
+                 'rx_frame_err', 'rx_over_err', 'rx_crc_err', 'collisions')
+
     def __init__(self):
         """Initialize all statistics as ``None``."""
         self.rx_packets = None
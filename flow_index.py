@@ -0,0 +1,222 @@
+"""Indexes of the flows of a switch, to diff consecutive flow stats and to
+look the flows up."""
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+
+class FlowDelta:
+    """Flow ids that changed between two flow stats dumps of a switch."""
+
+    def __init__(self, added=None, removed=None, changed=None):
+        """Assign the lists of flow ids.
+
+        Args:
+            added (list): Ids of the flows that weren't in the previous dump.
+            removed (list): Ids of the flows that aren't in the dump anymore.
+            changed (list): Ids of the flows whose counters changed.
+        """
+        self.added = added or []
+        self.removed = removed or []
+        self.changed = changed or []
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def as_dict(self):
+        """Return the delta as a serializable Python dictionary."""
+        return {
+            'added': self.added,
+            'removed': self.removed,
+            'changed': self.changed,
+        }
+
+
+class FlowIndex:
+    """Counters of the flows of a switch by ``Flow.id``.
+
+    Only the packet and byte counters of the last dump are kept, so the index
+    stays small even for tables with many flows.
+    """
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._counters = {}
+
+    def __len__(self):
+        return len(self._counters)
+
+    def __contains__(self, flow_id):
+        return flow_id in self._counters
+
+    def update(self, flows):
+        """Replace the indexed flows and return what changed.
+
+        Args:
+            flows (list): Flows of the new flow stats dump.
+
+        Returns:
+            FlowDelta: Flow ids added, removed and with changed counters
+            since the previous dump.
+        """
+        old = self._counters
+        new = {flow.id: (flow.stats.packet_count, flow.stats.byte_count)
+               for flow in flows}
+        delta = FlowDelta()
+        for flow_id, counters in new.items():
+            old_counters = old.get(flow_id)
+            if old_counters is None:
+                delta.added.append(flow_id)
+            elif old_counters != counters:
+                delta.changed.append(flow_id)
+        delta.removed = [flow_id for flow_id in old if flow_id not in new]
+        self._counters = new
+        return delta
+
+
+class FlowIdMap:
+    """Mapping between ``Flow.fingerprint`` and ``Flow.id`` of the flows of a
+    switch.
+
+    Consumers keying flows by the faster fingerprint can still find the
+    records they stored by the legacy md5 id, and the other way around.
+    """
+
+    def __init__(self):
+        """Initialize an empty mapping."""
+        self._ids = {}
+        self._fingerprints = {}
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._ids
+
+    def update(self, flows):
+        """Replace the mapped flows.
+
+        Args:
+            flows (list): Flows of the new flow stats dump.
+        """
+        self._ids = {flow.fingerprint: flow.id for flow in flows}
+        self._fingerprints = {flow_id: fingerprint
+                              for fingerprint, flow_id in self._ids.items()}
+
+    def legacy_id(self, fingerprint):
+        """Return the ``Flow.id`` of a fingerprint, or None."""
+        return self._ids.get(fingerprint)
+
+    def fingerprint(self, flow_id):
+        """Return the ``Flow.fingerprint`` of a legacy id, or None."""
+        return self._fingerprints.get(flow_id)
+
+
+class FlowLookup:
+    """Flows of a switch indexed by id, match id, cookie, table and output
+    port.
+
+    The flows are replaced on each flow stats dump, and each index is only
+    built on the first query that needs it, so dumps that aren't queried
+    don't hash every flow.
+    """
+
+    #: Cookies are 64 bits
+    COOKIE_MASK = 0xFFFFFFFFFFFFFFFF
+
+    def __init__(self):
+        """Initialize an empty lookup."""
+        self._flows = []
+        self._indexes = {}
+
+    def __len__(self):
+        return len(self._flows)
+
+    def __iter__(self):
+        return iter(self._flows)
+
+    def __contains__(self, flow_id):
+        return flow_id in self._index('id')
+
+    def update(self, flows):
+        """Replace the flows and drop the indexes built for the previous
+        ones.
+
+        Args:
+            flows (list): Flows of the switch.
+        """
+        self._flows = list(flows)
+        self._indexes = {}
+
+    def get(self, flow_id):
+        """Return the flow with a ``Flow.id``, or None."""
+        return self._index('id').get(flow_id)
+
+    def get_by_match_id(self, match_id):
+        """Return the flow with a ``Flow.match_id``, or None."""
+        return self._index('match_id').get(match_id)
+
+    def by_cookie(self, cookie, cookie_mask=COOKIE_MASK):
+        """Return the flows whose cookie matches under a mask, like the
+        cookie and cookie_mask of a flow stats request.
+
+        Masks of contiguous high bits select a range of cookies, which is
+        found by bisecting the flows sorted by cookie; other masks are
+        matched against every flow.
+        """
+        cookie &= cookie_mask
+        inverse = ~cookie_mask & self.COOKIE_MASK
+        if inverse & (inverse + 1):
+            return [flow for flow in self._flows
+                    if flow.cookie & cookie_mask == cookie]
+        cookies, flows = self._index('cookie')
+        return flows[bisect_left(cookies, cookie):
+                     bisect_right(cookies, cookie | inverse)]
+
+    def by_table(self, table_id):
+        """Return the flows of a table."""
+        return self._index('table_id').get(table_id, [])
+
+    def by_out_port(self, port):
+        """Return the flows with an output action to a port."""
+        return self._index('out_port').get(port, [])
+
+    def tables(self):
+        """Return the ids of the tables with flows."""
+        return sorted(self._index('table_id'))
+
+    def _index(self, key):
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = getattr(self, f'_build_{key}')()
+        return index
+
+    def _build_id(self):
+        return {flow.id: flow for flow in self._flows}
+
+    def _build_match_id(self):
+        return {flow.match_id: flow for flow in self._flows}
+
+    def _build_cookie(self):
+        flows = sorted(self._flows, key=lambda flow: flow.cookie)
+        return [flow.cookie for flow in flows], flows
+
+    def _build_table_id(self):
+        tables = defaultdict(list)
+        for flow in self._flows:
+            tables[flow.table_id].append(flow)
+        return dict(tables)
+
+    def _build_out_port(self):
+        ports = defaultdict(list)
+        for flow in self._flows:
+            for port in dict.fromkeys(self._out_ports(flow)):
+                ports[port].append(flow)
+        return dict(ports)
+
+    @staticmethod
+    def _out_ports(flow):
+        """Yield the ports of the output actions of a flow."""
+        for instruction in getattr(flow, 'instructions', ()):
+            for action in getattr(instruction, 'actions', ()):
+                if getattr(action, 'action_type', None) == 'output':
+                    yield action.port
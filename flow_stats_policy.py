@@ -0,0 +1,193 @@
+"""Policies choosing the flows requested by each flow stats request."""
+from collections import defaultdict
+
+from napps.kytos.of_core import settings
+from pyof.v0x04.controller2switch.table_mod import Table
+
+#: Flow stats policies, see ``settings.FLOW_STATS_POLICY``
+FLOW_STATS_POLICIES = ('all', 'table_rotation', 'table_changes')
+
+
+class FlowStatsFilter:
+    """Table and cookie range of the flows requested by a flow stats request.
+    """
+
+    def __init__(self, table_id=Table.OFPTT_ALL.value, cookie=0,
+                 cookie_mask=0):
+        """Assign parameters to attributes.
+
+        Args:
+            table_id (int): Table of the flows, or 0xff for all tables.
+            cookie (int): Cookie of the flows, compared under cookie_mask.
+            cookie_mask (int): Cookie bits that must match, 0 for any cookie.
+        """
+        self.table_id = table_id
+        self.cookie = cookie
+        self.cookie_mask = cookie_mask
+
+    def __eq__(self, other):
+        return (isinstance(other, FlowStatsFilter) and
+                self.as_tuple() == other.as_tuple())
+
+    def __repr__(self):
+        return (f"FlowStatsFilter(table_id={self.table_id}, "
+                f"cookie={self.cookie:#x}, cookie_mask={self.cookie_mask:#x})")
+
+    @property
+    def is_full(self):
+        """Return whether every flow of the switch is requested."""
+        return self.table_id == Table.OFPTT_ALL.value and not self.cookie_mask
+
+    def as_tuple(self):
+        """Return the filter as a ``(table_id, cookie, cookie_mask)`` tuple."""
+        return self.table_id, self.cookie, self.cookie_mask
+
+    def matches(self, flow):
+        """Return whether a flow is within the requested flows."""
+        if self.table_id not in (Table.OFPTT_ALL.value, flow.table_id):
+            return False
+        return flow.cookie & self.cookie_mask == self.cookie & self.cookie_mask
+
+
+class FlowStatsPolicy:
+    """Choose the flows requested in each stats cycle of the switches.
+
+    With the ``all`` policy every flow is requested, the ``table_rotation``
+    one requests a single table with active entries per cycle, and a table
+    whose entries dropped to 0 once more, so its flows are removed, and the
+    ``table_changes`` one only requests the tables whose ``active_count``
+    changed in the last table stats, skipping the request if none changed,
+    and requests them again if the request fails, see ``restore``.
+    Every table is requested while the table stats of a switch are unknown.
+    If cookie ranges are set, a single range is requested per cycle.
+
+    The flows of a reply only replace the requested ones in the flow view of
+    the switch, see ``merge``.
+    """
+
+    def __init__(self, policy=None, cookie_ranges=None):
+        """Initialize the policy without any switch state.
+
+        Args:
+            policy (str): One of ``FLOW_STATS_POLICIES``. Defaults to
+                ``settings.FLOW_STATS_POLICY``.
+            cookie_ranges (list): ``(cookie, cookie_mask)`` pairs requested
+                in turns. Defaults to ``settings.FLOW_STATS_COOKIE_RANGES``.
+        """
+        if policy is None:
+            policy = settings.FLOW_STATS_POLICY
+        if cookie_ranges is None:
+            cookie_ranges = settings.FLOW_STATS_COOKIE_RANGES
+        if policy not in FLOW_STATS_POLICIES:
+            raise ValueError(f"Invalid flow stats policy {policy}, it must be "
+                             f"one of {FLOW_STATS_POLICIES}")
+        self.policy = policy
+        self.cookie_ranges = [tuple(cookie_range)
+                              for cookie_range in cookie_ranges] or [(0, 0)]
+        # Last active_count by table id of each switch
+        self._active_counts = {}
+        # Tables whose active_count changed since the last request
+        self._changed_tables = defaultdict(set)
+        # Tables whose active_count dropped to 0 since the last request
+        self._emptied_tables = defaultdict(set)
+        self._cycles = defaultdict(int)
+
+    def next_filter(self, switch_id):
+        """Return the filter of the next flow stats request of a switch.
+
+        Returns:
+            FlowStatsFilter: Flows to request, or None if the flow stats
+            request should be skipped in this cycle.
+        """
+        table_id = Table.OFPTT_ALL.value
+        cycle = self._cycles[switch_id]
+        ranges = len(self.cookie_ranges)
+        cookie, cookie_mask = self.cookie_ranges[cycle % ranges]
+        active_counts = self._active_counts.get(switch_id)
+        if self.policy == 'table_rotation' and active_counts:
+            emptied = self._emptied_tables.pop(switch_id, set())
+            tables = sorted(table for table, active_count
+                            in active_counts.items() if active_count)
+            if emptied:
+                table_id = min(emptied)
+                emptied.discard(table_id)
+                if emptied:
+                    self._emptied_tables[switch_id] = emptied
+            elif tables:
+                table_id = tables[cycle // ranges % len(tables)]
+        elif self.policy == 'table_changes' and active_counts is not None:
+            changed = self._changed_tables.pop(switch_id, set())
+            if not changed:
+                return None
+            if len(changed) == 1:
+                table_id = changed.pop()
+        self._cycles[switch_id] = cycle + 1
+        return FlowStatsFilter(table_id, cookie, cookie_mask)
+
+    def restore(self, switch_id, flow_filter):
+        """Request again the changed tables of a failed flow stats request.
+
+        With the ``table_changes`` policy, the tables of a request that
+        timed out or whose replies couldn't be decoded are marked as changed
+        again, so they're requested in the next cycle. With the
+        ``table_rotation`` one, a table without active entries is requested
+        again, as its flows are still in the flow view of the switch.
+
+        Args:
+            switch_id (str): Switch id.
+            flow_filter (FlowStatsFilter): Filter of the failed request.
+        """
+        active_counts = self._active_counts.get(switch_id)
+        if active_counts is None:
+            return
+        if self.policy == 'table_rotation':
+            if active_counts.get(flow_filter.table_id) == 0:
+                self._emptied_tables[switch_id].add(flow_filter.table_id)
+            return
+        if self.policy != 'table_changes':
+            return
+        if flow_filter.table_id == Table.OFPTT_ALL.value:
+            self._changed_tables[switch_id].update(active_counts)
+        else:
+            self._changed_tables[switch_id].add(flow_filter.table_id)
+
+    def update_tables(self, switch_id, tables):
+        """Keep the active entries of each table from its table stats.
+
+        Args:
+            switch_id (str): Switch id.
+            tables (list): TableStats of the switch.
+        """
+        active_counts = self._active_counts.setdefault(switch_id, {})
+        for table in tables:
+            active_count = active_counts.get(table.table_id)
+            if active_count == table.active_count:
+                continue
+            if active_count and not table.active_count:
+                self._emptied_tables[switch_id].add(table.table_id)
+            elif table.active_count:
+                self._emptied_tables[switch_id].discard(table.table_id)
+            active_counts[table.table_id] = table.active_count
+            self._changed_tables[switch_id].add(table.table_id)
+
+    @staticmethod
+    def merge(switch, replies_flows, flow_filter=None):
+        """Return the flows of a switch updated with the replied flows.
+
+        Args:
+            switch (kytos.core.switch.Switch): Switch with its current flows.
+            replies_flows (list): Flows replied to a request.
+            flow_filter (FlowStatsFilter): Filter of that request, None if
+                every flow was requested.
+        """
+        if flow_filter is None or flow_filter.is_full:
+            return replies_flows
+        return [flow for flow in switch.flows
+                if not flow_filter.matches(flow)] + replies_flows
+
+    def pop(self, switch_id):
+        """Remove the state of a switch."""
+        self._active_counts.pop(switch_id, None)
+        self._changed_tables.pop(switch_id, None)
+        self._emptied_tables.pop(switch_id, None)
+        self._cycles.pop(switch_id, None)
@@ -1,16 +1,19 @@
 """NApp responsible for the main OpenFlow basic operations."""
 
 import asyncio
-import time
 from collections import defaultdict
 
 from napps.kytos.of_core import settings
-from napps.kytos.of_core.table import TableStats
-from napps.kytos.of_core.utils import (GenericHello, NegotiationException,
+from napps.kytos.of_core.backpressure import MsgInBackpressure
+from napps.kytos.of_core.connection_context import ConnectionContexts
+from napps.kytos.of_core.stats import StatsMixin
+from napps.kytos.of_core.utils import (FramerBufferOverflow, GenericHello,
+                                       LazyMessage, NegotiationException,
                                        aemit_message_in, aemit_message_out,
-                                       emit_message_out, of_slicer)
+                                       aemit_messages_in,
+                                       echo_reply_from_request,
+                                       emit_message_out, event_name_prio)
 from napps.kytos.of_core.v0x04 import utils as of_core_v0x04_utils
-from napps.kytos.of_core.v0x04.flow import Flow as Flow04
 from napps.kytos.of_core.v0x04.utils import try_to_activate_interface
 from pyof.foundation.exceptions import UnpackException
 from pyof.foundation.network_types import Ethernet, EtherType
@@ -18,27 +21,18 @@ from pyof.utils import PYOF_VERSION_LIBS, unpack
 from pyof.v0x04.common.header import Type
 from pyof.v0x04.common.port import PortConfig, PortState
 from pyof.v0x04.controller2switch.common import MultipartType
-from pyof.v0x04.controller2switch.features_reply import Capabilities
 
-from kytos.core import KytosEvent, KytosNApp, log
+from kytos.core import KytosEvent, KytosNApp, log, rest
 from kytos.core.connection import ConnectionState
 from kytos.core.exceptions import KytosDuplicatedSwitch
-from kytos.core.helpers import alisten_to, listen_to, run_on_thread
+from kytos.core.helpers import alisten_to, listen_to
 from kytos.core.interface import Interface
+from kytos.core.rest_api import JSONResponse, Request
 
 
-class Main(KytosNApp):
+class Main(StatsMixin, KytosNApp):
     """Main class of the NApp responsible for OpenFlow basic operations."""
 
-    # Keep track of multiple multipart replies from our own request only.
-    # Assume that all replies are received before setting a new xid. If
-    # that is not the case (i.e., overlapping replies), we skip up to X
-    # cycles before cleaning up pending requests and getting a fresh start
-    _multipart_replies_xids = {}
-    _multipart_replies_flows = defaultdict(list)
-    _multipart_replies_ports = defaultdict(list)
-    _multipart_replies_tables = defaultdict(list)
-
     def setup(self):
         """App initialization (used instead of ``__init__``).
 
@@ -47,12 +41,26 @@ class Main(KytosNApp):
         """
         self.of_core_version_utils = {0x04: of_core_v0x04_utils}
         self.execute_as_loop(settings.STATS_INTERVAL)
-        self._connection_lock = defaultdict(asyncio.Lock)
-
+        # Queue, framer and consumer task of each open connection
+        self.connection_contexts = ConnectionContexts(self.consume_raw_in)
+        # Pauses consuming raw data while msg_in is above its watermark
+        self.backpressure = MsgInBackpressure()
         # Message types that will be sequenced counted
         self._msg_seq_types = set(
             [Type.OFPT_MULTIPART_REPLY, Type.OFPT_PORT_STATUS]
         )
+        # Message types that of_core handles itself, such as the handshake
+        # ones, so they're unpacked right away and a bad message closes the
+        # connection. Other messages are only unpacked if a NApp reads them
+        self._msg_decode_types = set(
+            [Type.OFPT_MULTIPART_REPLY, Type.OFPT_PORT_STATUS,
+             Type.OFPT_PACKET_IN, Type.OFPT_ERROR,
+             Type.OFPT_FEATURES_REPLY]
+        )
+        # Message type values still handled while a connection is paused
+        self._msg_unpaused_types = set(
+            [Type.OFPT_ECHO_REQUEST.value, Type.OFPT_ECHO_REPLY.value]
+        )
         # State last seen local sequence number by switch by interface id
         self._intf_state_seen_num = defaultdict(lambda: defaultdict(int))
         # Local sequence number by switch by xid
@@ -60,9 +68,7 @@ class Main(KytosNApp):
         # Local sequence monotonic counter by switch
         self._msg_seq_cnt = defaultdict(int)
 
-        # Per switch delay to request flow/port stats, to avoid all request
-        # being sent together and increase the overhead on the controller
-        self.switch_req_stats_delay = {}
+        self._setup_stats()
 
     def execute(self):
         """Run once on app 'start' or in a loop.
@@ -70,76 +76,14 @@ class Main(KytosNApp):
         The execute method is called by the run method of KytosNApp class.
         Users shouldn't call this method directly.
         """
+        if not settings.SEND_ECHO_REQUESTS:
+            return
         for switch in self.controller.switches.copy().values():
             if switch.is_connected():
-                self.request_stats(switch)
-                if settings.SEND_ECHO_REQUESTS:
-                    version_utils = \
-                        self.of_core_version_utils[switch.
-                                                   connection.protocol.version]
-                    version_utils.send_echo(self.controller, switch)
-
-    @run_on_thread
-    def request_stats(self, switch):
-        """Send flow stats request to a connected switch."""
-        self._request_stats(switch)
-
-    def _check_overlapping_multipart_request(self, switch):
-        """Check overlapping multipart stats request (OF 1.3 only)."""
-        current_req = self._multipart_replies_xids.get(switch.id, {})
-        if ('flows' in current_req or 'ports' in current_req or
-           'tables' in current_req) and \
-           current_req.get('skipped', 0) < settings.STATS_REQ_SKIP:
-            log.info("Overlapping stats request: switch %s flows_xid %s"
-                     " ports_xid %s", switch.id, current_req.get('flows'),
-                     current_req.get('ports'))
-            current_req['skipped'] = current_req.get('skipped', 0) + 1
-            return True
-
-        if switch.id in self._multipart_replies_flows:
-            del self._multipart_replies_flows[switch.id]
-        if switch.id in self._multipart_replies_ports:
-            del self._multipart_replies_ports[switch.id]
-        if switch.id in self._multipart_replies_tables:
-            del self._multipart_replies_tables[switch.id]
-        return False
-
-    def _get_switch_req_stats_delay(self, switch):
-        if switch.id in self.switch_req_stats_delay:
-            return self.switch_req_stats_delay[switch.id]
-        last = self.switch_req_stats_delay.get('last', 0)
-        max_delay = settings.STATS_INTERVAL/2
-        next_delay = (last + max_delay/10) % max_delay
-        self.switch_req_stats_delay[switch.id] = next_delay
-        self.switch_req_stats_delay['last'] = next_delay
-        return next_delay
-
-    def _request_stats(self, switch):
-        """Send flow stats request to a connected switch."""
-        time.sleep(self._get_switch_req_stats_delay(switch))
-        of_version = switch.connection.protocol.version
-        if of_version == 0x04:
-            if self._check_overlapping_multipart_request(switch):
-                return
-
-            xid_flows = of_core_v0x04_utils.update_flow_list(self.controller,
-                                                             switch)
-            xid_ports = of_core_v0x04_utils.request_port_stats(self.controller,
-                                                               switch)
-            self._multipart_replies_xids[switch.id] = {
-                                                        'flows': xid_flows,
-                                                        'ports': xid_ports
-                                                      }
-            try:
-                if switch.features.capabilities.value & \
-                    Capabilities.OFPC_TABLE_STATS == \
-                        Capabilities.OFPC_TABLE_STATS:
-                    xid_tables = of_core_v0x04_utils.request_table_stats(
-                        self.controller, switch)
-                    self._multipart_replies_xids[switch.id].update(
-                        {'tables': xid_tables})
-            except AttributeError as err:
-                log.error(f"Capabilities not set on switch {switch.id}: {err}")
+                version_utils = \
+                    self.of_core_version_utils[switch.
+                                               connection.protocol.version]
+                version_utils.send_echo(self.controller, switch)
 
     @listen_to('kytos/of_core.v0x04.messages.in.ofpt_features_reply')
     def on_features_reply(self, event):
@@ -157,20 +101,27 @@ class Main(KytosNApp):
         connection = event.source
         version_utils = self.of_core_version_utils[connection.protocol.version]
         try:
-            switch = version_utils.handle_features_reply(self.controller,
-                                                         event)
+            switch = version_utils.handle_features_reply(
+                self.controller, event, request_port_desc=False)
         except KytosDuplicatedSwitch as exc:
             log.error(str(exc))
             return
         switch.update_lastseen()
         self.pop_multipart_replies(switch)
         self.pop_seq_msg_counters(switch)
+        transaction = self.multipart_transactions.begin(switch.id, None,
+                                                        'port_desc')
+        version_utils.send_port_request(self.controller, connection,
+                                        xid=transaction.xid)
 
         if (connection.is_during_setup() and
                 connection.protocol.state == 'waiting_features_reply'):
             connection.protocol.state = 'handshake_complete'
             connection.set_established_state()
-            version_utils.send_desc_request(self.controller, switch)
+            transaction = self.multipart_transactions.begin(switch.id, None,
+                                                            'desc')
+            version_utils.send_desc_request(self.controller, switch,
+                                            xid=transaction.xid)
             if settings.SEND_SET_CONFIG:
                 version_utils.send_set_config(self.controller, switch)
             log.info('Connection %s, Switch %s: OPENFLOW HANDSHAKE COMPLETE',
@@ -180,8 +131,8 @@ class Main(KytosNApp):
                 content={'switch': switch})
             self.controller.buffers.app.put(event_raw)
 
-    @listen_to('kytos/of_core.handshake.completed')
-    def on_handshake_completed_request_stats(self, event):
+    @alisten_to('kytos/of_core.handshake.completed')
+    async def on_handshake_completed_request_stats(self, event):
         """Request a flow list right after the handshake is completed.
 
         Args:
@@ -189,123 +140,51 @@ class Main(KytosNApp):
         """
         switch = event.content['switch']
         if switch.is_enabled():
-            self.handle_handshake_completed_request_stats(switch)
+            await self.handle_handshake_completed_request_stats(switch)
 
-    def handle_handshake_completed_request_stats(self, switch):
+    async def handle_handshake_completed_request_stats(self, switch):
         """Request a flow list right after the handshake is completed."""
-        self._request_stats(switch)
+        await self.request_stats(switch)
 
     async def _handle_multipart_reply(self, reply, switch):
-        """Handle multipart replies for v0x04 switches."""
+        """Handle multipart replies for v0x04 switches.
+
+        The transactions of the desc and port desc requests end with their
+        last reply, but the replies to other requests are handled as well.
+        """
+        if isinstance(reply, LazyMessage) and not reply.is_decoded:
+            # Only OFPMP_FLOW replies are left for the worker processes
+            await self._handle_multipart_flow_stats(reply, switch)
+            return
         if reply.multipart_type == MultipartType.OFPMP_FLOW:
             await self._handle_multipart_flow_stats(reply, switch)
         elif reply.multipart_type == MultipartType.OFPMP_TABLE:
             await self._handle_multipart_table_stats(reply, switch)
         elif reply.multipart_type == MultipartType.OFPMP_PORT_STATS:
             await self._handle_multipart_port_stats(reply, switch)
+        elif reply.multipart_type == MultipartType.OFPMP_AGGREGATE:
+            await self._handle_multipart_aggregate_stats(reply, switch)
         elif reply.multipart_type == MultipartType.OFPMP_PORT_DESC:
             await self._handle_port_desc(switch, reply)
+            if reply.flags.value % 2 == 0:  # Last bit means more replies
+                self._finish_desc_transaction(reply, switch, 'port_desc')
         elif reply.multipart_type == MultipartType.OFPMP_DESC:
             switch.update_description(reply.body)
+            self._finish_desc_transaction(reply, switch, 'desc')
 
-    async def _handle_multipart_flow_stats(self, reply, switch):
-        """Update switch flows after all replies are received.
-
-        Returns true if no more replies are expected.
-        """
-        if self._is_multipart_reply_ours(reply, switch, 'flows'):
-            # Get all flows from the reply and extend the multipar flows list
-            flows = [Flow04.from_of_flow_stats(of_flow_stats, switch)
-                     for of_flow_stats in reply.body]
-            self._multipart_replies_flows[switch.id].extend(flows)
-            xid = int(reply.header.xid)
-            if reply.flags.value % 2 == 0:  # Last bit means more replies
-                try:
-                    replies_flows = [
-                        flow for flow
-                        in self._multipart_replies_flows[switch.id]
-                    ]
-                    self._update_switch_flows(switch)
-                except KeyError:
-                    log.error("Skipped flow stats reply due to error when"
-                              f"updating switch {switch.id}, xid {xid}")
-                    return
-                event_raw = KytosEvent(
-                    name='kytos/of_core.flow_stats.received',
-                    content={'switch': switch, 'replies_flows': replies_flows})
-                await self.controller.buffers.app.aput(event_raw)
-                return True
-
-    async def _handle_multipart_table_stats(self, reply, switch):
-        """Update switch tables after all replies are received.
-
-        Returns true if no more replies are expected.
-        """
-        if self._is_multipart_reply_ours(reply, switch, 'tables'):
-            # Get all tables from the reply and extend the multipar tables list
-            tables = [TableStats.from_of_table_stats(of_table_stats, switch)
-                      for of_table_stats in reply.body]
-            self._multipart_replies_tables[switch.id].extend(tables)
-            xid = int(reply.header.xid)
-            if reply.flags.value % 2 == 0:  # Last bit means more replies
-                try:
-                    replies_tables = [
-                        table for table
-                        in self._multipart_replies_tables[switch.id]
-                    ]
-                    del self._multipart_replies_tables[switch.id]
-                    del self._multipart_replies_xids[switch.id]['tables']
-                except KeyError:
-                    log.error("Skipped tables stats reply due to error when"
-                              f"updating switch {switch.id}, xid {xid}")
-                    return
-                event_raw = KytosEvent(
-                    name='kytos/of_core.table_stats.received',
-                    content={
-                                'switch': switch,
-                                'replies_tables': replies_tables
-                            })
-                await self.controller.buffers.app.aput(event_raw)
-                return True
-
-    async def _handle_multipart_port_stats(self, reply, switch):
-        """Emit an event about new port stats."""
-        if self._is_multipart_reply_ours(reply, switch, 'ports'):
-            port_stats = [of_port_stats for of_port_stats in reply.body]
-            self._multipart_replies_ports[switch.id].extend(port_stats)
-            if reply.flags.value % 2 == 0:
-                await self._new_port_stats(switch)
-
-    def _update_switch_flows(self, switch):
-        """Update controllers' switch flow list and clean resources."""
-        switch.flows = self._multipart_replies_flows[switch.id]
-        del self._multipart_replies_flows[switch.id]
-        del self._multipart_replies_xids[switch.id]['flows']
-
-    async def _new_port_stats(self, switch):
-        """Send an event with the new port stats and clean resources."""
-        all_port_stats = self._multipart_replies_ports[switch.id]
-        del self._multipart_replies_ports[switch.id]
-        del self._multipart_replies_xids[switch.id]['ports']
-        port_stats_event = KytosEvent(
-            name="kytos/of_core.port_stats",
-            content={
-                'switch': switch,
-                'port_stats': all_port_stats
-                })
-        await self.controller.buffers.app.aput(port_stats_event)
-
-    def _is_multipart_reply_ours(self, reply, switch, stat):
-        """Return whether we are expecting the reply."""
-        if switch.id in self._multipart_replies_xids:
-            sent_xid = self._multipart_replies_xids[switch.id].get(stat)
-            if sent_xid == reply.header.xid:
-                return True
-        return False
+    def _finish_desc_transaction(self, reply, switch, stat):
+        """End a desc or port desc transaction with its last reply."""
+        if self._is_multipart_reply_ours(reply, switch, stat):
+            self.multipart_transactions.finish(switch.id,
+                                               int(reply.header.xid))
 
     @alisten_to('kytos/core.openflow.raw.in')
     async def on_raw_in(self, event):
-        """Handle a RawEvent and generate a kytos/core.messages.in.* event.
+        """Handle a RawEvent and queue its data to the connection consumer.
+
+        The data is framed, unpacked and emitted as kytos/core.messages.in.*
+        events in order by ``consume_raw_in``, a long-lived task of each
+        connection.
 
         Args:
             event (KytosEvent): RawEvent with openflow message to be unpacked
@@ -317,84 +196,246 @@ class Main(KytosNApp):
             switch.update_lastseen()
 
         connection = event.source
-        async with self._connection_lock[connection.id]:
-            data = connection.remaining_data + event.content['new_data']
-            packets, connection.remaining_data = of_slicer(data)
-            if not packets:
-                return
+        if not connection.is_alive():
+            return
+        context = self.connection_contexts.get_or_create(connection)
+        context.queue.put_nowait(event.content['new_data'])
+        if context.stats_task is None and switch and \
+                connection.is_established():
+            context.start_stats(self.poll_stats)
 
-            unprocessed_packets = []
-            multipart_messages = {}
+    async def consume_raw_in(self, context):
+        """Consume the raw data of a connection in order.
 
-            for packet in packets:
-                if not connection.is_alive():
-                    return
+        It runs as the connection context task until the connection is
+        closed or the context is removed.
+        """
+        connection = context.connection
+        while connection.is_alive():
+            data = await context.queue.get()
+            try:
+                if self.feed_raw_in(context, data):
+                    await self.process_raw_in(context)
+            except Exception as err:  # pylint: disable=broad-except
+                log.error(f"Connection {connection.id}: failed to process "
+                          f"raw data: {err!r}")
+            finally:
+                context.queue.task_done()
+
+    def feed_raw_in(self, context, data):
+        """Feed raw data and any other queued data to the framer.
+
+        Returns False if the connection has been closed because its framer
+        buffer would overflow.
+        """
+        connection = context.connection
+        try:
+            context.framer.feed(data)
+            while not context.queue.empty():
+                context.framer.feed(context.queue.get_nowait())
+                context.queue.task_done()
+        except FramerBufferOverflow as err:
+            log.error(f"Connection {connection.id}: {err}")
+            connection.close()
+            return False
+        return True
 
-                if connection.is_new():
-                    if not await self.process_new_connection(connection,
-                                                             packet):
-                        return
-                    continue
-
-                try:
-                    message = connection.protocol.unpack(packet)
-                    message_type = message.header.message_type
-                    if (
-                        switch
-                        and message_type in self._msg_seq_types
-                    ):
-                        self._msg_seq_cnt[switch.id] += 1
-                        self._xid_seq_num[switch.id][
-                            int(message.header.xid.value)
-                        ] = self._msg_seq_cnt[switch.id]
-
-                    if (
-                        switch
-                        and message.header.message_type == Type.OFPT_ERROR
-                    ):
-                        log.error(f"OFPT_ERROR: type {message.error_type},"
-                                  f" error code {message.code},"
-                                  f" from switch {switch.id},"
-                                  f" xid {message.header.xid}/"
-                                  f"0x{message.header.xid.value:x}")
-                except (UnpackException, AttributeError) as err:
-                    log.error(err)
-                    if isinstance(err, AttributeError):
-                        log.error(f'Connection {connection.id}: connection'
-                                  f'closed before version negotiation')
-                    connection.close()
-                    return
+    async def process_raw_in(self, context):
+        """Unpack and emit the complete OpenFlow messages of a connection."""
+        connection = context.connection
+        framer = context.framer
+        if not await self.wait_msg_in_backpressure(context):
+            return
 
-                log.debug('Connection %s: IN OFP, ver: %s, type: %s, xid: %s',
-                          connection.id,
-                          message.header.version,
-                          message.header.message_type,
-                          message.header.xid)
-
-                ofp_msg_type_str = message.header.message_type.name.lower()
-                waiting_features_reply = (
-                    ofp_msg_type_str == 'ofpt_features_reply'
-                    and connection.protocol.state in (
-                        'waiting_features_reply', 'sending_features'
-                    )
-                )
+        multipart_messages = {}
+        messages_in = []
 
-                if connection.is_during_setup() and not waiting_features_reply:
-                    unprocessed_packets.append(packet)
-                    continue
+        for packet in framer.frames():
+            if not connection.is_alive():
+                return
+
+            if connection.is_new():
+                if not await self.process_new_connection(connection,
+                                                         packet):
+                    return
+                continue
 
-                if ofp_msg_type_str == 'ofpt_multipart_reply':
-                    multipart_messages.setdefault(int(message.header.xid), [])
-                    multipart_messages[int(message.header.xid)].append(message)
-                    continue
+            message = self.decode_raw_in(connection, packet)
+            if message is None:
+                return
 
-                await self.aemit_message_in(connection, message)
+            if await self.route_raw_in(context, packet, message,
+                                       multipart_messages):
+                continue
 
-            connection.remaining_data = b''.join(unprocessed_packets) + \
-                                        connection.remaining_data
+            messages_in.append(message)
 
+        await self.aemit_messages_in(connection, messages_in)
         await self.process_multipart_messages(connection, multipart_messages)
 
+    def decode_raw_in(self, connection, packet):
+        """Unpack a packet of a connection and count its local sequence.
+
+        Returns None if the connection has been closed because the packet
+        couldn't be unpacked.
+        """
+        switch = connection.switch
+        try:
+            message = LazyMessage(packet, connection.protocol.unpack)
+            message_type = message.header.message_type
+            if (
+                message_type in self._msg_decode_types
+                and not self._is_multipart_decode_offloaded(message)
+            ) or (
+                # Replied by on_echo_request unless it's the fast path
+                message_type == Type.OFPT_ECHO_REQUEST
+                and not settings.ECHO_REPLY_FAST_PATH
+            ):
+                message.decode()
+            if (
+                switch
+                and message_type in self._msg_seq_types
+            ):
+                self._msg_seq_cnt[switch.id] += 1
+                self._xid_seq_num[switch.id][
+                    int(message.header.xid.value)
+                ] = self._msg_seq_cnt[switch.id]
+
+            if (
+                switch
+                and message.header.message_type == Type.OFPT_ERROR
+            ):
+                log.error(f"OFPT_ERROR: type {message.error_type},"
+                          f" error code {message.code},"
+                          f" from switch {switch.id},"
+                          f" xid {message.header.xid}/"
+                          f"0x{message.header.xid.value:x}")
+        except (UnpackException, AttributeError) as err:
+            log.error(err)
+            if isinstance(err, AttributeError):
+                log.error(f'Connection {connection.id}: connection'
+                          f'closed before version negotiation')
+            connection.close()
+            return None
+
+        log.debug('Connection %s: IN OFP, ver: %s, type: %s, xid: %s',
+                  connection.id,
+                  message.header.version,
+                  message.header.message_type,
+                  message.header.xid)
+        return message
+
+    async def route_raw_in(self, context, packet, message,
+                           multipart_messages):
+        """Handle a message that isn't emitted as is to msg_in.
+
+        Messages received during the connection setup are deferred,
+        multipart replies are grouped by xid in ``multipart_messages`` and
+        echo requests are replied right away if
+        ``settings.ECHO_REPLY_FAST_PATH`` is set.
+
+        Returns True if the message has been handled.
+        """
+        connection = context.connection
+        message_type = message.header.message_type
+        ofp_msg_type_str = message_type.name.lower()
+        waiting_features_reply = (
+            ofp_msg_type_str == 'ofpt_features_reply'
+            and connection.protocol.state in (
+                'waiting_features_reply', 'sending_features'
+            )
+        )
+
+        if connection.is_during_setup() and not waiting_features_reply:
+            context.framer.defer(packet)
+            return True
+
+        if ofp_msg_type_str == 'ofpt_multipart_reply':
+            multipart_messages.setdefault(int(message.header.xid), [])
+            multipart_messages[int(message.header.xid)].append(message)
+            return True
+
+        if (
+            settings.ECHO_REPLY_FAST_PATH
+            and message_type == Type.OFPT_ECHO_REQUEST
+        ):
+            await self.reply_echo_request(connection, message)
+            return True
+
+        return False
+
+    async def wait_msg_in_backpressure(self, context):
+        """Pause consuming a connection while msg_in is above the watermark.
+
+        Only the connections with enough events in msg_in are paused, see
+        ``MsgInBackpressure``, and connections are never paused before
+        their handshake is completed. Their echo messages are still handled
+        while paused, and the rest of their raw data keeps being buffered in
+        the framer. Once it's above ``settings.CONN_PAUSED_HIGH_BYTES``, the
+        messages of ``settings.MSG_IN_SHED_TYPES`` are dropped, lowest
+        priority first, until it's down to ``settings.CONN_PAUSED_LOW_BYTES``.
+        Messages that can't be shed, such as multipart replies, don't close
+        the connection once ``settings.MAX_CONN_BUFFERED_BYTES`` is reached:
+        reading from its transport is paused instead until consumption
+        resumes.
+
+        Returns False if the connection has been closed meanwhile.
+        """
+        connection = context.connection
+        msg_in = self.controller.buffers.msg_in
+        msg_in_size = msg_in.qsize()
+        if (
+            not connection.is_established()
+            or not self.backpressure.check(msg_in_size, connection.id)
+        ):
+            return True
+        log.warning(f"Connection {connection.id}: paused, msg_in has "
+                    f"{msg_in_size} events")
+        self.backpressure.pause(connection.id)
+        try:
+            while (
+                connection.is_alive()
+                and self.backpressure.check(msg_in.qsize(), connection.id)
+            ):
+                await self.buffer_paused_raw_in(context)
+                await asyncio.sleep(settings.MSG_IN_PAUSE_INTERVAL)
+        finally:
+            context.resume_reading()
+            self.backpressure.resume(connection.id)
+        return connection.is_alive()
+
+    async def buffer_paused_raw_in(self, context):
+        """Buffer the queued raw data of a paused connection.
+
+        The whole queue is moved to the framer and its echo messages are
+        handled right away. The messages that can be shed are dropped once
+        the framer buffer is above ``settings.CONN_PAUSED_HIGH_BYTES``, and
+        reading from the transport is paused if it's still full.
+        """
+        connection = context.connection
+        framer = context.framer
+        while not context.queue.empty():
+            framer.feed(context.queue.get_nowait(), capped=False)
+            context.queue.task_done()
+
+        messages_in = []
+        for packet in framer.take(self._msg_unpaused_types):
+            message = self.decode_raw_in(connection, packet)
+            if message is None:
+                return
+            if not await self.route_raw_in(context, packet, message, {}):
+                messages_in.append(message)
+        await self.aemit_messages_in(connection, messages_in)
+
+        if framer.buffered > settings.CONN_PAUSED_HIGH_BYTES:
+            shed = framer.shed(self.backpressure.shed_types,
+                               settings.CONN_PAUSED_LOW_BYTES)
+            self.backpressure.count_shed(shed)
+        if framer.is_full and not context.is_reading_paused:
+            log.warning(f"Connection {connection.id}: reading "
+                        f"paused, {framer.buffered} bytes buffered")
+            context.pause_reading()
+
     async def process_new_connection(self, connection, packet):
         """Async process a packet from a new connection."""
         try:
@@ -420,7 +461,7 @@ class Main(KytosNApp):
         for msgs in messages.values():
             for message in msgs:
                 await self._handle_multipart_reply(message, switch)
-                await self.aemit_message_in(connection, message)
+            await self.aemit_messages_in(connection, msgs)
 
     async def aemit_message_in(self, connection, message):
         """Async emit a KytosEvent for each incoming message.
@@ -430,12 +471,30 @@ class Main(KytosNApp):
         if not connection.is_alive():
             return
         await aemit_message_in(self.controller, connection, message)
+        self.backpressure.count_in(connection.id, 1)
         msg_type = message.header.message_type.name.lower()
         if msg_type == 'ofpt_port_status':
             self.update_port_status(message, connection)
         elif msg_type == 'ofpt_packet_in':
             self.update_links(message, connection)
 
+    async def aemit_messages_in(self, connection, messages):
+        """Async emit a KytosEvent for each message of a batch.
+
+        The batch is enqueued in order by ``utils.aemit_messages_in``, then
+        links and port status are updated like in ``aemit_message_in``.
+        """
+        if not messages or not connection.is_alive():
+            return
+        await aemit_messages_in(self.controller, connection, messages)
+        self.backpressure.count_in(connection.id, len(messages))
+        for message in messages:
+            msg_type = message.header.message_type.name.lower()
+            if msg_type == 'ofpt_port_status':
+                self.update_port_status(message, connection)
+            elif msg_type == 'ofpt_packet_in':
+                self.update_links(message, connection)
+
     def emit_message_out(self, connection, message):
         """Emit a KytosEvent for each outgoing message."""
         if connection.is_alive():
@@ -451,13 +510,16 @@ class Main(KytosNApp):
         """Handle Echo Request Messages.
 
         This method will get a echo request sent by client and generate a
-        echo reply as answer.
+        echo reply as answer. If ``settings.ECHO_REPLY_FAST_PATH`` is True,
+        the request has already been replied by ``reply_echo_request``.
 
         Args:
             event (:class:`~kytos.core.events.KytosEvent`):
                 Event with echo request in message.
 
         """
+        if settings.ECHO_REPLY_FAST_PATH:
+            return
         self.handle_echo_request(event)
 
     def handle_echo_request(self, event):
@@ -469,6 +531,36 @@ class Main(KytosNApp):
             data=echo_request.data)
         self.emit_message_out(event.source, echo_reply)
 
+    async def reply_echo_request(self, connection, echo_request):
+        """Reply an echo request straight from its raw bytes.
+
+        The reply is written to the connection without building python-openflow
+        messages or going through ``msg_in`` and ``msg_out``. The echo events
+        are still emitted if ``settings.ECHO_REPLY_FAST_PATH_EVENTS`` is True
+        or if ``settings.SEND_FEATURES_REQUEST_ON_ECHO`` needs them.
+
+        Args:
+            connection: kytos.core.connection.Connection instance.
+            echo_request (LazyMessage): Echo request received.
+        """
+        echo_reply = echo_reply_from_request(echo_request.packet)
+        connection.send(echo_reply)
+        if not (settings.ECHO_REPLY_FAST_PATH_EVENTS or
+                settings.SEND_FEATURES_REQUEST_ON_ECHO):
+            return
+
+        await self.aemit_message_in(connection, echo_request)
+        # The reply has already been sent, so the out event is only notified
+        # to the listeners through the app buffer
+        message = LazyMessage(echo_reply, connection.protocol.unpack)
+        name, priority = event_name_prio(message.header.version + 0,
+                                         message.header.message_type, 'out')
+        event = KytosEvent(
+            name=name,
+            priority=priority,
+            content={'message': message, 'destination': connection})
+        await self.controller.buffers.app.aput(event)
+
     async def _negotiate(self, connection, message):
         """Handle hello messages.
 
@@ -564,13 +656,6 @@ class Main(KytosNApp):
         event.destination.close()
         log.debug("Connection %s: Connection closed.", event.destination.id)
 
-    def pop_multipart_replies(self, switch) -> None:
-        """Pop multipart replies."""
-        self._multipart_replies_xids.pop(switch.id, None)
-        self._multipart_replies_flows.pop(switch.id, None)
-        self._multipart_replies_ports.pop(switch.id, None)
-        self._multipart_replies_tables.pop(switch.id, None)
-
     def pop_seq_msg_counters(self, switch) -> None:
         """Pop switch sequenced messages counters."""
         self._intf_state_seen_num.pop(switch.id, None)
@@ -580,15 +665,37 @@ class Main(KytosNApp):
     @alisten_to("kytos/core.openflow.connection.error")
     async def on_openflow_connection_error(self, event):
         """On openflow connection error try to pop multipart replies."""
-        switch = event.content["destination"].switch
+        connection = event.content["destination"]
+        self.connection_contexts.pop(connection.id)
+        self.backpressure.discard(connection.id)
+        switch = connection.switch
         if not switch:
             return
         self.pop_multipart_replies(switch)
         self.pop_seq_msg_counters(switch)
 
+    @alisten_to("kytos/core.openflow.connection.lost")
+    async def on_openflow_connection_lost(self, event):
+        """On openflow connection lost remove its connection context and
+        the counter history of its switch."""
+        connection = event.content["source"]
+        self.connection_contexts.pop(connection.id)
+        self.backpressure.discard(connection.id)
+        if connection.switch:
+            self.counter_histories.pop(connection.switch.id, None)
+
+    @rest('v1/backpressure', methods=['GET'])
+    def get_backpressure(self, _request: Request) -> JSONResponse:
+        """Return the msg_in backpressure state and counters."""
+        return JSONResponse(self.backpressure.as_dict())
+
     def shutdown(self):
         """End of the application."""
         log.debug('Shutting down...')
+        self.connection_contexts.clear()
+        if self._multipart_decode_pool is not None:
+            self._multipart_decode_pool.shutdown(wait=False,
+                                                 cancel_futures=True)
 
     def update_links(self, message, source):
         """Dispatch 'reacheable.mac' event.
@@ -0,0 +1,191 @@
+"""Tracking of the multipart requests sent to the switches."""
+import random
+import time
+
+from napps.kytos.of_core import settings
+
+
+class MultipartTransaction:
+    """A multipart request sent to a switch and the replies received so far.
+    """
+
+    def __init__(self, xid, stat, timeout, flow_filter=None):
+        """Start a transaction.
+
+        Args:
+            xid (int): Xid of the multipart request.
+            stat (str): Kind of stats requested, e.g. ``'flows'``.
+            timeout (float): Seconds to wait for the last reply.
+            flow_filter (FlowStatsFilter): Flows requested, if it's a flow
+                stats request.
+        """
+        self.xid = xid
+        self.stat = stat
+        self.deadline = time.monotonic() + timeout
+        self.flow_filter = flow_filter
+        # Items of the replies, reassembled in order
+        self.replies = []
+        # Position among the items and future of each OFPMP_FLOW reply being
+        # decoded by worker processes, whose flows are inserted there
+        self.decodes = []
+        # Index of the next flow_stats.chunk event
+        self.chunks = 0
+        # Bytes and number of the replies received
+        self.size = 0
+        self.messages = 0
+        # Seconds spent decoding and handling the replies
+        self.decode_time = 0.0
+
+    def add(self, items, size):
+        """Add the items of a reply of ``size`` bytes."""
+        self.replies.extend(items)
+        self.size += size
+        self.messages += 1
+
+    def add_decode(self, decode, size):
+        """Add a reply of ``size`` bytes whose items are still being decoded.
+
+        Args:
+            decode (asyncio.Future): Future of the items of the reply, which
+                are inserted at the position of the reply by ``insert``.
+            size (int): Bytes of the reply.
+        """
+        self.decodes.append((len(self.replies), decode))
+        self.size += size
+        self.messages += 1
+
+    def insert(self, positioned_items):
+        """Insert the items of replies at their positions among the items.
+
+        Args:
+            positioned_items (list): ``(position, items)`` pairs, sorted by
+                position, such as the positions of ``decodes`` along with
+                their decoded items.
+        """
+        replies = []
+        start = 0
+        for position, items in positioned_items:
+            replies.extend(self.replies[start:position])
+            replies.extend(items)
+            start = position
+        replies.extend(self.replies[start:])
+        self.replies = replies
+
+    def discard(self):
+        """Drop the replies received and cancel their pending decodes."""
+        for _, decode in self.decodes:
+            decode.cancel()
+        self.decodes.clear()
+        self.replies.clear()
+
+    def is_expired(self, now=None):
+        """Return whether the last reply wasn't received in time."""
+        if now is None:
+            now = time.monotonic()
+        return now >= self.deadline
+
+
+class MultipartTransactions:
+    """Transactions of the multipart requests of each switch by xid.
+
+    Several requests of a switch can be in flight at once, and transactions
+    whose last reply doesn't arrive within the timeout are reclaimed by
+    ``expire`` along with their partial replies.
+    """
+
+    def __init__(self, timeout=None):
+        """Initialize an empty table.
+
+        Args:
+            timeout (float): Seconds to wait for the last reply of a request.
+                Defaults to ``settings.MULTIPART_TIMEOUT``.
+        """
+        if timeout is None:
+            timeout = settings.MULTIPART_TIMEOUT
+        self.timeout = timeout
+        self._transactions = {}
+
+    def __len__(self):
+        return sum(len(transactions)
+                   for transactions in self._transactions.values())
+
+    def begin(self, switch_id, xid, stat, flow_filter=None):
+        """Start and return the transaction of a request to a switch.
+
+        It should begin before the request is sent, so its replies can't
+        arrive before it.
+
+        Args:
+            switch_id (str): Switch id.
+            xid (int): Xid of the request, or None for a random one that
+                isn't used by another transaction of the switch.
+            stat (str): Kind of stats requested, e.g. ``'flows'``.
+            flow_filter (FlowStatsFilter): Flows requested, if it's a flow
+                stats request.
+        """
+        if xid is None:
+            xid = self._new_xid(switch_id)
+        transaction = MultipartTransaction(xid, stat, self.timeout,
+                                           flow_filter)
+        self._transactions.setdefault(switch_id, {})[xid] = transaction
+        return transaction
+
+    def _new_xid(self, switch_id):
+        """Return a random xid unused by the transactions of a switch."""
+        transactions = self._transactions.get(switch_id, {})
+        xid = random.getrandbits(32)
+        while xid in transactions:
+            xid = random.getrandbits(32)
+        return xid
+
+    def get(self, switch_id, xid, stat=None):
+        """Return the transaction of a reply, or None if it isn't ours.
+
+        Args:
+            switch_id (str): Switch id.
+            xid (int): Xid of the reply.
+            stat (str): Kind of stats the transaction must be of, if any.
+        """
+        transaction = self._transactions.get(switch_id, {}).get(xid)
+        if transaction is None or stat not in (None, transaction.stat):
+            return None
+        return transaction
+
+    def finish(self, switch_id, xid):
+        """Remove and return a transaction, or None."""
+        transactions = self._transactions.get(switch_id)
+        if not transactions:
+            return None
+        transaction = transactions.pop(xid, None)
+        if not transactions:
+            del self._transactions[switch_id]
+        return transaction
+
+    def pending(self, switch_id):
+        """Return the transactions of a switch."""
+        return list(self._transactions.get(switch_id, {}).values())
+
+    def expire(self, switch_id):
+        """Remove and return the expired transactions of a switch."""
+        now = time.monotonic()
+        expired = [transaction for transaction in self.pending(switch_id)
+                   if transaction.is_expired(now)]
+        for transaction in expired:
+            self.finish(switch_id, transaction.xid)
+            transaction.discard()
+        return expired
+
+    def pop(self, switch_id):
+        """Remove every transaction of a switch."""
+        for transaction in self._transactions.pop(switch_id, {}).values():
+            transaction.discard()
+
+    def size(self, switch_id=None):
+        """Return the bytes of the replies received, by a switch or in total.
+        """
+        if switch_id is None:
+            switch_ids = list(self._transactions)
+        else:
+            switch_ids = [switch_id]
+        return sum(transaction.size for dpid in switch_ids
+                   for transaction in self.pending(dpid))
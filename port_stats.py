@@ -0,0 +1,185 @@
+"""Compact port stats records and the rates between consecutive samples."""
+import time
+
+#: Counters of an OFPMP_PORT_STATS reply kept by PortStats
+PORT_STATS_COUNTERS = ('rx_packets', 'tx_packets', 'rx_bytes', 'tx_bytes',
+                       'rx_dropped', 'tx_dropped', 'rx_errors', 'tx_errors',
+                       'rx_frame_err', 'rx_over_err', 'rx_crc_err',
+                       'collisions')
+
+#: duration_sec reported by the switches that don't know the port duration
+DURATION_UNAVAILABLE = 0xffffffff
+
+
+class PortStats:
+    """Counters of a port from an OFPMP_PORT_STATS reply, as plain ints."""
+
+    __slots__ = ('port_no', 'duration_sec', 'duration_nsec') + \
+        PORT_STATS_COUNTERS
+
+    def __init__(self, port_no, duration_sec=0, duration_nsec=0, **counters):
+        """Assign parameters to attributes.
+
+        Args:
+            port_no (int): Port number.
+            duration_sec (int): Time the port has been alive, in seconds.
+            duration_nsec (int): Nanoseconds beyond duration_sec.
+            counters: Values of ``PORT_STATS_COUNTERS``, 0 if missing.
+        """
+        self.port_no = port_no
+        self.duration_sec = duration_sec
+        self.duration_nsec = duration_nsec
+        for counter in PORT_STATS_COUNTERS:
+            setattr(self, counter, counters.pop(counter, 0))
+        if counters:
+            raise TypeError(f"Unknown port stats counters {list(counters)}")
+
+    def __eq__(self, other):
+        return (isinstance(other, PortStats) and
+                self.as_dict() == other.as_dict())
+
+    def __repr__(self):
+        counters = ', '.join(f"{counter}={getattr(self, counter)}"
+                             for counter in ('rx_bytes', 'tx_bytes'))
+        return f"PortStats(port_no={self.port_no}, {counters})"
+
+    @property
+    def duration(self):
+        """Return the time the port has been alive, in seconds."""
+        return self.duration_sec + self.duration_nsec / 1e9
+
+    @property
+    def has_duration(self):
+        """Return whether the switch reported the port duration.
+
+        Switches that don't know it report 0 or ``DURATION_UNAVAILABLE``.
+        """
+        return (self.duration_sec != DURATION_UNAVAILABLE and
+                bool(self.duration_sec or self.duration_nsec))
+
+    def as_dict(self):
+        """Return the port stats as a serializable Python dictionary."""
+        port_stats_dict = {
+            'port_no': self.port_no,
+            'duration_sec': self.duration_sec,
+            'duration_nsec': self.duration_nsec,
+        }
+        for counter in PORT_STATS_COUNTERS:
+            port_stats_dict[counter] = getattr(self, counter)
+        return port_stats_dict
+
+    @classmethod
+    def from_of_port_stats(cls, of_port_stats):
+        """Create a record from a python-openflow PortStats."""
+        port_stats = cls.__new__(cls)
+        port_stats.port_no = of_port_stats.port_no.value
+        port_stats.duration_sec = of_port_stats.duration_sec.value
+        port_stats.duration_nsec = of_port_stats.duration_nsec.value
+        for counter in PORT_STATS_COUNTERS:
+            setattr(port_stats, counter,
+                    getattr(of_port_stats, counter).value)
+        return port_stats
+
+
+class PortRates:
+    """Rates of a port between two consecutive port stats samples."""
+
+    __slots__ = ('port_no', 'interval', 'rx_bps', 'tx_bps', 'rx_pps',
+                 'tx_pps', 'rx_error_rate', 'tx_error_rate')
+
+    def __init__(self, previous, current, interval=None):
+        """Compute the rates from the counters of two samples of a port.
+
+        Args:
+            previous (PortStats): Previous sample of the port.
+            current (PortStats): Current sample of the port.
+            interval (float): Seconds between the samples, the difference
+                of their durations by default.
+        """
+        self.port_no = current.port_no
+        if interval is None:
+            interval = current.duration - previous.duration
+        self.interval = interval
+        self.rx_bps = (current.rx_bytes - previous.rx_bytes) * 8 / interval
+        self.tx_bps = (current.tx_bytes - previous.tx_bytes) * 8 / interval
+        self.rx_pps = (current.rx_packets - previous.rx_packets) / interval
+        self.tx_pps = (current.tx_packets - previous.tx_packets) / interval
+        self.rx_error_rate = (current.rx_errors -
+                              previous.rx_errors) / interval
+        self.tx_error_rate = (current.tx_errors -
+                              previous.tx_errors) / interval
+
+    def as_dict(self):
+        """Return the rates as a serializable Python dictionary."""
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+    @staticmethod
+    def is_valid(previous, current, interval=None):
+        """Return whether rates can be computed between two samples.
+
+        The port must have been alive for longer in the current sample, or
+        the given interval must be positive, and no counter may have gone
+        backwards, which happens when the port or the switch is reset.
+        """
+        if interval is None:
+            interval = current.duration - previous.duration
+        if interval <= 0:
+            return False
+        return all(getattr(current, counter) >= getattr(previous, counter)
+                   for counter in PORT_STATS_COUNTERS)
+
+
+class PortStatsIndex:
+    """Last port stats sample of each port of a switch by port number."""
+
+    def __init__(self):
+        """Initialize an empty index."""
+        self._samples = {}
+        self._received = None
+
+    def __len__(self):
+        return len(self._samples)
+
+    def __contains__(self, port_no):
+        return port_no in self._samples
+
+    def get(self, port_no):
+        """Return the last sample of a port, or None."""
+        return self._samples.get(port_no)
+
+    def update(self, port_stats, received=None):
+        """Replace the samples and return the rates since the previous ones.
+
+        Ports without a previous sample, or whose counters were reset, have
+        no rates until their next sample. The rates of the ports whose
+        duration the switch didn't report in both samples are computed over
+        the time between the replies instead.
+
+        Args:
+            port_stats (list): PortStats of the new reply.
+            received (float): ``time.monotonic`` when the reply was
+                received, now by default.
+
+        Returns:
+            dict: PortRates by port number.
+        """
+        if received is None:
+            received = time.monotonic()
+        elapsed = None
+        if self._received is not None:
+            elapsed = received - self._received
+        rates = {}
+        samples = {}
+        for current in port_stats:
+            previous = self._samples.get(current.port_no)
+            if previous is not None:
+                interval = None
+                if not (previous.has_duration and current.has_duration):
+                    interval = elapsed
+                if PortRates.is_valid(previous, current, interval):
+                    rates[current.port_no] = PortRates(previous, current,
+                                                       interval)
+            samples[current.port_no] = current
+        self._samples = samples
+        self._received = received
+        return rates
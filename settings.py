@@ -2,10 +2,33 @@
 #: Pooling frequency
 STATS_INTERVAL = 60
 
+#: Maximum number of switches with stats requests whose replies haven't all
+#: been received yet, 0 disables the limit
+STATS_MAX_IN_FLIGHT = 64
+
+#: Maximum random delay, in seconds, added to the stable phase of each switch
+#: within STATS_INTERVAL when requesting its stats
+STATS_JITTER = 1.0
+
+#: Bounds of the flow stats interval of each switch, in seconds. It grows
+#: with the time spent handling the flow stats replies of the switch, so
+#: that all switches fit in FLOW_STATS_CPU_BUDGET. Flow stats are only
+#: requested along with the other stats, every STATS_INTERVAL
+FLOW_STATS_INTERVAL_MIN = STATS_INTERVAL
+FLOW_STATS_INTERVAL_MAX = STATS_INTERVAL * 10
+
+#: Fraction of a CPU to spend handling flow stats replies, shared evenly by
+#: the switches. 0 keeps every switch at FLOW_STATS_INTERVAL_MIN
+FLOW_STATS_CPU_BUDGET = 0.05
+
 #: Maximum number of cycles to skip the stats request in case of
 #: overlapping/pending stats replies
 STATS_REQ_SKIP = 5
 
+#: Seconds to wait for the last reply of a multipart request before its
+#: partial replies are dropped and a new stats request can be sent
+MULTIPART_TIMEOUT = STATS_INTERVAL * STATS_REQ_SKIP
+
 #: All OpenFlow Versions
 ALL_OPENFLOW_VERSIONS = [0x01, 0x02, 0x03, 0x04, 0x05, 0x06]
 
@@ -19,9 +42,103 @@ SEND_FEATURES_REQUEST_ON_ECHO = False
 #: Send Echo requests to switches periodically to keep connection
 SEND_ECHO_REQUESTS = True
 
+#: Reply echo requests right away in on_raw_in, writing the reply straight
+#: from the raw request bytes instead of going through msg_in and msg_out.
+#: The echo events are then only emitted with ECHO_REPLY_FAST_PATH_EVENTS
+ECHO_REPLY_FAST_PATH = False
+
+#: Keep emitting the ofpt_echo_request in and ofpt_echo_reply out events when
+#: echo requests are replied through the fast path
+ECHO_REPLY_FAST_PATH_EVENTS = False
+
 #: Send Set Config messages right after the OpenFlow handshake
 SEND_SET_CONFIG = True
 
 # Skip late interface state PortDesc and PortStatus updates; Feature flag.
 # This option will be eventually removed and will always be True
 SKIP_INTF_STATE_LATE_UPDATES = True
+
+#: Number of connection contexts that triggers pruning the ones of dead
+#: connections, they're otherwise removed when the connection is closed
+MAX_CONNECTION_CONTEXTS = 4096
+
+#: Maximum number of bytes buffered per connection while framing OpenFlow
+#: messages. The connection is closed if it's exceeded, unless it's paused
+#: by the msg_in backpressure, which pauses reading from it instead
+MAX_CONN_BUFFERED_BYTES = 64 * 1024 * 1024
+
+#: Flows requested by each flow stats request. 'all' requests every flow,
+#: 'table_rotation' a single table with active entries per cycle, and
+#: 'table_changes' only the tables whose active_count changed, skipping the
+#: flow stats request if none did. The replied flows are merged into
+#: switch.flows, replacing only the requested ones
+FLOW_STATS_POLICY = 'all'
+
+#: (cookie, cookie_mask) ranges of the flows requested, one range per cycle,
+#: e.g. the cookie ranges owned by some NApps. Every cookie if it's empty
+FLOW_STATS_COOKIE_RANGES = []
+
+#: Request the aggregate stats of the flows instead of the flow stats, and
+#: only request the flow stats once the flow, packet or byte counts changed
+#: since the last aggregate stats of the switch
+FLOW_STATS_AGGREGATE_CHECK = False
+
+#: Emit a kytos/of_core.flow_stats.chunk event per OFPMP_FLOW reply instead
+#: of accumulating all of them. switch.flows isn't updated and
+#: kytos/of_core.flow_stats.received isn't emitted when it's enabled
+FLOW_STATS_STREAMING = False
+
+#: Diff each flow stats of a switch against the previous one by Flow.id and
+#: send the added, removed and changed flow ids in a
+#: kytos/of_core.flow_stats.delta event. It computes the id of every flow on
+#: each flow stats, which is cheap once cached, e.g. with FLOW_STATS_REUSE
+FLOW_STATS_DELTA = False
+
+#: Samples of the flow, port and table counters kept per flow, port and
+#: table of each switch in Main.counter_histories, to query their rates,
+#: percentiles and top-N over a window. 0 disables the history
+COUNTER_HISTORY_SIZE = 0
+
+#: Map the Flow.fingerprint of the flows of each switch to their legacy
+#: Flow.id in Main.flow_id_maps, for the consumers keying the flows by the
+#: faster fingerprint that still have records stored by the legacy id
+FLOW_ID_MAP = False
+
+#: Reuse the Flow of each flow stats entry whose table, priority, timeouts,
+#: cookie, match and instructions didn't change since the previous replies,
+#: updating its stats in place, and only unpack the new or changed entries.
+#: The stats of the flows of previous kytos/of_core.flow_stats.received
+#: events change along. It doesn't apply to FLOW_STATS_STREAMING
+FLOW_STATS_REUSE = False
+
+#: Worker processes used to decode large OFPMP_FLOW multipart replies off the
+#: event loop. 0 keeps decoding every multipart reply inline
+MULTIPART_DECODE_WORKERS = 0
+
+#: Minimum size in bytes of an OFPMP_FLOW multipart reply to be decoded by
+#: the worker processes, smaller replies are still decoded inline
+MULTIPART_DECODE_MIN_BYTES = 16 * 1024
+
+#: Size of the msg_in buffer that pauses consuming raw OpenFlow data, which
+#: is resumed once the buffer drains to MSG_IN_LOW_WATERMARK. 0 disables it
+MSG_IN_HIGH_WATERMARK = 10000
+MSG_IN_LOW_WATERMARK = 5000
+
+#: While msg_in is above MSG_IN_HIGH_WATERMARK, only the connections with at
+#: least MSG_IN_CONN_HIGH_WATERMARK events in msg_in are paused, until their
+#: events drain to MSG_IN_CONN_LOW_WATERMARK. 0 pauses every connection
+MSG_IN_CONN_HIGH_WATERMARK = 2000
+MSG_IN_CONN_LOW_WATERMARK = 1000
+
+#: Bytes buffered by a paused connection above which MSG_IN_SHED_TYPES
+#: messages start being dropped, down to CONN_PAUSED_LOW_BYTES
+CONN_PAUSED_HIGH_BYTES = 4 * 1024 * 1024
+CONN_PAUSED_LOW_BYTES = 1024 * 1024
+
+#: Message types that can be dropped while paused, the lowest priority ones
+#: according to msg_prios are dropped first. Stateful messages such as port
+#: status and multipart replies must not be listed here
+MSG_IN_SHED_TYPES = ['OFPT_PACKET_IN']
+
+#: Seconds between checks of the msg_in buffer size while paused
+MSG_IN_PAUSE_INTERVAL = 0.05
@@ -0,0 +1,557 @@
+"""Stats requests and multipart replies handling of the of_core NApp."""
+
+import asyncio
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from napps.kytos.of_core import settings
+from napps.kytos.of_core.counter_history import CounterHistory
+from napps.kytos.of_core.flow_index import FlowIdMap, FlowIndex, FlowLookup
+from napps.kytos.of_core.flow_stats_policy import FlowStatsPolicy
+from napps.kytos.of_core.multipart_transactions import MultipartTransactions
+from napps.kytos.of_core.port_stats import PortStats, PortStatsIndex
+from napps.kytos.of_core.stats_interval import StatsIntervalTuner
+from napps.kytos.of_core.stats_scheduler import StatsScheduler
+from napps.kytos.of_core.table import TableStats
+from napps.kytos.of_core.utils import LazyMessage, multipart_reply_type_flags
+from napps.kytos.of_core.v0x04 import utils as of_core_v0x04_utils
+from napps.kytos.of_core.v0x04.flow import Flow as Flow04
+from napps.kytos.of_core.v0x04.flow import (FlowInterner,
+                                            flows_from_multipart_reply)
+from pyof.foundation.exceptions import UnpackException
+from pyof.v0x04.common.header import Type
+from pyof.v0x04.controller2switch.common import MultipartType
+from pyof.v0x04.controller2switch.features_reply import Capabilities
+
+from kytos.core import KytosEvent, log
+
+
+class StatsMixin:
+    """Flow, port, table and aggregate stats handling of the ``Main`` NApp.
+
+    It polls the stats of each connected switch and handles their multipart
+    replies, keeping the per switch stats state created by ``_setup_stats``.
+    """
+
+    def _setup_stats(self):
+        """Create the per switch stats state, called by ``Main.setup``."""
+        # Multipart requests of each switch by xid, only replies to them are
+        # handled. Requests without their last reply in time are reclaimed
+        self.multipart_transactions = MultipartTransactions()
+
+        # Per switch phase to request flow/port stats, to avoid all request
+        # being sent together and increase the overhead on the controller,
+        # and the switches with requests in flight
+        self.stats_scheduler = StatsScheduler()
+        # Flow stats interval of each switch, tuned from its reply cost
+        self.stats_interval_tuner = StatsIntervalTuner()
+        # Table and cookie range of the flows requested in each cycle
+        self.flow_stats_policy = FlowStatsPolicy()
+        # Last aggregate stats of the flows of each switch
+        self._aggregate_stats = {}
+        # Flow ids and counters of the last flow stats dump of each switch
+        self.flow_indexes = defaultdict(FlowIndex)
+        # Flows of each switch by id, match id, cookie, table and out port
+        self.flow_lookups = defaultdict(FlowLookup)
+        # Legacy flow ids by fingerprint of the flows of each switch, only
+        # kept if settings.FLOW_ID_MAP is set
+        self.flow_id_maps = defaultdict(FlowIdMap)
+        # Last port stats sample of each port of each switch
+        self.port_stats_indexes = defaultdict(PortStatsIndex)
+        # Recent flow, port and table counters of each switch, only kept if
+        # settings.COUNTER_HISTORY_SIZE is set
+        self.counter_histories = defaultdict(CounterHistory)
+        # Flows of the last flow stats replies of each switch, reused by the
+        # next replies if settings.FLOW_STATS_REUSE is set
+        self.flow_interners = defaultdict(FlowInterner)
+
+        # Worker processes decoding large OFPMP_FLOW replies, only created
+        # if settings.MULTIPART_DECODE_WORKERS is set. They're started by a
+        # fork server, as forking the threaded controller could deadlock
+        self._multipart_decode_pool = None
+        if settings.MULTIPART_DECODE_WORKERS:
+            self._multipart_decode_pool = ProcessPoolExecutor(
+                max_workers=settings.MULTIPART_DECODE_WORKERS,
+                mp_context=multiprocessing.get_context('forkserver'))
+
+    async def poll_stats(self, context):
+        """Request the stats of the switch of a connection periodically.
+
+        Long-lived task of each established connection, started by
+        ``on_raw_in`` and cancelled along with the connection context. The
+        requests of each switch are sent at its phase within
+        ``settings.STATS_INTERVAL``.
+        """
+        switch = context.connection.switch
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self.stats_scheduler.delay(switch.id, loop.time())
+            await asyncio.sleep(delay)
+            if not switch.is_connected():
+                continue
+            try:
+                await self.request_stats(switch)
+            except Exception as exc:  # pylint: disable=broad-except
+                log.error(f"Failed to request the stats of switch "
+                          f"{switch.id}: {exc}")
+
+    def _check_overlapping_multipart_request(self, switch):
+        """Check overlapping multipart stats request (OF 1.3 only).
+
+        Requests whose last reply didn't arrive within
+        ``settings.MULTIPART_TIMEOUT`` are reclaimed first.
+
+        Returns:
+            set: Kinds of the periodic stats whose requests are still in
+            flight, which are skipped in this cycle.
+        """
+        for transaction in self.multipart_transactions.expire(switch.id):
+            log.warning(f"Multipart {transaction.stat} request of switch "
+                        f"{switch.id}, xid {transaction.xid}, timed out "
+                        f"after {transaction.size} bytes of replies")
+            self._retry_flow_stats(switch, transaction)
+        self._release_stats_request(switch)
+        pending = self._pending_stats_requests(switch)
+        if pending:
+            log.info("Overlapping stats request: switch %s xids %s",
+                     switch.id, {transaction.stat: transaction.xid
+                                 for transaction in pending})
+        return {transaction.stat for transaction in pending}
+
+    def _pending_stats_requests(self, switch):
+        """Return the transactions of the periodic stats of a switch."""
+        return [transaction for transaction
+                in self.multipart_transactions.pending(switch.id)
+                if transaction.stat in ('flows', 'ports', 'tables',
+                                        'aggregate')]
+
+    def _release_stats_request(self, switch):
+        """Release the stats request slot once all replies were received."""
+        if not self._pending_stats_requests(switch):
+            self.stats_scheduler.release(switch.id)
+
+    async def request_stats(self, switch):
+        """Send flow, port and table stats requests to a connected switch.
+
+        If ``settings.FLOW_STATS_AGGREGATE_CHECK`` is set, the aggregate
+        stats are requested instead of the flow stats, which are only
+        requested once the aggregate stats show that the flows changed.
+        Either is skipped until the flow stats interval of the switch, see
+        ``Main.stats_interval_tuner``, has elapsed. The kinds of stats whose
+        previous request is still in flight are skipped in this cycle.
+        """
+        of_version = switch.connection.protocol.version
+        if of_version == 0x04:
+            pending = self._check_overlapping_multipart_request(switch)
+            if not await self.stats_scheduler.acquire(switch.id):
+                log.warning(f"Skipped stats request of switch {switch.id}, "
+                            f"{len(self.stats_scheduler)} switches have stats "
+                            "requests in flight")
+                return
+
+            # Each transaction begins before its request is sent, so no
+            # reply can arrive before it
+            transactions = self.multipart_transactions
+            now = time.monotonic()
+            if (
+                not pending & {'flows', 'aggregate'}
+                and self.stats_interval_tuner.is_due(switch.id, now)
+            ):
+                self.stats_interval_tuner.requested(switch.id, now)
+                if settings.FLOW_STATS_AGGREGATE_CHECK:
+                    transaction = transactions.begin(switch.id, None,
+                                                     'aggregate')
+                    await of_core_v0x04_utils.arequest_aggregate_stats(
+                        self.controller, switch, xid=transaction.xid)
+                else:
+                    await self._request_flow_stats(switch)
+            if 'ports' not in pending:
+                transaction = transactions.begin(switch.id, None, 'ports')
+                await of_core_v0x04_utils.arequest_port_stats(
+                    self.controller, switch, xid=transaction.xid)
+            if 'tables' in pending:
+                return
+            try:
+                if switch.features.capabilities.value & \
+                    Capabilities.OFPC_TABLE_STATS == \
+                        Capabilities.OFPC_TABLE_STATS:
+                    transaction = transactions.begin(switch.id, None,
+                                                     'tables')
+                    await of_core_v0x04_utils.arequest_table_stats(
+                        self.controller, switch, xid=transaction.xid)
+            except AttributeError as err:
+                log.error(f"Capabilities not set on switch {switch.id}: {err}")
+
+    async def _request_flow_stats(self, switch):
+        """Send the flow stats request chosen by the flow stats policy.
+
+        Returns its transaction, or None if no request was sent.
+        """
+        flow_filter = self.flow_stats_policy.next_filter(switch.id)
+        if flow_filter is None:
+            return None
+        transaction = self.multipart_transactions.begin(switch.id, None,
+                                                        'flows', flow_filter)
+        await of_core_v0x04_utils.aupdate_flow_list(
+            self.controller, switch, table_id=flow_filter.table_id,
+            cookie=flow_filter.cookie, cookie_mask=flow_filter.cookie_mask,
+            xid=transaction.xid)
+        return transaction
+
+    async def _handle_multipart_flow_stats(self, reply, switch):
+        """Update switch flows after all replies are received.
+
+        Returns true if no more replies are expected.
+        """
+        transaction = self._multipart_transaction(reply, switch, 'flows')
+        if transaction is not None:
+            if settings.FLOW_STATS_STREAMING:
+                return await self._stream_multipart_flow_stats(reply, switch,
+                                                               transaction)
+            started = time.perf_counter()
+            if isinstance(reply, LazyMessage) and not reply.is_decoded:
+                _, flags = multipart_reply_type_flags(reply.packet)
+                if settings.FLOW_STATS_REUSE:
+                    try:
+                        flows = self.flow_interners[
+                            switch.id].flows_from_multipart_reply(
+                                reply.packet, switch)
+                    except UnpackException as err:
+                        log.error("Skipped flow stats reply of switch "
+                                  f"{switch.id}, xid {int(reply.header.xid)}"
+                                  f", failed to decode it: {err}")
+                        self._abort_multipart_transaction(switch,
+                                                          transaction)
+                        return
+                    transaction.add(flows, len(reply.packet))
+                else:
+                    transaction.add_decode(
+                        self._decode_multipart_flows(reply.packet),
+                        len(reply.packet))
+            else:
+                # Get all flows from the reply and extend the multipar flows
+                # list
+                flags = reply.flags.value
+                flows = [Flow04.from_of_flow_stats(of_flow_stats, switch)
+                         for of_flow_stats in reply.body]
+                transaction.add(flows, int(reply.header.length))
+            transaction.decode_time += time.perf_counter() - started
+            xid = int(reply.header.xid)
+            if flags % 2 == 0:  # Last bit means more replies
+                if not await self._collect_multipart_flows(reply, switch,
+                                                           transaction):
+                    return
+                started = time.perf_counter()
+                try:
+                    replies_flows = [flow for flow in transaction.replies]
+                    self._update_switch_flows(switch, transaction)
+                except KeyError:
+                    log.error("Skipped flow stats reply due to error when"
+                              f"updating switch {switch.id}, xid {xid}")
+                    return
+                transaction.decode_time += time.perf_counter() - started
+                self.stats_interval_tuner.observe(
+                    switch.id, transaction.size, transaction.messages,
+                    transaction.decode_time)
+                if settings.COUNTER_HISTORY_SIZE:
+                    history = self.counter_histories[switch.id]
+                    history.record_flows(replies_flows)
+                    history.expire('flows')
+                event_raw = KytosEvent(
+                    name='kytos/of_core.flow_stats.received',
+                    content={'switch': switch, 'replies_flows': replies_flows,
+                             'flow_stats_interval':
+                             self.stats_interval_tuner.interval(switch.id)})
+                await self.controller.buffers.app.aput(event_raw)
+                if settings.FLOW_STATS_DELTA:
+                    await self._new_flow_stats_delta(switch, switch.flows)
+                return True
+
+    async def _stream_multipart_flow_stats(self, reply, switch, transaction):
+        """Emit the flows of each OFPMP_FLOW reply as soon as it arrives.
+
+        The flows aren't accumulated and ``switch.flows`` isn't updated, a
+        ``kytos/of_core.flow_stats.chunk`` event is emitted per reply
+        instead. Returns true if no more replies are expected.
+        """
+        xid = int(reply.header.xid)
+        started = time.perf_counter()
+        if isinstance(reply, LazyMessage) and not reply.is_decoded:
+            _, flags = multipart_reply_type_flags(reply.packet)
+            try:
+                flows = await self._decode_multipart_flows(reply.packet)
+            except (UnpackException, BrokenProcessPool) as err:
+                log.error(f"Skipped flow stats reply of switch {switch.id}, "
+                          f"xid {xid}, failed to decode it: {err}")
+                self._abort_multipart_transaction(switch, transaction)
+                return
+            if self._multipart_transaction(reply, switch,
+                                           'flows') is not transaction:
+                return
+            # The decode itself happened off the event loop
+            started = time.perf_counter()
+            for flow in flows:
+                flow.switch = switch
+        else:
+            flags = reply.flags.value
+            flows = [Flow04.from_of_flow_stats(of_flow_stats, switch)
+                     for of_flow_stats in reply.body]
+        transaction.decode_time += time.perf_counter() - started
+
+        last = flags % 2 == 0  # Last bit means more replies
+        if settings.COUNTER_HISTORY_SIZE:
+            history = self.counter_histories[switch.id]
+            history.record_flows(flows)
+            if last:
+                history.expire('flows')
+        index = transaction.chunks
+        transaction.chunks += 1
+        transaction.add([], int(reply.header.length))
+        if last:
+            self._finish_multipart_transaction(switch, transaction)
+            self.stats_interval_tuner.observe(
+                switch.id, transaction.size, transaction.messages,
+                transaction.decode_time)
+        event = KytosEvent(
+            name='kytos/of_core.flow_stats.chunk',
+            content={'switch': switch, 'xid': xid, 'index': index,
+                     'flows': flows, 'last': last})
+        await self.controller.buffers.app.aput(event)
+        return last
+
+    def _is_multipart_decode_offloaded(self, message):
+        """Return whether a multipart reply is left undecoded for the flow
+        stats handler.
+
+        Only OFPMP_FLOW replies are left undecoded: all of them if
+        ``settings.FLOW_STATS_REUSE`` is set, so their entries are compared
+        to the previous flows before being unpacked, and otherwise the ones
+        of at least ``settings.MULTIPART_DECODE_MIN_BYTES`` if
+        ``settings.MULTIPART_DECODE_WORKERS`` is set, to be decoded by the
+        worker processes.
+        """
+        if message.header.message_type != Type.OFPT_MULTIPART_REPLY:
+            return False
+        reuse = (settings.FLOW_STATS_REUSE and
+                 not settings.FLOW_STATS_STREAMING)
+        if not reuse and (
+            not settings.MULTIPART_DECODE_WORKERS
+            or len(message.packet) < settings.MULTIPART_DECODE_MIN_BYTES
+        ):
+            return False
+        multipart_type, _ = multipart_reply_type_flags(message.packet)
+        return multipart_type == MultipartType.OFPMP_FLOW.value
+
+    def _decode_multipart_flows(self, packet):
+        """Decode the flows of a raw OFPMP_FLOW reply in a worker process.
+
+        Returns an asyncio future with the flows, without their switch.
+        """
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(
+            self._multipart_decode_pool,
+            flows_from_multipart_reply, packet)
+
+    async def _collect_multipart_flows(self, reply, switch, transaction):
+        """Wait for the flows being decoded by the worker processes.
+
+        The flows of each reply are inserted at its position among the
+        replies of the transaction, so they keep the order in which the
+        replies were received. Returns False if a decode failed or if the
+        transaction ended while waiting.
+        """
+        decodes = transaction.decodes
+        if not decodes:
+            return True
+        transaction.decodes = []
+        xid = int(reply.header.xid)
+        try:
+            decoded_flows = await asyncio.gather(
+                *(decode for _, decode in decodes))
+        except (UnpackException, BrokenProcessPool) as err:
+            log.error(f"Skipped flow stats reply of switch {switch.id}, "
+                      f"xid {xid}, failed to decode it: {err}")
+            self._abort_multipart_transaction(switch, transaction)
+            return False
+        if self._multipart_transaction(reply, switch,
+                                       'flows') is not transaction:
+            return False
+        started = time.perf_counter()
+        for flows in decoded_flows:
+            for flow in flows:
+                flow.switch = switch
+        transaction.insert([(position, flows) for (position, _), flows
+                            in zip(decodes, decoded_flows)])
+        transaction.decode_time += time.perf_counter() - started
+        return True
+
+    async def _handle_multipart_table_stats(self, reply, switch):
+        """Update switch tables after all replies are received.
+
+        Returns true if no more replies are expected.
+        """
+        transaction = self._multipart_transaction(reply, switch, 'tables')
+        if transaction is not None:
+            # Get all tables from the reply and extend the multipar tables list
+            started = time.perf_counter()
+            tables = [TableStats.from_of_table_stats(of_table_stats, switch)
+                      for of_table_stats in reply.body]
+            transaction.add(tables, int(reply.header.length))
+            transaction.decode_time += time.perf_counter() - started
+            if reply.flags.value % 2 == 0:  # Last bit means more replies
+                replies_tables = [table for table in transaction.replies]
+                self._finish_multipart_transaction(switch, transaction)
+                self.flow_stats_policy.update_tables(switch.id,
+                                                     replies_tables)
+                if settings.COUNTER_HISTORY_SIZE:
+                    history = self.counter_histories[switch.id]
+                    history.record_tables(replies_tables)
+                    history.expire('tables')
+                event_raw = KytosEvent(
+                    name='kytos/of_core.table_stats.received',
+                    content={
+                                'switch': switch,
+                                'replies_tables': replies_tables
+                            })
+                await self.controller.buffers.app.aput(event_raw)
+                return True
+
+    async def _handle_multipart_aggregate_stats(self, reply, switch):
+        """Emit an event about the aggregate stats of the switch flows.
+
+        The flow stats are requested if the aggregate stats were requested
+        in place of them and they changed since the last ones. The aggregate
+        stats are forgotten if the flow stats aren't requested or their
+        request fails, so they're requested again in the next cycle.
+        """
+        transaction = self._multipart_transaction(reply, switch, 'aggregate')
+        if transaction is None:
+            return
+        self.multipart_transactions.finish(switch.id, transaction.xid)
+        aggregate_stats = {
+            'flow_count': sum(stats.flow_count.value for stats in reply.body),
+            'packet_count': sum(stats.packet_count.value
+                                for stats in reply.body),
+            'byte_count': sum(stats.byte_count.value for stats in reply.body),
+        }
+        last_aggregate_stats = self._aggregate_stats.get(switch.id)
+        self._aggregate_stats[switch.id] = aggregate_stats
+        if (
+            aggregate_stats != last_aggregate_stats
+            and await self._request_flow_stats(switch) is None
+        ):
+            self._aggregate_stats.pop(switch.id, None)
+        self._release_stats_request(switch)
+        event = KytosEvent(
+            name='kytos/of_core.aggregate_stats.received',
+            content={'switch': switch, **aggregate_stats})
+        await self.controller.buffers.app.aput(event)
+        return True
+
+    async def _handle_multipart_port_stats(self, reply, switch):
+        """Emit an event about new port stats."""
+        transaction = self._multipart_transaction(reply, switch, 'ports')
+        if transaction is not None:
+            started = time.perf_counter()
+            port_stats = [PortStats.from_of_port_stats(of_port_stats)
+                          for of_port_stats in reply.body]
+            transaction.add(port_stats, int(reply.header.length))
+            transaction.decode_time += time.perf_counter() - started
+            if reply.flags.value % 2 == 0:
+                await self._new_port_stats(switch, transaction)
+
+    def _update_switch_flows(self, switch, transaction):
+        """Update controllers' switch flow list and clean resources.
+
+        Only the flows requested by the flow stats policy are replaced.
+        """
+        switch.flows = self.flow_stats_policy.merge(
+            switch, transaction.replies, transaction.flow_filter)
+        self._finish_multipart_transaction(switch, transaction)
+        self.flow_lookups[switch.id].update(switch.flows)
+        if settings.FLOW_STATS_REUSE:
+            self.flow_interners[switch.id].retain(switch.flows)
+        if settings.FLOW_ID_MAP:
+            self.flow_id_maps[switch.id].update(switch.flows)
+
+    async def _new_flow_stats_delta(self, switch, flows):
+        """Diff the flows against the previous dump and send the delta."""
+        delta = self.flow_indexes[switch.id].update(flows)
+        event = KytosEvent(
+            name='kytos/of_core.flow_stats.delta',
+            content={'switch': switch, **delta.as_dict()})
+        await self.controller.buffers.app.aput(event)
+
+    async def _new_port_stats(self, switch, transaction):
+        """Send an event with the new port stats and clean resources.
+
+        The rates of each port since its previous sample are sent along.
+        """
+        all_port_stats = transaction.replies
+        self._finish_multipart_transaction(switch, transaction)
+        port_rates = self.port_stats_indexes[switch.id].update(all_port_stats)
+        if settings.COUNTER_HISTORY_SIZE:
+            history = self.counter_histories[switch.id]
+            history.record_ports(all_port_stats)
+            history.expire('ports')
+        port_stats_event = KytosEvent(
+            name="kytos/of_core.port_stats",
+            content={
+                'switch': switch,
+                'port_stats': all_port_stats,
+                'port_rates': port_rates
+                })
+        await self.controller.buffers.app.aput(port_stats_event)
+
+    def _is_multipart_reply_ours(self, reply, switch, stat):
+        """Return whether we are expecting the reply."""
+        return self._multipart_transaction(reply, switch, stat) is not None
+
+    def _multipart_transaction(self, reply, switch, stat):
+        """Return the transaction of a reply to our request, or None."""
+        return self.multipart_transactions.get(switch.id,
+                                               int(reply.header.xid), stat)
+
+    def _finish_multipart_transaction(self, switch, transaction):
+        """End a transaction and release the stats request slot if it was
+        the last one of the switch."""
+        self.multipart_transactions.finish(switch.id, transaction.xid)
+        self._release_stats_request(switch)
+
+    def _abort_multipart_transaction(self, switch, transaction):
+        """End a flow stats transaction whose replies couldn't be handled.
+
+        The tables it requested are requested again by the next one.
+        """
+        self._finish_multipart_transaction(switch, transaction)
+        self._retry_flow_stats(switch, transaction)
+
+    def _retry_flow_stats(self, switch, transaction):
+        """Request again the flows of a failed flow stats transaction.
+
+        Its tables are restored in the flow stats policy and the last
+        aggregate stats are forgotten, so the next cycle requests them even
+        if the aggregate stats didn't change.
+        """
+        if transaction.stat != 'flows':
+            return
+        if transaction.flow_filter is not None:
+            self.flow_stats_policy.restore(switch.id, transaction.flow_filter)
+        self._aggregate_stats.pop(switch.id, None)
+
+    def pop_multipart_replies(self, switch) -> None:
+        """Pop multipart replies."""
+        self.multipart_transactions.pop(switch.id)
+        self.stats_scheduler.release(switch.id)
+        self.flow_stats_policy.pop(switch.id)
+        self._aggregate_stats.pop(switch.id, None)
+        self.port_stats_indexes.pop(switch.id, None)
+        self.counter_histories.pop(switch.id, None)
+        self.flow_indexes.pop(switch.id, None)
+        self.flow_id_maps.pop(switch.id, None)
+        self.flow_lookups.pop(switch.id, None)
+        self.flow_interners.pop(switch.id, None)
+        self.stats_interval_tuner.pop(switch.id)
@@ -0,0 +1,141 @@
+"""Per switch flow stats interval tuned from the cost of its replies."""
+from napps.kytos.of_core import settings
+
+
+class ReplyCost:
+    """Smoothed cost of the multipart replies to a stats request."""
+
+    __slots__ = ('size', 'messages', 'decode_time')
+
+    def __init__(self, size=0, messages=0, decode_time=0.0):
+        """Assign parameters to attributes.
+
+        Args:
+            size (int): Bytes of the replies.
+            messages (int): Number of replies.
+            decode_time (float): Seconds spent decoding and handling them.
+        """
+        self.size = size
+        self.messages = messages
+        self.decode_time = decode_time
+
+    def update(self, other, smoothing):
+        """Move the cost towards the cost of the last replies.
+
+        Args:
+            other (ReplyCost): Cost of the last replies.
+            smoothing (float): Weight of the last replies, 1 to replace the
+                cost.
+        """
+        for attr in self.__slots__:
+            value = getattr(self, attr)
+            setattr(self, attr,
+                    value + (getattr(other, attr) - value) * smoothing)
+
+    def as_dict(self):
+        """Return the cost as a serializable Python dictionary."""
+        return {attr: getattr(self, attr) for attr in self.__slots__}
+
+
+class StatsIntervalTuner:
+    """Choose the flow stats interval of each switch from its reply cost.
+
+    The CPU budget, a fraction of a CPU spent handling flow stats replies,
+    is shared evenly by the switches whose cost is known. Each switch gets
+    the interval at which its last decode times fit in its share, within
+    the minimum and maximum intervals, so switches with large flow tables
+    are polled less often than the small ones. Flow stats are requested
+    along with the other stats every ``settings.STATS_INTERVAL``, so the
+    effective interval is rounded to a multiple of it.
+    """
+
+    def __init__(self, min_interval=None, max_interval=None, cpu_budget=None,
+                 cycle=None, smoothing=0.5):
+        """Initialize the tuner without any switch cost.
+
+        Args:
+            min_interval (float): Shortest interval, in seconds. Defaults to
+                ``settings.FLOW_STATS_INTERVAL_MIN``.
+            max_interval (float): Longest interval, in seconds. Defaults to
+                ``settings.FLOW_STATS_INTERVAL_MAX``.
+            cpu_budget (float): Fraction of a CPU for the flow stats
+                replies. Defaults to ``settings.FLOW_STATS_CPU_BUDGET``, 0
+                keeps every switch at the minimum interval.
+            cycle (float): Interval of the stats requests. Defaults to
+                ``settings.STATS_INTERVAL``.
+            smoothing (float): Weight of the last replies in the cost.
+        """
+        if min_interval is None:
+            min_interval = settings.FLOW_STATS_INTERVAL_MIN
+        if max_interval is None:
+            max_interval = settings.FLOW_STATS_INTERVAL_MAX
+        if cpu_budget is None:
+            cpu_budget = settings.FLOW_STATS_CPU_BUDGET
+        if cycle is None:
+            cycle = settings.STATS_INTERVAL
+        self.min_interval = min_interval
+        self.max_interval = max(max_interval, min_interval)
+        self.cpu_budget = cpu_budget
+        self.cycle = cycle
+        self.smoothing = smoothing
+        self._costs = {}
+        self._last_requests = {}
+
+    def __len__(self):
+        return len(self._costs)
+
+    def observe(self, switch_id, size, messages, decode_time):
+        """Account the cost of the replies to a flow stats request.
+
+        Args:
+            switch_id (str): Switch id.
+            size (int): Bytes of the replies.
+            messages (int): Number of replies.
+            decode_time (float): Seconds spent decoding and handling them.
+        """
+        cost = ReplyCost(size, messages, decode_time)
+        if switch_id in self._costs:
+            self._costs[switch_id].update(cost, self.smoothing)
+        else:
+            self._costs[switch_id] = cost
+
+    def cost(self, switch_id):
+        """Return the smoothed ReplyCost of a switch, or None."""
+        return self._costs.get(switch_id)
+
+    def interval(self, switch_id):
+        """Return the flow stats interval of a switch, in seconds."""
+        cost = self._costs.get(switch_id)
+        if cost is None or not self.cpu_budget:
+            return self.min_interval
+        share = self.cpu_budget / len(self._costs)
+        return min(max(cost.decode_time / share, self.min_interval),
+                   self.max_interval)
+
+    def is_due(self, switch_id, now):
+        """Return whether the flow stats of a switch should be requested.
+
+        Args:
+            switch_id (str): Switch id.
+            now (float): Current time, in seconds, of a monotonic clock.
+        """
+        last_request = self._last_requests.get(switch_id)
+        if last_request is None:
+            return True
+        # Half a cycle of tolerance, as requests are jittered
+        return now - last_request >= self.interval(switch_id) - self.cycle / 2
+
+    def requested(self, switch_id, now):
+        """Keep the time at which the flow stats of a switch were requested.
+        """
+        self._last_requests[switch_id] = now
+
+    def pop(self, switch_id):
+        """Remove the state of a switch."""
+        self._costs.pop(switch_id, None)
+        self._last_requests.pop(switch_id, None)
+
+    def as_dict(self, switch_id):
+        """Return the interval and the cost of a switch as a dictionary."""
+        cost = self._costs.get(switch_id) or ReplyCost()
+        return {'interval': self.interval(switch_id), **cost.as_dict()}
@@ -0,0 +1,127 @@
+"""Scheduling of the periodic stats requests sent to the switches."""
+import asyncio
+import random
+import time
+import zlib
+from collections import deque
+
+from napps.kytos.of_core import settings
+
+
+class StatsScheduler:
+    """Spread the stats requests of the switches over the stats interval.
+
+    Each switch gets a stable phase within ``settings.STATS_INTERVAL``, derived
+    from its id, plus a small random jitter every cycle, so the requests and
+    the replies aren't all handled at the same moment. The number of switches
+    with stats requests in flight, that is, whose replies haven't all been
+    received yet, is bounded by ``settings.STATS_MAX_IN_FLIGHT``.
+
+    Slots are acquired on the event loop, but they can be released from any
+    thread.
+    """
+
+    def __init__(self, interval=None, max_in_flight=None, jitter=None):
+        """Initialize the scheduler without requests in flight.
+
+        Args:
+            interval (float): Stats interval, in seconds. Defaults to
+                ``settings.STATS_INTERVAL``.
+            max_in_flight (int): Maximum number of switches with requests in
+                flight. Defaults to ``settings.STATS_MAX_IN_FLIGHT``, 0
+                disables the limit.
+            jitter (float): Maximum random delay added to the phase, in
+                seconds. Defaults to ``settings.STATS_JITTER``.
+        """
+        if interval is None:
+            interval = settings.STATS_INTERVAL
+        if max_in_flight is None:
+            max_in_flight = settings.STATS_MAX_IN_FLIGHT
+        if jitter is None:
+            jitter = settings.STATS_JITTER
+        self.interval = interval
+        self.max_in_flight = max_in_flight
+        self.jitter = jitter
+        self._in_flight = {}
+        self._waiters = deque()
+
+    def __len__(self):
+        return len(self._in_flight)
+
+    def __contains__(self, switch_id):
+        return switch_id in self._in_flight
+
+    def phase(self, switch_id):
+        """Return the stable offset of a switch within the interval."""
+        return zlib.crc32(switch_id.encode()) / 2 ** 32 * self.interval
+
+    def delay(self, switch_id, now):
+        """Return the time until the next phase of a switch plus a jitter.
+
+        Args:
+            switch_id (str): Switch id.
+            now (float): Current time, in seconds, of a monotonic clock.
+        """
+        return ((self.phase(switch_id) - now) % self.interval +
+                random.uniform(0, self.jitter))
+
+    async def acquire(self, switch_id, timeout=None):
+        """Wait for a free slot and mark a switch as having requests in flight.
+
+        A switch already in flight keeps its slot. Slots held for longer than
+        the interval are considered lost and are freed.
+
+        Args:
+            switch_id (str): Switch id.
+            timeout (float): Maximum time to wait, in seconds. Defaults to
+                the interval.
+
+        Returns:
+            bool: False if no slot was freed before the timeout.
+        """
+        if timeout is None:
+            timeout = self.interval
+        if switch_id not in self._in_flight and self.max_in_flight:
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            while not self._has_slot():
+                waiter = loop.create_future()
+                self._waiters.append(waiter)
+                try:
+                    await asyncio.wait_for(waiter, deadline - loop.time())
+                except asyncio.TimeoutError:
+                    return False
+                finally:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+        self._in_flight[switch_id] = time.monotonic()
+        return True
+
+    def release(self, switch_id):
+        """Free the slot of a switch whose replies have been received."""
+        if self._in_flight.pop(switch_id, None) is not None:
+            self._wake()
+
+    def _wake(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.get_loop().call_soon_threadsafe(self._resolve, waiter)
+                return
+
+    def _resolve(self, waiter):
+        if waiter.done():
+            # It timed out meanwhile, so the slot goes to the next waiter
+            self._wake()
+        else:
+            waiter.set_result(None)
+
+    def _has_slot(self):
+        self._expire()
+        return len(self._in_flight) < self.max_in_flight
+
+    def _expire(self):
+        expired = time.monotonic() - self.interval
+        for switch_id, started in list(self._in_flight.items()):
+            if started < expired:
+                del self._in_flight[switch_id]
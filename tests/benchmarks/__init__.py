@@ -0,0 +1 @@
+"""Benchmarks of the of_core NApp, run as scripts."""
@@ -0,0 +1,52 @@
+"""Benchmark the cached ``Flow.id``, ``Flow.match_id`` and
+``Flow.fingerprint``.
+
+Run it with the NApp importable as ``napps.kytos.of_core``::
+
+    python -m tests.benchmarks.bench_flow_ids [flows]
+
+The first pass over the flows computes the ids, the following ones only
+check the snapshot of the hashed attributes of each flow. The computed
+``Flow.fingerprint`` is compared with the computed ``Flow.id``.
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+from napps.kytos.of_core.v0x04.flow import (ActionOutput, Flow,
+                                            InstructionApplyAction, Match)
+
+
+def get_flows(count):
+    """Return flows with distinct matches, priorities and cookies."""
+    switch = SimpleNamespace(id='00:00:00:00:00:00:00:01')
+    return [Flow(switch, table_id=index % 4,
+                 match=Match(in_port=index % 48 + 1, dl_vlan=index % 4096),
+                 priority=index % 1000, cookie=index,
+                 instructions=[InstructionApplyAction(
+                     [ActionOutput(index % 48 + 1)])])
+            for index in range(count)]
+
+
+def timed(func, flows):
+    """Return the seconds spent calling func on every flow."""
+    started = time.perf_counter()
+    for flow in flows:
+        func(flow)
+    return time.perf_counter() - started
+
+
+def main(count=100000):
+    """Print the time to get the ids of the flows, cold and cached."""
+    flows = get_flows(count)
+    for name, func in (('id', lambda flow: flow.id),
+                       ('match_id', lambda flow: flow.match_id),
+                       ('fingerprint', lambda flow: flow.fingerprint)):
+        cold = timed(func, flows)
+        cached = min(timed(func, flows) for _ in range(3))
+        print(f"{count} flows, Flow.{name}: {cold:.3f}s computed, "
+              f"{cached:.3f}s cached, {cold / cached:.1f}x")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,63 @@
+"""Benchmark the memory held by the flows of a switch.
+
+Run it with the NApp importable as ``napps.kytos.of_core``::
+
+    python -m tests.benchmarks.bench_flow_memory [flows]
+
+Flows are built like the ones of a flow stats reply, with a few match
+fields, an apply actions instruction and their stats, and the bytes
+allocated per flow are measured with ``tracemalloc``.
+"""
+import gc
+import sys
+import tracemalloc
+from types import SimpleNamespace
+
+from napps.kytos.of_core.flow import FlowStats
+from napps.kytos.of_core.v0x04.flow import (ActionOutput, ActionSetVlan,
+                                            Flow, InstructionApplyAction,
+                                            Match)
+
+
+def get_flow(switch, index):
+    """Return a flow with a distinct match, priority and cookie."""
+    stats = FlowStats()
+    stats.byte_count = index * 64
+    stats.duration_sec = index
+    stats.duration_nsec = 0
+    stats.packet_count = index
+    return Flow(switch, table_id=index % 4,
+                match=Match(in_port=index % 48 + 1, dl_vlan=index % 4096,
+                            dl_type=0x800, nw_dst=f'10.0.{index % 256}.0/24'),
+                priority=index % 1000, cookie=index,
+                instructions=[InstructionApplyAction(
+                    [ActionSetVlan(index % 4096),
+                     ActionOutput(index % 48 + 1)])],
+                stats=stats)
+
+
+def measure(count):
+    """Return the bytes allocated per flow and per match."""
+    switch = SimpleNamespace(id='00:00:00:00:00:00:00:01')
+    gc.collect()
+    tracemalloc.start()
+    flows = [get_flow(switch, index) for index in range(count)]
+    flows_size = tracemalloc.get_traced_memory()[0]
+    matches = [flow.match for flow in flows]
+    del flows
+    gc.collect()
+    matches_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del matches
+    return flows_size / count, matches_size / count
+
+
+def main(count=100000):
+    """Print the bytes per flow and per match."""
+    per_flow, per_match = measure(count)
+    print(f"{count} flows: {per_flow:.0f} bytes per flow, "
+          f"{per_match:.0f} bytes per match")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,80 @@
+"""Benchmark decoding flow stats replies with and without reusing the flows.
+
+Run it with the NApp importable as ``napps.kytos.of_core``::
+
+    python -m tests.benchmarks.bench_flow_reuse [flows] [changed]
+
+The same replies are decoded again with the counters of every flow changed
+and the match of ``changed`` percent of them changed, like a poll of a
+switch whose flows mostly only count packets.
+"""
+import sys
+import time
+from types import SimpleNamespace
+
+from napps.kytos.of_core.v0x04.flow import (ActionOutput, Flow, FlowInterner,
+                                            InstructionApplyAction, Match)
+from pyof.utils import unpack
+from pyof.v0x04.controller2switch.common import MultipartType
+from pyof.v0x04.controller2switch.multipart_reply import (FlowStats,
+                                                          MultipartReply)
+
+
+#: Flows per reply, replies are limited to 64KB
+REPLY_FLOWS = 500
+
+
+def get_replies(count, packet_count=0, changed=0):
+    """Return raw OFPMP_FLOW replies with count flows."""
+    body = []
+    for index in range(count):
+        in_port = index % 48 + 1
+        if index < changed:
+            in_port += 48
+        flow = Flow(None, match=Match(in_port=in_port, dl_vlan=index % 4096),
+                    priority=index % 1000, cookie=index,
+                    instructions=[InstructionApplyAction(
+                        [ActionOutput(index % 48 + 1)])])
+        flow_mod = flow.as_of_add_flow_mod()
+        flow_stats = FlowStats(length=0, table_id=0, duration_sec=index,
+                               duration_nsec=0, priority=flow.priority,
+                               idle_timeout=0, hard_timeout=0, flags=0,
+                               cookie=flow.cookie, packet_count=packet_count,
+                               byte_count=packet_count * 64,
+                               match=flow_mod.match,
+                               instructions=flow_mod.instructions)
+        flow_stats.length = flow_stats.get_size()
+        body.append(flow_stats)
+    return [MultipartReply(xid=1, multipart_type=MultipartType.OFPMP_FLOW,
+                           flags=0,
+                           body=body[start:start + REPLY_FLOWS]).pack()
+            for start in range(0, count, REPLY_FLOWS)]
+
+
+def main(count=10000, changed=1):
+    """Print the time to decode the replies with and without the interner.
+    """
+    switch = SimpleNamespace(id='00:00:00:00:00:00:00:01')
+    first = get_replies(count)
+    second = get_replies(count, packet_count=10,
+                         changed=count * changed // 100)
+
+    started = time.perf_counter()
+    flows = [Flow.from_of_flow_stats(of_flow_stats, switch)
+             for packet in second for of_flow_stats in unpack(packet).body]
+    unpacked = time.perf_counter() - started
+
+    interner = FlowInterner()
+    interner.retain([flow for packet in first for flow
+                     in interner.flows_from_multipart_reply(packet, switch)])
+    started = time.perf_counter()
+    reused = [flow for packet in second for flow
+              in interner.flows_from_multipart_reply(packet, switch)]
+    interned = time.perf_counter() - started
+    assert [flow.id for flow in reused] == [flow.id for flow in flows]
+    print(f"{count} flows, {changed}% changed: {unpacked:.3f}s unpacked, "
+          f"{interned:.3f}s reused, {unpacked / interned:.1f}x")
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -4,7 +4,9 @@ from unittest.mock import MagicMock
 import pytest
 from pyof.foundation.basic_types import UBInt32
 
+from napps.kytos.of_core.flow import attributes
 from napps.kytos.of_core.v0x04.flow import Action as Action04
+from napps.kytos.of_core.v0x04.flow import ActionOutput
 
 # pylint: disable=protected-access,unnecessary-lambda-assignment
 
@@ -69,3 +71,20 @@ def test_add_experimenter_classes():
     experimenter, func = 0xff000002, lambda body: resp
     Action04.add_experimenter_classes(experimenter, func)
     assert Action04._experimenter_classes[experimenter] == func
+
+
+def test_slotted_action():
+    """Test the attributes of slotted actions and of their subclasses."""
+    action = ActionOutput(1)
+    assert not hasattr(action, '__dict__')
+    assert action.as_dict() == {'port': 1, 'action_type': 'output'}
+
+    class ActionOutputQueue(ActionOutput):
+        """Action without slots of its own."""
+
+        def __init__(self, port, queue_id):
+            super().__init__(port)
+            self.queue_id = queue_id
+
+    assert attributes(ActionOutputQueue(1, 2)) == {
+        'port': 1, 'action_type': 'output', 'queue_id': 2}
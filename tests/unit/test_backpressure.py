@@ -0,0 +1,88 @@
+"""Test backpressure module."""
+import pytest
+from pyof.v0x04.common.header import Type
+
+from napps.kytos.of_core import settings
+from napps.kytos.of_core.backpressure import MsgInBackpressure
+
+
+class TestMsgInBackpressure:
+    """Test MsgInBackpressure."""
+
+    def test_check(self):
+        """Test pausing at the high watermark and resuming at the low one."""
+        backpressure = MsgInBackpressure(10, 5, [])
+        assert not backpressure.check(9)
+        assert backpressure.check(10)
+        assert backpressure.check(6)
+        assert not backpressure.check(5)
+        assert not backpressure.check(9)
+
+    def test_check_connection(self):
+        """Test pausing only the connections with events in msg_in."""
+        backpressure = MsgInBackpressure(10, 1, [], 4, 2)
+        backpressure.count_in('conn1', 9)
+        backpressure.count_in('conn2', 3)
+        assert not backpressure.check(9, 'conn1')
+        assert backpressure.check(10, 'conn1')
+        assert not backpressure.check(10, 'conn2')
+        backpressure.pause('conn1')
+
+        # The events are drained in proportion to each connection's
+        assert backpressure.check(6, 'conn1')
+        assert backpressure.queued == {'conn1': pytest.approx(4.5),
+                                       'conn2': pytest.approx(1.5)}
+        assert not backpressure.check(2, 'conn1')
+        assert backpressure.queued == {'conn1': pytest.approx(1.5)}
+        backpressure.resume('conn1')
+        assert not backpressure.check(2, 'conn1')
+        backpressure.count_in('conn1', 3)
+        assert backpressure.check(5, 'conn1')
+
+    def test_check_connection_disabled(self):
+        """Test a connection high watermark of 0 pausing every connection."""
+        backpressure = MsgInBackpressure(10, 5, [], 0, 0)
+        assert backpressure.check(10, 'conn1')
+
+    def test_discard(self):
+        """Test forgetting the events of a connection."""
+        backpressure = MsgInBackpressure(10, 5, [], 4, 2)
+        backpressure.count_in('conn1', 8)
+        backpressure.count_in('conn2', 2)
+        backpressure.discard('conn1')
+        backpressure.discard('conn3')
+        assert backpressure.queued == {'conn2': 2}
+        assert not backpressure.check(10, 'conn2')
+
+    def test_check_disabled(self):
+        """Test a high watermark of 0 never pausing."""
+        backpressure = MsgInBackpressure(0, 0, [])
+        assert not backpressure.check(10 ** 6)
+
+    def test_shed_types(self):
+        """Test shed types ordered from the lowest priority."""
+        backpressure = MsgInBackpressure(
+            10, 5, ['OFPT_PACKET_IN', 'OFPT_BARRIER_REPLY']
+        )
+        assert backpressure.shed_types == [Type.OFPT_BARRIER_REPLY.value,
+                                           Type.OFPT_PACKET_IN.value]
+
+    def test_counters(self):
+        """Test the paused and shed counters."""
+        backpressure = MsgInBackpressure(10, 5, ['OFPT_PACKET_IN'])
+        backpressure.check(10)
+        backpressure.pause('conn1')
+        backpressure.pause('conn2')
+        backpressure.resume('conn2')
+        backpressure.count_shed({Type.OFPT_PACKET_IN.value: 3})
+        backpressure.count_shed({Type.OFPT_PACKET_IN.value: 2})
+        assert backpressure.as_dict() == {
+            'is_paused': True,
+            'high_watermark': 10,
+            'low_watermark': 5,
+            'conn_high_watermark': settings.MSG_IN_CONN_HIGH_WATERMARK,
+            'conn_low_watermark': settings.MSG_IN_CONN_LOW_WATERMARK,
+            'paused_connections': 1,
+            'pauses': 2,
+            'shed': {'ofpt_packet_in': 5},
+        }
@@ -0,0 +1,104 @@
+"""Test connection_context module."""
+import asyncio
+from unittest.mock import MagicMock
+
+from napps.kytos.of_core.connection_context import (ConnectionContext,
+                                                    ConnectionContexts)
+
+
+class TestConnectionContexts:
+    """Test ConnectionContexts."""
+
+    @staticmethod
+    def get_connection(connection_id, alive=True):
+        """Return a connection mock."""
+        connection = MagicMock(id=connection_id)
+        connection.is_alive.return_value = alive
+        return connection
+
+    def test_get_or_create(self):
+        """Test a context being created once per connection."""
+        contexts = ConnectionContexts(max_size=10)
+        connection = self.get_connection('conn1')
+        context = contexts.get_or_create(connection)
+        assert isinstance(context, ConnectionContext)
+        assert context.connection == connection
+        assert contexts.get_or_create(connection) is context
+        assert contexts.get('conn1') is context
+        assert 'conn1' in contexts
+        assert len(contexts) == 1
+
+    def test_pop(self):
+        """Test removing a context."""
+        contexts = ConnectionContexts(max_size=10)
+        context = contexts.get_or_create(self.get_connection('conn1'))
+        assert contexts.pop('conn1') is context
+        assert contexts.pop('conn1') is None
+        assert contexts.get('conn1') is None
+        assert not contexts
+
+    def test_pause_reading(self):
+        """Test pausing and resuming the reads of a connection once."""
+        connection = self.get_connection('conn1')
+        context = ConnectionContext(connection)
+        context.resume_reading()
+        context.pause_reading()
+        context.pause_reading()
+        assert context.is_reading_paused
+        connection.socket.pause_reading.assert_called_once()
+        context.resume_reading()
+        context.resume_reading()
+        assert not context.is_reading_paused
+        connection.socket.resume_reading.assert_called_once()
+
+        connection.is_alive.return_value = False
+        context.pause_reading()
+        context.resume_reading()
+        assert connection.socket.resume_reading.call_count == 1
+
+    def test_prune(self):
+        """Test dead connections being pruned once max_size is reached."""
+        contexts = ConnectionContexts(max_size=2)
+        dead = self.get_connection('conn1')
+        contexts.get_or_create(dead)
+        contexts.get_or_create(self.get_connection('conn2'))
+        dead.is_alive.return_value = False
+
+        contexts.get_or_create(self.get_connection('conn3'))
+        assert 'conn1' not in contexts
+        assert len(contexts) == 2
+
+        contexts.get_or_create(self.get_connection('conn4'))
+        assert len(contexts) == 3
+
+    async def test_consumer_task(self):
+        """Test the consumer task started and cancelled with the context."""
+        consumer = MagicMock(side_effect=lambda context: asyncio.sleep(10))
+        contexts = ConnectionContexts(consumer, max_size=10)
+        context = contexts.get_or_create(self.get_connection('conn1'))
+        consumer.assert_called_with(context)
+        assert not context.task.done()
+
+        contexts.pop('conn1')
+        await asyncio.sleep(0)
+        assert context.task.cancelled()
+
+        context = contexts.get_or_create(self.get_connection('conn2'))
+        contexts.clear()
+        await asyncio.sleep(0)
+        assert context.task.cancelled()
+        assert not contexts
+
+    async def test_stats_task(self):
+        """Test the stats task cancelled with the context."""
+        poller = MagicMock(side_effect=lambda context: asyncio.sleep(10))
+        contexts = ConnectionContexts(max_size=10)
+        context = contexts.get_or_create(self.get_connection('conn1'))
+        assert context.stats_task is None
+        context.start_stats(poller)
+        poller.assert_called_with(context)
+        assert context.stats_task.get_name() == 'of_core.stats.conn1'
+
+        contexts.pop('conn1')
+        await asyncio.sleep(0)
+        assert context.stats_task.cancelled()
@@ -0,0 +1,88 @@
+"""Test counter_history module."""
+from unittest.mock import MagicMock
+
+from napps.kytos.of_core.counter_history import CounterHistory, CounterRing
+from napps.kytos.of_core.port_stats import PortStats
+
+
+def get_flow_mock(flow_id, packet_count, byte_count):
+    """Return a flow mock with its counters."""
+    flow = MagicMock(id=flow_id)
+    flow.stats.packet_count = packet_count
+    flow.stats.byte_count = byte_count
+    return flow
+
+
+class TestCounterRing:
+    """Test CounterRing."""
+
+    def test_append(self):
+        """Test overwriting the oldest samples once it's full."""
+        ring = CounterRing(3, ('packet_count', 'byte_count'))
+        assert ring.last_timestamp is None
+        for second in range(5):
+            ring.append(second, (second, second * 64))
+        assert len(ring) == 3
+        assert ring.last_timestamp == 4
+        assert ring.samples('byte_count') == [(2, 128), (3, 192), (4, 256)]
+        assert ring.samples('packet_count', since=3) == [(3, 3), (4, 4)]
+
+
+class TestCounterHistory:
+    """Test CounterHistory."""
+
+    def test_record_flows_and_rate(self):
+        """Test the rate of a flow over a window."""
+        history = CounterHistory(4, 100)
+        for second, packets in ((0, 0), (10, 100), (20, 300), (30, 600)):
+            history.record_flows([get_flow_mock('a', packets, packets * 10)],
+                                 second)
+        assert history.rate('flows', 'a', 'packet_count') == 20
+        assert history.rate('flows', 'a', 'packet_count', 10, 30) == 30
+        assert history.rate('flows', 'a', 'byte_count', 5, 30) is None
+        assert history.rate('flows', 'b', 'packet_count') is None
+        assert history.rates('flows', 'a', 'packet_count') == [10, 20, 30]
+
+    def test_percentile(self):
+        """Test the percentiles of the rates of a counter."""
+        history = CounterHistory(11, 100)
+        for second in range(11):
+            history.record_ports([PortStats(1, rx_bytes=second ** 2)], second)
+        assert history.percentile('ports', 1, 'rx_bytes', 50) == 9
+        assert history.percentile('ports', 1, 'rx_bytes', 95) == 19
+        assert history.percentile('ports', 1, 'rx_bytes', 0) == 1
+        assert history.percentile('ports', 2, 'rx_bytes', 50) is None
+
+    def test_reset_counter(self):
+        """Test ignoring the intervals in which a counter went backwards."""
+        history = CounterHistory(4, 100)
+        for second, packets in ((0, 100), (10, 200), (20, 50)):
+            history.record_flows([get_flow_mock('a', packets, 0)], second)
+        assert history.rates('flows', 'a', 'packet_count') == [10]
+        assert history.rate('flows', 'a', 'packet_count') is None
+
+    def test_top(self):
+        """Test the keys with the highest rates."""
+        history = CounterHistory(4, 100)
+        tables = [MagicMock(table_id=table_id, lookup_count=0,
+                            matched_count=0) for table_id in range(3)]
+        history.record_tables(tables, 0)
+        for table in tables:
+            table.lookup_count = (table.table_id + 1) * 100
+        history.record_tables(tables[1:], 10)
+        assert history.top('tables', 'lookup_count', 5) == [(2, 30),
+                                                            (1, 20)]
+        assert history.top('tables', 'lookup_count', 1) == [(2, 30)]
+
+    def test_max_age(self):
+        """Test dropping the rings without recent samples."""
+        history = CounterHistory(4, 30)
+        history.record_flows([get_flow_mock('a', 0, 0),
+                              get_flow_mock('b', 0, 0)], 0)
+        history.record_flows([get_flow_mock('a', 1, 1)], 20)
+        history.expire('flows', 20)
+        assert len(history) == 2
+        history.record_flows([get_flow_mock('a', 2, 2)], 40)
+        assert len(history) == 2
+        history.expire('flows', 40)
+        assert history.keys('flows') == ['a']
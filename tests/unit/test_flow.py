@@ -1,9 +1,18 @@
 """Tests for high-level Flow of OpenFlow 1.3."""
+import pickle
 from unittest.mock import MagicMock, patch
 import pytest
 from kytos.lib.helpers import get_connection_mock, get_switch_mock
+from napps.kytos.of_core.flow import FlowStats, pack_value
 from napps.kytos.of_core.v0x04.flow import Flow as Flow04
+from napps.kytos.of_core.v0x04.flow import FlowInterner
 from napps.kytos.of_core.v0x04.flow import Match as Match04
+from napps.kytos.of_core.v0x04.flow import flows_from_multipart_reply
+from pyof.v0x04.common.action import ActionGroup, ActionOutput
+from pyof.v0x04.common.flow_instructions import InstructionApplyAction
+from pyof.v0x04.common.flow_match import Match as OFMatch
+from pyof.v0x04.controller2switch.multipart_reply import \
+    FlowStats as OFFlowStats
 
 
 @pytest.mark.parametrize(
@@ -37,6 +46,85 @@ def test_equivalent_flow_ids(flow1_dict, flow2_dict):
     assert flow1.id == flow2.id
 
 
+def test_flows_from_multipart_reply():
+    """Test flows_from_multipart_reply decoding switchless flows."""
+    packet = bytes.fromhex(
+        '0413008000000abc0001000000000000003801000000000000000000000a0000'
+        '0000000000000000000000000000000700000000000000000000000000000000'
+        '0001000400000000003802000000000000000000001400000000000000000000'
+        '0000000000000000000000000000000000000000000000000001000400000000'
+    )
+    flows = pickle.loads(pickle.dumps(flows_from_multipart_reply(packet)))
+    assert [flow.table_id for flow in flows] == [1, 2]
+    assert [flow.priority for flow in flows] == [10, 20]
+    assert [flow.cookie for flow in flows] == [7, 0]
+    assert all(flow.switch is None for flow in flows)
+
+
+def test_flow_interner():
+    """Test reusing the flows whose entries only changed their counters."""
+    packet = bytes.fromhex(
+        '0413008000000abc0001000000000000003801000000000000000000000a0000'
+        '0000000000000000000000000000000700000000000000000000000000000000'
+        '0001000400000000003802000000000000000000001400000000000000000000'
+        '0000000000000000000000000000000000000000000000000001000400000000'
+    )
+    switch = MagicMock(id='00:00:00:00:00:00:00:01')
+    interner = FlowInterner()
+    flows = interner.flows_from_multipart_reply(packet, switch)
+    assert [flow.priority for flow in flows] == [10, 20]
+    assert all(flow.switch is switch for flow in flows)
+    interner.retain(flows)
+    assert len(interner) == 2
+
+    # Counters of the first entry and priority of the second one changed
+    packet = (packet[:20] + (5).to_bytes(4, 'big') + packet[24:48] +
+              (3).to_bytes(8, 'big') + (192).to_bytes(8, 'big') +
+              packet[64:84] + (30).to_bytes(2, 'big') + packet[86:])
+    new_flows = interner.flows_from_multipart_reply(packet, switch)
+    assert new_flows[0] is flows[0]
+    assert flows[0].stats.as_dict() == {
+        'duration_sec': 5, 'duration_nsec': 0, 'packet_count': 3,
+        'byte_count': 192}
+    assert new_flows[1] is not flows[1]
+    assert new_flows[1].priority == 30
+
+    interner.retain(new_flows[1:])
+    assert len(interner) == 1
+    assert interner.flows_from_multipart_reply(packet, switch)[1] is \
+        new_flows[1]
+
+
+def test_flow_stats_slots():
+    """Test the slotted flow stats from and to dict."""
+    stats = FlowStats.from_dict({'packet_count': 1, 'byte_count': 64,
+                                 'unknown': 2})
+    assert not hasattr(stats, '__dict__')
+    assert stats.as_dict() == {'packet_count': 1, 'byte_count': 64}
+
+
+def test_pack_value():
+    """Test the binary encoding of the flow attribute values."""
+    parts = []
+    pack_value([1, 'AB', None, True, {'b': 2.0, 'a': -1}, 2 ** 64],
+               parts.append)
+    assert b''.join(parts) == (
+        b't\x00\x00\x00\x06'
+        b'i\x00\x00\x00\x00\x00\x00\x00\x01'
+        b's\x00\x00\x00\x02ab'
+        b'n'
+        b'T'
+        b't\x00\x00\x00\x02'
+        b't\x00\x00\x00\x02s\x00\x00\x00\x01a'
+        b'i\xff\xff\xff\xff\xff\xff\xff\xff'
+        b't\x00\x00\x00\x02s\x00\x00\x00\x01b'
+        b'f\x40\x00\x00\x00\x00\x00\x00\x00'
+        b'l\x00\x00\x00\x1418446744073709551616')
+
+    with pytest.raises(TypeError):
+        pack_value({1, 2}, parts.append)
+
+
 class TestFlowFactory:
     """Test the FlowFactory class."""
 
@@ -239,6 +327,93 @@ class TestFlow:
             mock_switch, **flow_five
         ).match_id
 
+    def test_cached_ids(self):
+        """Test caching the ids until a hashed attribute changes."""
+        flow = Flow04.from_dict(self.requested_instructions, self.mock_switch)
+        flow_id, match_id = flow.id, flow.match_id
+        with patch('napps.kytos.of_core.flow.md5') as mock_md5:
+            assert flow.id == flow_id
+            assert flow.match_id == match_id
+            flow.stats.packet_count = 10
+            assert flow.id == flow_id
+            mock_md5.assert_not_called()
+
+        def uncached(flow):
+            return Flow04.from_dict(flow.as_dict(), self.mock_switch)
+
+        flow.cookie = 6
+        assert flow.id != flow_id
+        assert flow.match_id == match_id
+        assert flow.id == uncached(flow).id
+
+        flow_id = flow.id
+        flow.match.in_port = 1
+        assert flow.match_id != match_id
+        assert flow.id != flow_id
+        assert flow.id == uncached(flow).id
+
+        flow_id = flow.id
+        flow.instructions[0].actions[0].vlan_id = 3
+        assert flow.id != flow_id
+        assert flow.id == uncached(flow).id
+
+        flow_id = flow.id
+        flow.instructions.pop()
+        assert flow.id != flow_id
+        assert flow.id == uncached(flow).id
+
+    def test_fingerprint(self):
+        """Test the fingerprint of the attributes hashed by the id."""
+        flow = Flow04.from_dict(self.requested_instructions, self.mock_switch)
+        fingerprint = flow.fingerprint
+        assert len(fingerprint) == 32
+        assert fingerprint != flow.id
+
+        other = Flow04.from_dict(self.requested_instructions,
+                                 self.mock_switch)
+        other.match.dl_src = '11:22:33:44:55:66'.upper()
+        other.stats.packet_count = 10
+        assert other.fingerprint == fingerprint
+
+        other.match.in_port = 1
+        assert other.fingerprint != fingerprint
+        other.match.in_port = None
+        assert other.fingerprint == fingerprint
+        other.cookie = 6
+        assert other.fingerprint != fingerprint
+        other.cookie = 5
+        other.instructions[0].actions[0].vlan_id = 3
+        assert other.fingerprint != fingerprint
+
+        other.instructions[0].actions[0].vlan_id = 2
+        assert other.fingerprint == fingerprint
+        other.priority = 2 ** 64
+        assert other.fingerprint != fingerprint
+
+    def test_unsupported_actions(self):
+        """Test the ids of a flow with an action decoded to None."""
+        instruction = InstructionApplyAction([ActionGroup(group_id=1),
+                                              ActionOutput(port=2)])
+        packed = OFFlowStats(table_id=0, duration_sec=0, duration_nsec=0,
+                             priority=10, idle_timeout=0, hard_timeout=0,
+                             flags=0, cookie=0, packet_count=0, byte_count=0,
+                             match=OFMatch(), instructions=[instruction],
+                             length=0)
+        packed.length = packed.get_size()
+        of_flow_stats = OFFlowStats()
+        of_flow_stats.unpack(packed.pack())
+
+        flow = Flow04.from_of_flow_stats(of_flow_stats, self.mock_switch)
+        assert flow.instructions[0].actions[0] is None
+        assert flow.as_dict()['instructions'][0]['actions'] == [
+            {'action_type': 'output', 'port': 2}]
+        assert len(flow.id) == 32
+        assert len(flow.match_id) == 32
+        assert len(flow.fingerprint) == 32
+        flow_id = flow.id
+        flow.instructions[0].actions[1].port = 3
+        assert flow.id != flow_id
+
 
 class TestFlowBase:
     """Test FlowBase Class."""
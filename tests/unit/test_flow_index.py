@@ -0,0 +1,117 @@
+"""Test flow_index module."""
+from unittest.mock import MagicMock
+
+from napps.kytos.of_core.flow_index import (FlowDelta, FlowIdMap, FlowIndex,
+                                            FlowLookup)
+
+
+def get_flow_mock(flow_id, packet_count=0, byte_count=0):
+    """Return a flow mock with the given id and counters."""
+    flow = MagicMock(id=flow_id)
+    flow.stats.packet_count = packet_count
+    flow.stats.byte_count = byte_count
+    return flow
+
+
+class TestFlowIndex:
+    """Test FlowIndex."""
+
+    def test_update(self):
+        """Test diffing consecutive flow stats."""
+        index = FlowIndex()
+        delta = index.update([get_flow_mock('a'), get_flow_mock('b')])
+        assert delta.as_dict() == {'added': ['a', 'b'], 'removed': [],
+                                   'changed': []}
+        assert len(index) == 2
+
+        delta = index.update([get_flow_mock('a'), get_flow_mock('b', 1, 64),
+                              get_flow_mock('c')])
+        assert delta.as_dict() == {'added': ['c'], 'removed': [],
+                                   'changed': ['b']}
+
+        delta = index.update([get_flow_mock('b', 2, 128)])
+        assert delta.as_dict() == {'added': [], 'removed': ['a', 'c'],
+                                   'changed': ['b']}
+        assert 'b' in index
+        assert 'a' not in index
+
+    def test_update_unchanged(self):
+        """Test an empty delta when nothing changed."""
+        index = FlowIndex()
+        index.update([get_flow_mock('a', 1, 64)])
+        assert not index.update([get_flow_mock('a', 1, 64)])
+        assert FlowDelta(removed=['a'])
+
+
+class TestFlowIdMap:
+    """Test FlowIdMap."""
+
+    def test_update(self):
+        """Test mapping the fingerprints to the legacy ids and back."""
+        id_map = FlowIdMap()
+        id_map.update([MagicMock(id='a', fingerprint='fa'),
+                       MagicMock(id='b', fingerprint='fb')])
+        assert len(id_map) == 2
+        assert id_map.legacy_id('fa') == 'a'
+        assert id_map.fingerprint('b') == 'fb'
+
+        id_map.update([MagicMock(id='b', fingerprint='fb')])
+        assert 'fa' not in id_map
+        assert id_map.legacy_id('fa') is None
+        assert id_map.fingerprint('a') is None
+        assert id_map.legacy_id('fb') == 'b'
+
+
+class TestFlowLookup:
+    """Test FlowLookup."""
+
+    @staticmethod
+    def get_flows():
+        """Return flows with distinct cookies, tables and output ports."""
+        flows = []
+        for index, cookie in enumerate((0xAA00000000000001,
+                                        0xAA00000000000002,
+                                        0xBB00000000000001)):
+            flow = MagicMock(id=f'id{index}', match_id=f'match{index}',
+                             cookie=cookie, table_id=index % 2)
+            instruction = MagicMock(actions=[
+                MagicMock(action_type='set_vlan'),
+                MagicMock(action_type='output', port=index + 1),
+                MagicMock(action_type='output', port=index + 1)])
+            flow.instructions = [instruction]
+            flows.append(flow)
+        return flows
+
+    def test_lookups(self):
+        """Test the lookups by id, match id, table and output port."""
+        flows = self.get_flows()
+        lookup = FlowLookup()
+        lookup.update(flows)
+        assert len(lookup) == 3
+        assert list(lookup) == flows
+        assert 'id1' in lookup
+        assert lookup.get('id1') is flows[1]
+        assert lookup.get('id3') is None
+        assert lookup.get_by_match_id('match2') is flows[2]
+        assert lookup.by_table(0) == [flows[0], flows[2]]
+        assert lookup.by_table(5) == []
+        assert lookup.tables() == [0, 1]
+        assert lookup.by_out_port(2) == [flows[1]]
+        assert lookup.by_out_port(4) == []
+
+        lookup.update(flows[:1])
+        assert lookup.get('id1') is None
+        assert lookup.by_table(0) == [flows[0]]
+
+    def test_by_cookie(self):
+        """Test the cookie lookups with range and sparse masks."""
+        flows = self.get_flows()
+        lookup = FlowLookup()
+        lookup.update(reversed(flows))
+        assert lookup.by_cookie(0xAA00000000000002) == [flows[1]]
+        assert lookup.by_cookie(0xAA00000000000000,
+                                0xFF00000000000000) == flows[:2]
+        assert lookup.by_cookie(0, 0) == flows
+        assert lookup.by_cookie(0x1, 0xF) == [flows[2], flows[0]]
+        assert lookup.by_cookie(0xCC00000000000000,
+                                0xFF00000000000000) == []
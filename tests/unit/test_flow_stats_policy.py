@@ -0,0 +1,158 @@
+"""Test flow_stats_policy module."""
+from unittest.mock import MagicMock
+
+import pytest
+
+from napps.kytos.of_core.flow_stats_policy import (FlowStatsFilter,
+                                                   FlowStatsPolicy)
+from napps.kytos.of_core.table import TableStats
+
+DPID = '00:00:00:00:00:00:00:01'
+
+
+def get_flow_mock(table_id, cookie=0):
+    """Return a flow mock in a table with a cookie."""
+    return MagicMock(table_id=table_id, cookie=cookie)
+
+
+def get_tables(switch, active_counts):
+    """Return the TableStats of active counts by table id."""
+    return [TableStats(switch, table_id, active_count)
+            for table_id, active_count in active_counts.items()]
+
+
+class TestFlowStatsFilter:
+    """Test FlowStatsFilter."""
+
+    def test_matches(self):
+        """Test the flows within a filter."""
+        assert FlowStatsFilter().is_full
+        assert FlowStatsFilter().matches(get_flow_mock(3, 0xab))
+
+        flow_filter = FlowStatsFilter(3, 0xaa00, 0xff00)
+        assert not flow_filter.is_full
+        assert flow_filter.matches(get_flow_mock(3, 0xaa01))
+        assert not flow_filter.matches(get_flow_mock(2, 0xaa01))
+        assert not flow_filter.matches(get_flow_mock(3, 0xab01))
+        assert flow_filter == FlowStatsFilter(3, 0xaa00, 0xff00)
+        assert flow_filter.as_tuple() == (3, 0xaa00, 0xff00)
+
+
+class TestFlowStatsPolicy:
+    """Test FlowStatsPolicy."""
+
+    def test_invalid_policy(self):
+        """Test an unknown policy."""
+        with pytest.raises(ValueError):
+            FlowStatsPolicy('some_tables', [])
+
+    def test_all(self):
+        """Test requesting every flow."""
+        policy = FlowStatsPolicy('all', [])
+        policy.update_tables(DPID, get_tables(MagicMock(), {0: 5, 1: 2}))
+        assert policy.next_filter(DPID) == FlowStatsFilter()
+
+    def test_table_rotation(self):
+        """Test rotating the tables with active entries."""
+        policy = FlowStatsPolicy('table_rotation', [])
+        assert policy.next_filter(DPID).is_full
+
+        policy.update_tables(DPID, get_tables(MagicMock(),
+                                              {0: 5, 1: 0, 4: 2}))
+        tables = [policy.next_filter(DPID).table_id for _ in range(4)]
+        assert tables == [4, 0, 4, 0]
+
+    def test_table_rotation_emptied(self):
+        """Test requesting once more a table whose entries dropped to 0."""
+        policy = FlowStatsPolicy('table_rotation', [])
+        switch = MagicMock(id=DPID)
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 2}))
+        assert policy.next_filter(DPID).table_id == 0
+        switch.flows = [get_flow_mock(0), get_flow_mock(1)]
+
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 0}))
+        flow_filter = policy.next_filter(DPID)
+        assert flow_filter.table_id == 1
+        policy.restore(DPID, flow_filter)
+        flow_filter = policy.next_filter(DPID)
+        assert flow_filter.table_id == 1
+        assert policy.merge(switch, [], flow_filter) == [switch.flows[0]]
+        tables = [policy.next_filter(DPID).table_id for _ in range(2)]
+        assert tables == [0, 0]
+
+        policy.update_tables(DPID, get_tables(switch, {0: 0, 1: 2}))
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 2}))
+        tables = [policy.next_filter(DPID).table_id for _ in range(2)]
+        assert 0 in tables and 1 in tables
+
+    def test_table_changes(self):
+        """Test requesting only the tables whose active_count changed."""
+        policy = FlowStatsPolicy('table_changes', [])
+        switch = MagicMock()
+        assert policy.next_filter(DPID).is_full
+
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 2}))
+        assert policy.next_filter(DPID).is_full
+        assert policy.next_filter(DPID) is None
+
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 3}))
+        assert policy.next_filter(DPID).table_id == 1
+        assert policy.next_filter(DPID) is None
+
+    def test_restore(self):
+        """Test requesting again the tables of a failed request."""
+        policy = FlowStatsPolicy('table_changes', [])
+        switch = MagicMock()
+        policy.restore(DPID, FlowStatsFilter())
+        assert policy.next_filter(DPID).is_full
+
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 2}))
+        flow_filter = policy.next_filter(DPID)
+        assert policy.next_filter(DPID) is None
+        policy.restore(DPID, flow_filter)
+        assert policy.next_filter(DPID).is_full
+
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 3}))
+        flow_filter = policy.next_filter(DPID)
+        policy.restore(DPID, flow_filter)
+        assert policy.next_filter(DPID).table_id == 1
+        assert policy.next_filter(DPID) is None
+
+        policy = FlowStatsPolicy('table_rotation', [])
+        policy.update_tables(DPID, get_tables(switch, {0: 5, 1: 2}))
+        policy.restore(DPID, policy.next_filter(DPID))
+        assert policy.next_filter(DPID).table_id == 1
+
+    def test_cookie_ranges(self):
+        """Test requesting a cookie range per cycle."""
+        policy = FlowStatsPolicy('table_rotation',
+                                 [[0xaa00, 0xff00], [0xbb00, 0xff00]])
+        policy.update_tables(DPID, get_tables(MagicMock(), {0: 5, 1: 2}))
+        filters = [policy.next_filter(DPID).as_tuple() for _ in range(4)]
+        assert filters == [(0, 0xaa00, 0xff00), (0, 0xbb00, 0xff00),
+                           (1, 0xaa00, 0xff00), (1, 0xbb00, 0xff00)]
+
+    def test_merge(self):
+        """Test replacing only the requested flows."""
+        policy = FlowStatsPolicy('all', [])
+        switch = MagicMock(id=DPID)
+        switch.flows = [get_flow_mock(0), get_flow_mock(1, 0xaa01),
+                        get_flow_mock(1, 0xbb01)]
+        new_flows = [get_flow_mock(1, 0xaa02)]
+        assert policy.merge(switch, new_flows) == new_flows
+
+        assert policy.merge(switch, new_flows,
+                            FlowStatsFilter()) == new_flows
+
+        flow_filter = FlowStatsFilter(1, 0xaa00, 0xff00)
+        assert policy.merge(switch, new_flows, flow_filter) == [
+            switch.flows[0], switch.flows[2], new_flows[0]]
+
+    def test_pop(self):
+        """Test removing the state of a switch."""
+        policy = FlowStatsPolicy('table_changes', [])
+        policy.update_tables(DPID, get_tables(MagicMock(), {0: 5}))
+        policy.next_filter(DPID)
+        policy.pop(DPID)
+        assert policy.next_filter(DPID).is_full
+        assert policy.next_filter(DPID).is_full
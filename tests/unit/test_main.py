@@ -1,13 +1,26 @@
 """Test Main methods."""
+import asyncio
 from unittest.mock import (AsyncMock, MagicMock, PropertyMock, create_autospec,
                            patch)
 
 import pytest
-from napps.kytos.of_core.utils import NegotiationException
+from napps.kytos.of_core.connection_context import ConnectionContext
+from napps.kytos.of_core.flow_stats_policy import (FlowStatsFilter,
+                                                   FlowStatsPolicy)
+from napps.kytos.of_core.port_stats import PortStats
+from napps.kytos.of_core.stats_interval import StatsIntervalTuner
+from napps.kytos.of_core.stats_scheduler import StatsScheduler
+from napps.kytos.of_core.table import TableStats
+from napps.kytos.of_core.utils import (LazyMessage, NegotiationException,
+                                       OFFramer)
+from napps.kytos.of_core.v0x04.flow import flows_from_multipart_reply
+from pyof.foundation.exceptions import UnpackException
 from pyof.foundation.network_types import Ethernet
 from pyof.v0x04.common.port import PortNo, PortState
+from pyof.utils import unpack
 from pyof.v0x04.common.header import Type
 from pyof.v0x04.controller2switch.common import MultipartType
+from pyof.v0x04.controller2switch.features_reply import FeaturesReply
 
 from kytos.core.connection import ConnectionState
 from kytos.core.exceptions import KytosDuplicatedSwitch
@@ -16,88 +29,692 @@ from kytos.lib.helpers import (get_connection_mock, get_controller_mock,
 
 # pylint: disable=protected-access, invalid-name
 
+# OFPMP_AGGREGATE multipart reply with 3 flows, 10 packets and 640 bytes,
+# xid 0xABD
+AGGREGATE_STATS_REPLY = bytes.fromhex(
+    '0413002800000abd0002000000000000000000000000000a'
+    '00000000000002800000000300000000'
+)
+# OFPMP_FLOW multipart reply with two flows, xid 0xABC
+FLOW_STATS_REPLY = bytes.fromhex(
+    '0413008000000abc0001000000000000003801000000000000000000000a0000'
+    '0000000000000000000000000000000700000000000000000000000000000000'
+    '0001000400000000003802000000000000000000001400000000000000000000'
+    '0000000000000000000000000000000000000000000000000001000400000000'
+)
+
+
+def pending_xids(napp, dpid):
+    """Return the xids of the pending multipart requests by stat."""
+    return {transaction.stat: transaction.xid for transaction
+            in napp.multipart_transactions.pending(dpid)}
+
 
 class TestNApp:
     """Test NApp Main class, pytest test suite. """
 
     @patch('napps.kytos.of_core.main.Main.process_multipart_messages')
-    @patch('napps.kytos.of_core.main.of_slicer')
     @patch('napps.kytos.of_core.main.Main._negotiate')
-    @patch('napps.kytos.of_core.main.Main.aemit_message_in')
-    async def test_on_raw_in(
+    @patch('napps.kytos.of_core.main.Main.aemit_messages_in')
+    async def test_process_raw_in(
         self,
-        mock_aemit_message_in,
+        mock_aemit_messages_in,
         mock_negotiate,
-        mock_of_slicer,
         mock_process_multipart_messages,
         napp,
     ):
-        """Test on_raw_in."""
-
-        mock_packets = MagicMock()
-        mock_data = MagicMock()
+        """Test process_raw_in."""
+        hello = b'\x04\x00\x00\x08\x00\x00\x00\x01'
+        barrier_reply = b'\x04\x15\x00\x08\x00\x00\x00\x02'
+        multipart_reply = (b'\x04\x13\x00\x10\x00\x00\x0a\xbc'
+                           b'\x00\x0d\x00\x00\x00\x00\x00\x00')
         mock_connection = MagicMock()
         mock_connection.is_new.side_effect = [True, False, True, False]
         mock_connection.is_during_setup.return_value = False
-        mock_of_slicer.return_value = [[mock_packets, mock_packets], b'']
-        name = 'kytos/core.openflow.raw.in'
-        content = {'source': mock_connection, 'new_data': mock_data}
-        mock_event = get_kytos_event_mock(name=name, content=content)
+        mock_framer = MagicMock()
+        mock_framer.frames.return_value = [hello, barrier_reply]
+        context = ConnectionContext(mock_connection)
+        context.framer = mock_framer
 
-        await napp.on_raw_in(mock_event)
+        await napp.process_raw_in(context)
         mock_negotiate.assert_called()
-        mock_aemit_message_in.assert_called()
+        mock_aemit_messages_in.assert_called()
+        [message] = mock_aemit_messages_in.call_args[0][1]
+        assert message.header.message_type == Type.OFPT_BARRIER_REPLY
+        assert not message.is_decoded
+        mock_connection.protocol.unpack.assert_not_called()
 
         # Test Fail
         mock_negotiate.side_effect = NegotiationException('Foo')
-        await napp.on_raw_in(mock_event)
+        await napp.process_raw_in(context)
         assert mock_connection.close.call_count == 1
 
         mock_connection.close.call_count = 0
+        mock_framer.frames.return_value = [multipart_reply]
         mock_connection.protocol.unpack.side_effect = AttributeError()
-        await napp.on_raw_in(mock_event)
+        await napp.process_raw_in(context)
         assert mock_connection.close.call_count == 1
 
         # test message type OFPT_MULTIPART_REPLY
-        mock_message = MagicMock()
-        mock_message.header.xid = 0xABC
-        mock_message.header.message_type.name = 'ofpt_multipart_reply'
-        mock_connection.protocol.unpack.side_effect = [mock_message]*2
+        mock_framer.frames.return_value = [multipart_reply, multipart_reply]
+        mock_connection.protocol.unpack.side_effect = unpack
         mock_connection.is_new.side_effect = [False, False]
         mock_process_multipart_messages.call_count = 0
-        messages = {0xABC: [mock_message]*2}
+        await napp.process_raw_in(context)
+        args = mock_process_multipart_messages.call_args[0]
+        assert args[0] == mock_connection
+        assert list(args[1]) == [0xABC]
+        assert len(args[1][0xABC]) == 2
+        assert all(message.is_decoded for message in args[1][0xABC])
+
+    def test_decode_raw_in_handshake(self, napp):
+        """Test unpacking the handshake messages right away."""
+        mock_connection = MagicMock()
+        mock_connection.protocol.unpack.side_effect = unpack
+        features_reply = FeaturesReply(xid=3, datapath_id='00:00:00:00:'
+                                       '00:00:00:01', n_buffers=0,
+                                       n_tables=1, auxiliary_id=0,
+                                       capabilities=0, reserved=0).pack()
+        message = napp.decode_raw_in(mock_connection, features_reply)
+        assert message.is_decoded
+        assert isinstance(message, FeaturesReply)
+        assert isinstance(message, LazyMessage)
+        mock_connection.close.assert_not_called()
+
+        assert napp.decode_raw_in(mock_connection,
+                                  features_reply[:16]) is None
+        mock_connection.close.assert_called_once()
+
+    @patch('napps.kytos.of_core.main.Main.aemit_messages_in')
+    async def test_process_raw_in_setup_deferred(
+        self,
+        mock_aemit_messages_in,
+        napp,
+    ):
+        """Test process_raw_in deferring packets during connection setup."""
+        packet = b'\x04\x15\x00\x08\x00\x00\x00\x01'
+        mock_connection = MagicMock()
+        mock_connection.is_new.return_value = False
+        mock_connection.is_during_setup.return_value = True
+        mock_connection.protocol.state = 'waiting_features_reply'
+        context = ConnectionContext(mock_connection)
+        framer = context.framer
+
+        assert napp.feed_raw_in(context, packet)
+        await napp.process_raw_in(context)
+        assert framer.buffered == len(packet)
+        assert mock_aemit_messages_in.call_args[0][1] == []
+
+        mock_connection.is_during_setup.return_value = False
+        await napp.process_raw_in(context)
+        assert framer.buffered == 0
+        [message] = mock_aemit_messages_in.call_args[0][1]
+        assert message.header.message_type == Type.OFPT_BARRIER_REPLY
+        assert message.packet == packet
+
+    @patch('napps.kytos.of_core.main.settings')
+    @patch('napps.kytos.of_core.main.Main.aemit_messages_in')
+    async def test_process_raw_in_echo_fast_path(self,
+                                                 mock_aemit_messages_in,
+                                                 mock_settings, napp):
+        """Test process_raw_in replying echo requests from raw bytes."""
+        mock_settings.ECHO_REPLY_FAST_PATH = True
+        mock_settings.ECHO_REPLY_FAST_PATH_EVENTS = False
+        mock_settings.SEND_FEATURES_REQUEST_ON_ECHO = False
+        echo_request = b'\x04\x02\x00\x0b\x00\x00\x00\x05abc'
+        mock_connection = MagicMock()
+        mock_connection.is_new.return_value = False
+        mock_connection.is_during_setup.return_value = False
+        context = ConnectionContext(mock_connection)
+        assert napp.feed_raw_in(context, echo_request)
+        await napp.process_raw_in(context)
+        mock_connection.send.assert_called_with(
+            b'\x04\x03\x00\x0b\x00\x00\x00\x05abc')
+        mock_connection.protocol.unpack.assert_not_called()
+        assert mock_aemit_messages_in.call_args[0][1] == []
+
+        mock_settings.ECHO_REPLY_FAST_PATH = False
+        mock_connection.protocol.unpack.side_effect = unpack
+        mock_connection.send.reset_mock()
+        assert napp.feed_raw_in(context, echo_request)
+        await napp.process_raw_in(context)
+        mock_connection.send.assert_not_called()
+        [message] = mock_aemit_messages_in.call_args[0][1]
+        assert message.is_decoded
+        assert message.data.value == b'abc'
+
+    @patch('napps.kytos.of_core.main.settings')
+    @patch('napps.kytos.of_core.main.Main.aemit_message_in')
+    async def test_reply_echo_request_events(self, mock_aemit_message_in,
+                                             mock_settings, napp):
+        """Test reply_echo_request still emitting the echo events."""
+        mock_settings.ECHO_REPLY_FAST_PATH_EVENTS = True
+        napp.controller._buffers.app.aput = AsyncMock()
+        mock_connection = MagicMock()
+        echo_request = LazyMessage(b'\x04\x02\x00\x08\x00\x00\x00\x05')
+        await napp.reply_echo_request(mock_connection, echo_request)
+        echo_reply = b'\x04\x03\x00\x08\x00\x00\x00\x05'
+        mock_connection.send.assert_called_with(echo_reply)
+        mock_aemit_message_in.assert_called_with(mock_connection,
+                                                 echo_request)
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.name == 'kytos/of_core.v0x04.messages.out.ofpt_echo_reply'
+        assert event.content['destination'] == mock_connection
+        assert event.content['message'].pack() == echo_reply
+
+        mock_settings.ECHO_REPLY_FAST_PATH_EVENTS = False
+        mock_settings.SEND_FEATURES_REQUEST_ON_ECHO = False
+        mock_aemit_message_in.call_count = 0
+        await napp.reply_echo_request(mock_connection, echo_request)
+        assert mock_connection.send.call_count == 2
+        mock_aemit_message_in.assert_not_called()
+
+    async def test_feed_raw_in(self, napp):
+        """Test feed_raw_in feeding the queued data too."""
+        context = ConnectionContext(MagicMock())
+        context.queue.put_nowait(b'\x00\x08')
+        context.queue.put_nowait(b'\x00\x00\x00\x01')
+        assert napp.feed_raw_in(context, b'\x04\x0a')
+        assert context.queue.empty()
+        assert list(context.framer.frames()) == [
+            b'\x04\x0a\x00\x08\x00\x00\x00\x01'
+        ]
+
+    @patch('napps.kytos.of_core.main.log')
+    async def test_feed_raw_in_buffer_overflow(self, mock_log, napp):
+        """Test feed_raw_in closing the connection on buffer overflow."""
+        mock_connection = MagicMock()
+        context = ConnectionContext(mock_connection)
+        context.framer = OFFramer(4)
+        assert not napp.feed_raw_in(context, b'\x04\x0a\x00\x08\x00')
+        assert mock_connection.close.call_count == 1
+        assert mock_log.error.call_count == 1
+        mock_connection.protocol.unpack.assert_not_called()
+
+    @patch('napps.kytos.of_core.main.Main.process_raw_in')
+    async def test_on_raw_in(self, mock_process_raw_in, napp):
+        """Test on_raw_in queueing data to the connection consumer task."""
+        packet = b'\x04\x0a\x00\x08\x00\x00\x00\x01'
+        mock_connection = MagicMock()
+        mock_connection.is_established.return_value = False
+        content = {'source': mock_connection, 'new_data': packet[:3]}
+        mock_event = get_kytos_event_mock(name='kytos/core.openflow.raw.in',
+                                          content=content)
+        await napp.on_raw_in(mock_event)
+        mock_event.content['new_data'] = packet[3:]
         await napp.on_raw_in(mock_event)
-        mock_process_multipart_messages.assert_called_with(mock_connection,
-                                                           messages)
+        mock_connection.switch.update_lastseen.assert_called()
+
+        context = napp.connection_contexts.get(mock_connection.id)
+        await asyncio.wait_for(context.queue.join(), 1)
+        mock_process_raw_in.assert_called_with(context)
+        assert list(context.framer.frames()) == [packet]
+
+        mock_process_raw_in.side_effect = ValueError('invalid')
+        mock_event.content['new_data'] = packet
+        await napp.on_raw_in(mock_event)
+        await asyncio.wait_for(context.queue.join(), 1)
+        assert not context.task.done()
+
+        napp.connection_contexts.pop(mock_connection.id)
+        await asyncio.sleep(0)
+        assert context.task.cancelled()
+
+    @patch('napps.kytos.of_core.main.Main.poll_stats')
+    @patch('napps.kytos.of_core.main.Main.process_raw_in')
+    async def test_on_raw_in_start_stats(self, mock_process_raw_in,
+                                         mock_poll_stats, switch_one, napp):
+        """Test on_raw_in starting the stats task of established switches."""
+        connection = switch_one.connection
+        connection.is_established.return_value = False
+        content = {'source': connection,
+                   'new_data': b'\x04\x0a\x00\x08\x00\x00\x00\x01'}
+        mock_event = get_kytos_event_mock(name='kytos/core.openflow.raw.in',
+                                          content=content)
+        await napp.on_raw_in(mock_event)
+        context = napp.connection_contexts.get(connection.id)
+        assert context.stats_task is None
+
+        connection.is_established.return_value = True
+        await napp.on_raw_in(mock_event)
+        await napp.on_raw_in(mock_event)
+        await asyncio.sleep(0)
+        mock_poll_stats.assert_called_once_with(context)
+        napp.connection_contexts.pop(connection.id)
+        assert mock_process_raw_in.call_count
+
+    @patch('napps.kytos.of_core.stats.asyncio.sleep')
+    @patch('napps.kytos.of_core.main.Main.request_stats')
+    async def test_poll_stats(self, mock_request_stats, mock_sleep,
+                              switch_one, napp):
+        """Test polling the stats of a switch at its phase."""
+        napp.stats_scheduler = StatsScheduler(60, 0, 0)
+        switch_one.is_connected.side_effect = [True, False, True]
+        mock_sleep.side_effect = [None, None, None, asyncio.CancelledError]
+        mock_request_stats.side_effect = [None, ValueError('failed')]
+        context = ConnectionContext(switch_one.connection)
+        with pytest.raises(asyncio.CancelledError):
+            await napp.poll_stats(context)
+        assert mock_request_stats.call_count == 2
+        mock_request_stats.assert_called_with(switch_one)
+        assert all(0 <= call[0][0] < 60
+                   for call in mock_sleep.call_args_list)
+
+    async def test_update_switch_flows_partial(self, switch_one, napp):
+        """Test merging the flows of a partial flow stats request."""
+        flows = flows_from_multipart_reply(FLOW_STATS_REPLY)
+        switch_one.flows = flows
+        new_flow = flows_from_multipart_reply(FLOW_STATS_REPLY)[1]
+        new_flow.priority = 30
+        transaction = napp.multipart_transactions.begin(
+            switch_one.id, 0xABC, 'flows', FlowStatsFilter(2))
+        transaction.add([new_flow], 64)
+        napp._update_switch_flows(switch_one, transaction)
+        assert switch_one.flows == [flows[0], new_flow]
+        assert not napp.multipart_transactions.pending(switch_one.id)
+        assert switch_one.id not in napp.flow_id_maps
+        assert list(napp.flow_lookups[switch_one.id]) == switch_one.flows
+
+    @patch('napps.kytos.of_core.settings.FLOW_ID_MAP', True)
+    async def test_update_switch_flows_id_map(self, switch_one, napp):
+        """Test mapping the fingerprints of the flows to their ids."""
+        flows = flows_from_multipart_reply(FLOW_STATS_REPLY)
+        for flow in flows:
+            flow.switch = switch_one
+        transaction = napp.multipart_transactions.begin(
+            switch_one.id, 0xABC, 'flows')
+        transaction.add(flows, 64)
+        napp._update_switch_flows(switch_one, transaction)
+        id_map = napp.flow_id_maps[switch_one.id]
+        assert len(id_map) == len(flows)
+        assert id_map.legacy_id(flows[0].fingerprint) == flows[0].id
+
+    async def test_on_multipart_table_stats_policy(self, switch_one, napp):
+        """Test the table stats kept by the flow stats policy."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        reply = MagicMock()
+        reply.flags.value = 0
+        reply.header.xid = 0xABE
+        reply.body = [MagicMock()]
+        reply.body[0].table_id.value = 3
+        reply.body[0].active_count.value = 10
+        napp.multipart_transactions.begin(switch_one.id, 0xABE, 'tables')
+        napp.flow_stats_policy = FlowStatsPolicy('table_changes')
+        assert await napp._handle_multipart_table_stats(reply, switch_one)
+        assert napp.flow_stats_policy.next_filter(switch_one.id).table_id == 3
+        assert napp.flow_stats_policy.next_filter(switch_one.id) is None
+
+    @patch('napps.kytos.of_core.main.Main._handle_port_desc')
+    async def test_on_multipart_desc(self, mock_handle_port_desc,
+                                     switch_one, napp):
+        """Test ending the desc and port desc transactions."""
+        transactions = napp.multipart_transactions
+        transactions.begin(switch_one.id, 0xABC, 'desc')
+        transactions.begin(switch_one.id, 0xABD, 'port_desc')
+        reply = MagicMock(multipart_type=MultipartType.OFPMP_PORT_DESC)
+        reply.header.xid = 0xABD
+        reply.flags.value = 1
+        await napp._handle_multipart_reply(reply, switch_one)
+        reply.flags.value = 0
+        reply.header.xid = 0xABC
+        await napp._handle_multipart_reply(reply, switch_one)
+        assert set(pending_xids(napp, switch_one.id)) == {'desc',
+                                                          'port_desc'}
+
+        reply.header.xid = 0xABD
+        await napp._handle_multipart_reply(reply, switch_one)
+        assert mock_handle_port_desc.call_count == 3
+        assert set(pending_xids(napp, switch_one.id)) == {'desc'}
+
+        reply = MagicMock(multipart_type=MultipartType.OFPMP_DESC)
+        reply.header.xid = 0xABC
+        await napp._handle_multipart_reply(reply, switch_one)
+        switch_one.update_description.assert_called_with(reply.body)
+        assert not transactions.pending(switch_one.id)
+
+    @patch('napps.kytos.of_core.main.Main._request_flow_stats')
+    async def test_on_multipart_aggregate_stats(self, mock_request_flow_stats,
+                                                switch_one, napp):
+        """Test requesting the flow stats only if the aggregate changed."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        reply = unpack(AGGREGATE_STATS_REPLY)
+        napp.multipart_transactions.begin(switch_one.id, 0xABD, 'aggregate')
+        await napp._handle_multipart_reply(reply, switch_one)
+        mock_request_flow_stats.assert_called_with(switch_one)
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.name == 'kytos/of_core.aggregate_stats.received'
+        assert event.content == {'switch': switch_one, 'flow_count': 3,
+                                 'packet_count': 10, 'byte_count': 640}
+        assert not napp.multipart_transactions.pending(switch_one.id)
+
+        mock_request_flow_stats.reset_mock()
+        napp.multipart_transactions.begin(switch_one.id, 0xABD, 'aggregate')
+        await napp._handle_multipart_reply(reply, switch_one)
+        mock_request_flow_stats.assert_not_called()
+        assert napp.controller.buffers.app.aput.call_count == 2
+
+        mock_request_flow_stats.reset_mock()
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'aggregate')
+        await napp._handle_multipart_reply(reply, switch_one)
+        mock_request_flow_stats.assert_not_called()
+        assert napp.controller.buffers.app.aput.call_count == 2
+
+        # Without a flow stats request, the next aggregate requests it again
+        napp._aggregate_stats.clear()
+        mock_request_flow_stats.return_value = None
+        for _ in range(2):
+            napp.multipart_transactions.begin(switch_one.id, 0xABD,
+                                              'aggregate')
+            await napp._handle_multipart_reply(reply, switch_one)
+        assert mock_request_flow_stats.call_count == 2
+        assert switch_one.id not in napp._aggregate_stats
+
+    @patch('napps.kytos.of_core.stats.settings')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_port_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_aggregate_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.aupdate_flow_list')
+    async def test_request_stats_aggregate_check(
+        self,
+        mock_aupdate_flow_list,
+        mock_arequest_aggregate_stats,
+        mock_arequest_port_stats,
+        mock_settings,
+        switch_one,
+        napp
+    ):
+        """Test requesting the aggregate stats instead of the flow stats."""
+        mock_settings.FLOW_STATS_AGGREGATE_CHECK = True
+        mock_settings.STATS_REQ_SKIP = 5
+        await napp.request_stats(switch_one)
+        mock_aupdate_flow_list.assert_not_called()
+        xids = pending_xids(napp, switch_one.id)
+        assert set(xids) == {'aggregate', 'ports'}
+        mock_arequest_aggregate_stats.assert_called_with(
+            napp.controller, switch_one, xid=xids['aggregate'])
+
+    async def test_release_stats_request(self, switch_one, napp):
+        """Test releasing the stats request slot after the last reply."""
+        dpid = switch_one.id
+        await napp.stats_scheduler.acquire(dpid)
+        napp.multipart_transactions.begin(dpid, 0xABC, 'ports')
+        napp._release_stats_request(switch_one)
+        assert dpid in napp.stats_scheduler
+
+        napp.multipart_transactions.finish(dpid, 0xABC)
+        napp._release_stats_request(switch_one)
+        assert dpid not in napp.stats_scheduler
+
+    @patch('napps.kytos.of_core.main.Main.'
+           '_check_overlapping_multipart_request')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_table_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_port_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.aupdate_flow_list')
+    async def test_request_stats(
+        self,
+        mock_aupdate_flow_list,
+        mock_arequest_port_stats,
+        mock_arequest_table_stats,
+        mock_check_overlapping,
+        switch_one,
+        napp
+    ):
+        """Test request flow, port and table stats."""
+        mock_check_overlapping.return_value = set()
+        switch_one.features = MagicMock()
+        switch_one.features.capabilities.value = 2
+
+        def request(_controller, switch, xid, **_kwargs):
+            """Check the transaction begins before the request is sent."""
+            assert napp.multipart_transactions.get(switch.id, xid)
+        for mock_request in (mock_aupdate_flow_list, mock_arequest_port_stats,
+                             mock_arequest_table_stats):
+            mock_request.side_effect = request
+        await napp.request_stats(switch_one)
+        xids = pending_xids(napp, switch_one.id)
+        assert set(xids) == {'flows', 'ports', 'tables'}
+        mock_aupdate_flow_list.assert_called_with(napp.controller, switch_one,
+                                                  table_id=0xff, cookie=0,
+                                                  cookie_mask=0,
+                                                  xid=xids['flows'])
+        mock_arequest_port_stats.assert_called_with(napp.controller,
+                                                    switch_one,
+                                                    xid=xids['ports'])
+        mock_arequest_table_stats.assert_called_with(napp.controller,
+                                                     switch_one,
+                                                     xid=xids['tables'])
+        assert switch_one.id in napp.stats_scheduler
+
+        # Only the stats whose requests are still in flight are skipped
+        napp.multipart_transactions.finish(switch_one.id, xids['ports'])
+        mock_aupdate_flow_list.reset_mock()
+        mock_arequest_port_stats.reset_mock()
+        mock_arequest_table_stats.reset_mock()
+        mock_check_overlapping.return_value = {'flows', 'tables'}
+        await napp.request_stats(switch_one)
+        mock_aupdate_flow_list.assert_not_called()
+        mock_arequest_table_stats.assert_not_called()
+        mock_arequest_port_stats.assert_called_once()
+        assert len(napp.multipart_transactions.pending(switch_one.id)) == 3
+
+        mock_arequest_port_stats.reset_mock()
+        mock_check_overlapping.return_value = set()
+        with patch.object(napp.stats_scheduler, 'acquire',
+                          AsyncMock(return_value=False)):
+            await napp.request_stats(switch_one)
+        mock_aupdate_flow_list.assert_not_called()
+        mock_arequest_port_stats.assert_not_called()
+
+        napp.stats_scheduler.release(switch_one.id)
+        napp.multipart_transactions.pop(switch_one.id)
+        with patch.object(napp.flow_stats_policy, 'next_filter',
+                          return_value=None):
+            await napp.request_stats(switch_one)
+        mock_aupdate_flow_list.assert_not_called()
+        assert set(pending_xids(napp, switch_one.id)) == {'ports', 'tables'}
+
+    @patch('napps.kytos.of_core.stats.time.monotonic')
+    @patch('napps.kytos.of_core.main.Main.'
+           '_check_overlapping_multipart_request')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_port_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.aupdate_flow_list')
+    async def test_request_stats_flow_stats_interval(
+        self,
+        mock_aupdate_flow_list,
+        mock_arequest_port_stats,
+        mock_check_overlapping,
+        mock_monotonic,
+        switch_one,
+        napp
+    ):
+        """Test requesting the flow stats at the interval of the switch."""
+        mock_check_overlapping.return_value = set()
+        napp.stats_interval_tuner = StatsIntervalTuner(60, 600, 0.01, 60)
+        napp.stats_interval_tuner.observe(switch_one.id, 10 ** 7, 100, 1.2)
+        for now in (0, 60, 120, 180):
+            mock_monotonic.return_value = now
+            napp.stats_scheduler.release(switch_one.id)
+            napp.multipart_transactions.pop(switch_one.id)
+            await napp.request_stats(switch_one)
+        assert mock_aupdate_flow_list.call_count == 2
+        assert mock_arequest_port_stats.call_count == 4
+
+    @patch('napps.kytos.of_core.main.Main.'
+           '_check_overlapping_multipart_request')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_table_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.arequest_port_stats')
+    @patch('napps.kytos.of_core.v0x04.utils.aupdate_flow_list')
+    async def test_request_stats_no_capabilities_for_table(
+        self,
+        _,
+        __,
+        mock_arequest_table_stats,
+        mock_check_overlapping,
+        switch_one,
+        napp
+    ):
+        """Test request stats of a switch without table stats."""
+        mock_check_overlapping.return_value = set()
+        await napp.request_stats(switch_one)
+        mock_arequest_table_stats.assert_not_called()
+
+    @patch('napps.kytos.of_core.main.Main.request_stats')
+    async def test_on_handshake_completed_request_stats(
+        self, mock_request_stats, switch_one, napp
+    ):
+        """Test requesting stats right after the handshake."""
+        switch_one.is_enabled.return_value = True
+        event = get_kytos_event_mock(name='kytos/of_core.handshake.completed',
+                                     content={'switch': switch_one})
+        await napp.on_handshake_completed_request_stats(event)
+        mock_request_stats.assert_called_with(switch_one)
+
+        mock_request_stats.reset_mock()
+        switch_one.is_enabled.return_value = False
+        await napp.on_handshake_completed_request_stats(event)
+        mock_request_stats.assert_not_called()
+
+    @patch('napps.kytos.of_core.main.asyncio.sleep')
+    @patch('napps.kytos.of_core.main.settings')
+    async def test_wait_msg_in_backpressure(self, mock_settings, mock_sleep,
+                                            napp):
+        """Test pausing a connection while msg_in is above the watermark."""
+        mock_settings.CONN_PAUSED_HIGH_BYTES = 16
+        mock_settings.CONN_PAUSED_LOW_BYTES = 8
+        napp.backpressure.high_watermark = 10
+        napp.backpressure.low_watermark = 5
+        napp.backpressure.conn_high_watermark = 0
+        napp.backpressure.shed_types = [Type.OFPT_PACKET_IN.value]
+        napp.controller._buffers.msg_in.qsize = MagicMock()
+        napp.controller._buffers.msg_in.qsize.return_value = 3
+        mock_connection = MagicMock()
+        packet_in = b'\x04\x0a\x00\x08\x00\x00\x00\x01'
+        port_status = b'\x04\x0c\x00\x08\x00\x00\x00\x02'
+        context = ConnectionContext(mock_connection)
+        framer = context.framer
+        framer.feed(packet_in + port_status)
+        context.queue.put_nowait(packet_in)
+
+        assert await napp.wait_msg_in_backpressure(context)
+        mock_sleep.assert_not_called()
+        assert napp.backpressure.pauses == 0
+
+        napp.controller._buffers.msg_in.qsize.side_effect = [10, 10, 8, 5]
+        assert await napp.wait_msg_in_backpressure(context)
+        assert mock_sleep.call_count == 2
+        assert napp.backpressure.pauses == 1
+        assert not napp.backpressure.paused_connections
+        assert napp.backpressure.shed == {'ofpt_packet_in': 2}
+        assert list(framer.frames()) == [port_status]
+
+    @patch('napps.kytos.of_core.main.asyncio.sleep')
+    @patch('napps.kytos.of_core.main.settings')
+    async def test_wait_msg_in_backpressure_full(self, mock_settings,
+                                                 mock_sleep, napp):
+        """Test pausing the reads of a paused connection once it's full."""
+        mock_settings.CONN_PAUSED_HIGH_BYTES = 16
+        mock_settings.CONN_PAUSED_LOW_BYTES = 8
+        napp.backpressure.high_watermark = 10
+        napp.backpressure.low_watermark = 5
+        napp.backpressure.conn_high_watermark = 0
+        napp.backpressure.shed_types = [Type.OFPT_PACKET_IN.value]
+        napp.controller._buffers.msg_in.qsize = MagicMock()
+        napp.controller._buffers.msg_in.qsize.side_effect = [10, 10, 10, 5]
+        mock_connection = MagicMock()
+        multipart_reply = b'\x04\x13\x00\x10\x00\x00\x0a\xbc' + bytes(8)
+        context = ConnectionContext(mock_connection)
+        context.framer = OFFramer(max_buffered=24)
+        context.framer.feed(multipart_reply)
+        context.queue.put_nowait(multipart_reply)
+        context.queue.put_nowait(multipart_reply)
+
+        assert await napp.wait_msg_in_backpressure(context)
+        assert mock_sleep.call_count == 2
+        assert context.framer.buffered == 48
+        mock_connection.close.assert_not_called()
+        mock_connection.socket.pause_reading.assert_called_once()
+        mock_connection.socket.resume_reading.assert_called_once()
+        assert not context.is_reading_paused
+        assert list(context.framer.frames()) == [multipart_reply] * 3
+
+    @patch('napps.kytos.of_core.main.Main.reply_echo_request')
+    @patch('napps.kytos.of_core.main.asyncio.sleep')
+    @patch('napps.kytos.of_core.main.settings')
+    async def test_wait_msg_in_backpressure_connection(
+        self, mock_settings, mock_sleep, mock_reply_echo_request, napp
+    ):
+        """Test pausing only a flooding connection, still handling echoes."""
+        mock_settings.CONN_PAUSED_HIGH_BYTES = 1024
+        mock_settings.ECHO_REPLY_FAST_PATH = True
+        napp.backpressure.high_watermark = 10
+        napp.backpressure.low_watermark = 5
+        napp.backpressure.conn_high_watermark = 8
+        napp.backpressure.conn_low_watermark = 2
+        napp.controller._buffers.msg_in.qsize = MagicMock()
+        napp.controller._buffers.msg_in.qsize.return_value = 10
+        packet_in = b'\x04\x0a\x00\x08\x00\x00\x00\x01'
+        echo_request = b'\x04\x02\x00\x08\x00\x00\x00\x02'
+        flooding = ConnectionContext(MagicMock(id='conn1'))
+        quiet = ConnectionContext(MagicMock(id='conn2'))
+        napp.backpressure.count_in('conn1', 9)
+        napp.backpressure.count_in('conn2', 1)
+        assert await napp.wait_msg_in_backpressure(quiet)
+        mock_sleep.assert_not_called()
+
+        starting = ConnectionContext(MagicMock(id='conn1'))
+        starting.connection.is_established.return_value = False
+        assert await napp.wait_msg_in_backpressure(starting)
+        mock_sleep.assert_not_called()
+
+        flooding.connection.protocol.unpack = unpack
+        flooding.connection.is_during_setup.return_value = False
+        for _ in range(3):
+            flooding.queue.put_nowait(packet_in + echo_request)
+
+        async def drain(_interval):
+            napp.controller._buffers.msg_in.qsize.return_value = 2
+        mock_sleep.side_effect = drain
+        assert await napp.wait_msg_in_backpressure(flooding)
+        assert mock_sleep.call_count == 1
+        assert flooding.queue.empty()
+        assert mock_reply_echo_request.call_count == 3
+        assert list(flooding.framer.frames()) == [packet_in] * 3
+        assert napp.backpressure.pauses == 1
+
+    @patch('napps.kytos.of_core.main.JSONResponse')
+    async def test_get_backpressure(self, mock_json_response, napp):
+        """Test the backpressure state endpoint."""
+        napp.backpressure.count_shed({Type.OFPT_PACKET_IN.value: 2})
+        napp.get_backpressure(MagicMock())
+        content = mock_json_response.call_args[0][0]
+        assert content['shed'] == {'ofpt_packet_in': 2}
+        assert content == napp.backpressure.as_dict()
 
     # pylint: disable=too-many-locals
     @patch('napps.kytos.of_core.main.Main.process_multipart_messages')
-    @patch('napps.kytos.of_core.main.of_slicer')
     @patch('napps.kytos.of_core.main.Main._negotiate')
-    @patch('napps.kytos.of_core.main.Main.aemit_message_in')
-    async def test_on_raw_in_local_seq_numbers(
+    @patch('napps.kytos.of_core.main.Main.aemit_messages_in')
+    async def test_process_raw_in_local_seq_numbers(
         self,
-        mock_aemit_message_in,
+        mock_aemit_messages_in,
         _,
-        mock_of_slicer,
         mock_process_multipart_messages,
         napp,
     ):
-        """Test on_raw_in local sequence numbers."""
+        """Test process_raw_in local sequence numbers."""
 
-        mock_packets = MagicMock()
-        mock_data = MagicMock()
+        multipart_reply = b'\x04\x13\x00\x08\x00\x00\x0a\xbc'
+        port_status = b'\x04\x0c\x00\x08\x00\x00\x0a\xbe'
         mock_connection = MagicMock()
         mock_connection.is_new.side_effect = [True, False, True, False]
         mock_connection.is_during_setup.return_value = False
         mock_switch = MagicMock()
         mock_switch.id = "1"
         mock_connection.switch = mock_switch
-        mock_of_slicer.return_value = [[mock_packets, mock_packets,
-                                        mock_packets], b'']
-        name = 'kytos/core.openflow.raw.in'
-        content = {'source': mock_connection, 'new_data': mock_data}
-        mock_event = get_kytos_event_mock(name=name, content=content)
+        mock_framer = MagicMock()
+        mock_framer.frames.return_value = [multipart_reply, multipart_reply,
+                                           port_status]
+        context = ConnectionContext(mock_connection)
+        context.framer = mock_framer
 
         # test message type OFPT_MULTIPART_REPLY and OFPT_PORT_STATUS
         multipart_mock = MagicMock()
@@ -117,7 +734,7 @@ class TestNApp:
 
         assert not napp._msg_seq_cnt
         assert not napp._xid_seq_num
-        await napp.on_raw_in(mock_event)
+        await napp.process_raw_in(context)
         assert napp._msg_seq_cnt
         assert mock_switch.id in napp._msg_seq_cnt
 
@@ -128,7 +745,8 @@ class TestNApp:
         # the port status xid mapped value must be to last counted val
         assert napp._xid_seq_num[mock_switch.id][port_status_xid] == 3
 
-        mock_aemit_message_in.assert_called()
+        [message] = mock_aemit_messages_in.call_args[0][1]
+        assert message.header == port_status_mock.header
         mock_process_multipart_messages.assert_called()
 
     @patch('pyof.utils.v0x04.asynchronous.error_msg.ErrorMsg')
@@ -222,10 +840,10 @@ class TestNApp:
         mock_send_features_request.assert_called_with(mock_event.destination)
 
     @patch('napps.kytos.of_core.main.Main._handle_multipart_reply')
-    @patch('napps.kytos.of_core.main.Main.aemit_message_in')
+    @patch('napps.kytos.of_core.main.Main.aemit_messages_in')
     async def test_process_multipart_messages(
         self,
-        mock_aemit_message_in,
+        mock_aemit_messages_in,
         mock_handle_multipart_reply,
         switch_one,
         napp
@@ -234,11 +852,12 @@ class TestNApp:
         dpid = switch_one.id
         mock_connection = MagicMock()
         mock_connection.switch = switch_one
-        napp._multipart_replies_xids = {dpid: {0xABC: 0}}
+        napp.multipart_transactions.begin(dpid, 0xABC, 'flows')
         mock_message = MagicMock()
         messages = {0xABC: [mock_message]*2}
         await napp.process_multipart_messages(mock_connection, messages)
-        assert mock_aemit_message_in.call_count == len(messages[0xABC])
+        mock_aemit_messages_in.assert_called_once_with(mock_connection,
+                                                       messages[0xABC])
         assert mock_handle_multipart_reply.call_count == len(messages[0xABC])
 
     @patch('napps.kytos.of_core.main.Main._handle_multipart_table_stats')
@@ -357,13 +976,14 @@ class TestNApp:
         assert ev.content["interfaces"] == []
         assert "dpid" in ev.content
 
-    @patch('napps.kytos.of_core.main.log')
+    @patch('napps.kytos.of_core.settings.FLOW_STATS_DELTA', True)
+    @patch('napps.kytos.of_core.stats.log')
     @patch('napps.kytos.of_core.main.Main._update_switch_flows')
     @patch('napps.kytos.of_core.v0x04.flow.Flow.from_of_flow_stats')
-    @patch('napps.kytos.of_core.main.Main._is_multipart_reply_ours')
+    @patch('napps.kytos.of_core.main.Main._multipart_transaction')
     async def test_on_multipart_flow_stats(
         self,
-        mock_is_multipart_reply_ours,
+        mock_multipart_transaction,
         mock_from_of_flow_stats_v0x04,
         mock_update_switch_flows,
         mock_log,
@@ -371,8 +991,13 @@ class TestNApp:
         napp
     ):
         """Test on multipart flow stats."""
-        mock_is_multipart_reply_ours.return_value = True
-        mock_from_of_flow_stats_v0x04.return_value = "ABC"
+        dpid = switch_one.id
+        xid_flows = 0xABC
+        transaction = napp.multipart_transactions.begin(dpid, xid_flows,
+                                                        'flows')
+        mock_multipart_transaction.return_value = transaction
+        flow = MagicMock(id="ABC")
+        mock_from_of_flow_stats_v0x04.return_value = flow
 
         mock_buffer_aput = AsyncMock()
         napp.controller._buffers.app.aput = mock_buffer_aput
@@ -381,25 +1006,27 @@ class TestNApp:
         flow_msg.body = "A"
         flow_msg.flags.value = 2
         flow_msg.body_type = MultipartType.OFPMP_FLOW
-        flow_msg.header.xid = 0xABC
-
-        dpid = switch_one.id
-        xid_flows = 0xABC
-        napp._multipart_replies_xids = {dpid: {'flows': xid_flows}}
+        flow_msg.header.xid = xid_flows
+        flow_msg.header.length = 64
+        switch_one.flows = [flow]
 
         await napp._handle_multipart_flow_stats(flow_msg, switch_one)
 
-        mock_is_multipart_reply_ours.assert_called_with(flow_msg,
-                                                        switch_one,
-                                                        'flows')
+        mock_multipart_transaction.assert_called_with(flow_msg, switch_one,
+                                                      'flows')
         mock_from_of_flow_stats_v0x04.assert_called_with(flow_msg.body,
                                                          switch_one)
-        mock_update_switch_flows.assert_called_with(switch_one)
-        assert mock_buffer_aput.call_count == 1
-        kytos_event = mock_buffer_aput.call_args[0][0]
+        mock_update_switch_flows.assert_called_with(switch_one, transaction)
+        assert transaction.size == 64
+        assert mock_buffer_aput.call_count == 2
+        kytos_event = mock_buffer_aput.call_args_list[0][0][0]
         assert kytos_event.name == 'kytos/of_core.flow_stats.received'
         assert kytos_event.content['switch'] == switch_one
         assert "replies_flows" in kytos_event.content
+        kytos_event = mock_buffer_aput.call_args_list[1][0][0]
+        assert kytos_event.name == 'kytos/of_core.flow_stats.delta'
+        assert kytos_event.content['switch'] == switch_one
+        assert kytos_event.content['added'] == ["ABC"]
 
         # Test when update_switch_flows fails
         mock_update_switch_flows.side_effect = KeyError()
@@ -409,17 +1036,304 @@ class TestNApp:
         assert mock_log.error.call_count == 1
         mock_buffer_aput.assert_not_called()
 
+    async def test_new_flow_stats_delta(self, switch_one, napp):
+        """Test the flow stats delta against the previous flow stats."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        flows = flows_from_multipart_reply(FLOW_STATS_REPLY)
+        for flow in flows:
+            flow.switch = switch_one
+        await napp._new_flow_stats_delta(switch_one, flows)
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.name == 'kytos/of_core.flow_stats.delta'
+        assert event.content['added'] == [flow.id for flow in flows]
+
+        flows[0].stats.packet_count += 1
+        await napp._new_flow_stats_delta(switch_one, flows[:1])
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.content['added'] == []
+        assert event.content['removed'] == [flows[1].id]
+        assert event.content['changed'] == [flows[0].id]
+
+    async def test_on_multipart_flow_stats_without_delta(self, switch_one,
+                                                         napp):
+        """Test the flow stats delta being disabled by default."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+        await napp._handle_multipart_reply(unpack(FLOW_STATS_REPLY),
+                                           switch_one)
+        assert len(switch_one.flows) == 2
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.name == 'kytos/of_core.flow_stats.received'
+        assert switch_one.id not in napp.flow_indexes
+
+    def test_pop_multipart_replies(self, switch_one, napp):
+        """Test removing the per switch stats state."""
+        napp.flow_indexes[switch_one.id].update([])
+        napp.flow_lookups[switch_one.id].update([])
+        napp.counter_histories[switch_one.id].record_ports([])
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+        napp.pop_multipart_replies(switch_one)
+        assert switch_one.id not in napp.flow_indexes
+        assert switch_one.id not in napp.counter_histories
+        assert switch_one.id not in napp.flow_lookups
+        assert not napp.multipart_transactions.pending(switch_one.id)
+
+    @patch('napps.kytos.of_core.stats.settings')
+    def test_is_multipart_decode_offloaded(self, mock_settings, napp):
+        """Test _is_multipart_decode_offloaded."""
+        mock_settings.FLOW_STATS_REUSE = False
+        mock_settings.MULTIPART_DECODE_WORKERS = 2
+        mock_settings.MULTIPART_DECODE_MIN_BYTES = 64
+        message = LazyMessage(FLOW_STATS_REPLY)
+        assert napp._is_multipart_decode_offloaded(message)
+
+        mock_settings.MULTIPART_DECODE_MIN_BYTES = 1024
+        assert not napp._is_multipart_decode_offloaded(message)
+
+        mock_settings.MULTIPART_DECODE_MIN_BYTES = 8
+        port_desc = LazyMessage(b'\x04\x13\x00\x10\x00\x00\x0a\xbc'
+                                b'\x00\x0d\x00\x00\x00\x00\x00\x00')
+        assert not napp._is_multipart_decode_offloaded(port_desc)
+        barrier_reply = LazyMessage(b'\x04\x15\x00\x08\x00\x00\x00\x02')
+        assert not napp._is_multipart_decode_offloaded(barrier_reply)
+
+        mock_settings.MULTIPART_DECODE_WORKERS = 0
+        assert not napp._is_multipart_decode_offloaded(message)
+
+        mock_settings.FLOW_STATS_REUSE = True
+        mock_settings.FLOW_STATS_STREAMING = False
+        assert napp._is_multipart_decode_offloaded(message)
+        assert not napp._is_multipart_decode_offloaded(port_desc)
+        mock_settings.FLOW_STATS_STREAMING = True
+        assert not napp._is_multipart_decode_offloaded(message)
+
+    @patch('napps.kytos.of_core.settings.FLOW_STATS_DELTA', True)
+    @patch('napps.kytos.of_core.settings.FLOW_STATS_REUSE', True)
+    async def test_on_multipart_flow_stats_reuse(self, switch_one, napp):
+        """Test reusing the flows of the previous flow stats replies."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+        await napp._handle_multipart_reply(LazyMessage(FLOW_STATS_REPLY),
+                                           switch_one)
+        flows = switch_one.flows
+        assert len(flows) == 2
+        assert all(flow.switch == switch_one for flow in flows)
+
+        packet_count = (3).to_bytes(8, 'big')
+        reply = FLOW_STATS_REPLY[:48] + packet_count + FLOW_STATS_REPLY[56:]
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+        await napp._handle_multipart_reply(LazyMessage(reply), switch_one)
+        assert switch_one.flows[0] is flows[0]
+        assert switch_one.flows[1] is flows[1]
+        assert flows[0].stats.packet_count == 3
+        assert not napp.multipart_transactions.pending(switch_one.id)
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.name == 'kytos/of_core.flow_stats.delta'
+        assert event.content['changed'] == [flows[0].id]
+
+        reply = FLOW_STATS_REPLY[:16] + b'\x00\x08' + FLOW_STATS_REPLY[18:]
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+        with patch('napps.kytos.of_core.stats.log') as mock_log:
+            await napp._handle_multipart_reply(LazyMessage(reply),
+                                               switch_one)
+        assert mock_log.error.call_count == 1
+        assert not napp.multipart_transactions.pending(switch_one.id)
+        assert switch_one.flows[0] is flows[0]
+
+    @patch('napps.kytos.of_core.settings.FLOW_STATS_DELTA', True)
+    @patch('napps.kytos.of_core.main.Main._decode_multipart_flows')
+    async def test_on_multipart_flow_stats_offloaded(
+        self,
+        mock_decode_multipart_flows,
+        switch_one,
+        napp
+    ):
+        """Test on multipart flow stats decoded by the worker processes."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        loop = asyncio.get_running_loop()
+
+        def decode(packet):
+            future = loop.create_future()
+            future.set_result(flows_from_multipart_reply(packet))
+            return future
+
+        mock_decode_multipart_flows.side_effect = decode
+        more_reply = (FLOW_STATS_REPLY[:10] + b'\x00\x01' +
+                      FLOW_STATS_REPLY[12:])
+        transaction = napp.multipart_transactions.begin(switch_one.id,
+                                                        0xABC, 'flows')
+
+        await napp._handle_multipart_reply(LazyMessage(more_reply),
+                                           switch_one)
+        napp.controller.buffers.app.aput.assert_not_called()
+        assert len(transaction.decodes) == 1
+
+        await napp._handle_multipart_reply(LazyMessage(FLOW_STATS_REPLY),
+                                           switch_one)
+        assert not transaction.decodes
+        assert transaction.size == 2 * len(FLOW_STATS_REPLY)
+        cost = napp.stats_interval_tuner.cost(switch_one.id)
+        assert cost.size == 2 * len(FLOW_STATS_REPLY)
+        assert cost.messages == 2
+        assert not napp.multipart_transactions.pending(switch_one.id)
+        assert mock_decode_multipart_flows.call_count == 2
+        assert len(switch_one.flows) == 4
+        assert all(flow.switch == switch_one for flow in switch_one.flows)
+        events = [call[0][0] for call in
+                  napp.controller.buffers.app.aput.call_args_list]
+        assert events[0].name == 'kytos/of_core.flow_stats.received'
+        assert events[0].content['replies_flows'] == switch_one.flows
+        assert events[1].name == 'kytos/of_core.flow_stats.delta'
+        assert len(events[1].content['added']) == 2
+
+    @patch('napps.kytos.of_core.main.Main._decode_multipart_flows')
+    async def test_on_multipart_flow_stats_offloaded_order(
+        self,
+        mock_decode_multipart_flows,
+        switch_one,
+        napp
+    ):
+        """Test keeping the order of offloaded and inline replies."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        loop = asyncio.get_running_loop()
+        futures = []
+
+        def decode(packet):
+            futures.append((loop.create_future(), packet))
+            return futures[-1][0]
+
+        mock_decode_multipart_flows.side_effect = decode
+        more_reply = (FLOW_STATS_REPLY[:10] + b'\x00\x01' +
+                      FLOW_STATS_REPLY[12:])
+        last_reply = (FLOW_STATS_REPLY[:28] + (30).to_bytes(2, 'big') +
+                      FLOW_STATS_REPLY[30:84] + (40).to_bytes(2, 'big') +
+                      FLOW_STATS_REPLY[86:])
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+
+        await napp._handle_multipart_reply(LazyMessage(more_reply),
+                                           switch_one)
+        handled = asyncio.create_task(
+            napp._handle_multipart_reply(unpack(last_reply), switch_one))
+        await asyncio.sleep(0)
+        future, packet = futures[0]
+        future.set_result(flows_from_multipart_reply(packet))
+        await handled
+        assert [flow.priority for flow in switch_one.flows] == [10, 20, 30,
+                                                                40]
+        assert all(flow.switch == switch_one for flow in switch_one.flows)
+
+    @patch('napps.kytos.of_core.stats.log')
+    @patch('napps.kytos.of_core.main.Main._decode_multipart_flows')
+    async def test_on_multipart_flow_stats_offload_error(
+        self,
+        mock_decode_multipart_flows,
+        mock_log,
+        switch_one,
+        napp
+    ):
+        """Test on multipart flow stats failing in a worker process."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        future = asyncio.get_running_loop().create_future()
+        future.set_exception(UnpackException('invalid'))
+        mock_decode_multipart_flows.return_value = future
+        napp.flow_stats_policy.restore = MagicMock()
+        napp._aggregate_stats[switch_one.id] = {'flow_count': 3}
+        flow_filter = FlowStatsFilter(1)
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows',
+                                          flow_filter)
+
+        await napp._handle_multipart_flow_stats(LazyMessage(FLOW_STATS_REPLY),
+                                                switch_one)
+        assert mock_log.error.call_count == 1
+        assert not napp.multipart_transactions.pending(switch_one.id)
+        napp.controller.buffers.app.aput.assert_not_called()
+        napp.flow_stats_policy.restore.assert_called_once_with(
+            switch_one.id, flow_filter)
+        assert switch_one.id not in napp._aggregate_stats
+
+    @patch('napps.kytos.of_core.stats.settings')
+    async def test_on_multipart_flow_stats_streaming(
+        self,
+        mock_settings,
+        switch_one,
+        napp
+    ):
+        """Test on multipart flow stats emitting a chunk per reply."""
+        mock_settings.FLOW_STATS_STREAMING = True
+        mock_settings.COUNTER_HISTORY_SIZE = 4
+        history = napp.counter_histories[switch_one.id] = MagicMock()
+        napp.controller._buffers.app.aput = AsyncMock()
+        transaction = napp.multipart_transactions.begin(switch_one.id,
+                                                        0xABC, 'flows')
+        more_reply = unpack(FLOW_STATS_REPLY[:10] + b'\x00\x01' +
+                            FLOW_STATS_REPLY[12:])
+        last_reply = unpack(FLOW_STATS_REPLY)
+
+        assert not await napp._handle_multipart_flow_stats(more_reply,
+                                                           switch_one)
+        history.expire.assert_not_called()
+        assert await napp._handle_multipart_flow_stats(last_reply,
+                                                       switch_one)
+        assert history.record_flows.call_count == 2
+        history.expire.assert_called_once_with('flows')
+        events = [call[0][0] for call in
+                  napp.controller.buffers.app.aput.call_args_list]
+        assert [event.name for event in events] == [
+            'kytos/of_core.flow_stats.chunk'
+        ] * 2
+        assert [event.content['index'] for event in events] == [0, 1]
+        assert [event.content['last'] for event in events] == [False, True]
+        assert all(event.content['xid'] == 0xABC for event in events)
+        flows = events[0].content['flows']
+        assert [flow.priority for flow in flows] == [10, 20]
+        assert all(flow.switch == switch_one for flow in flows)
+        assert transaction.chunks == 2
+        assert transaction.size == 2 * len(FLOW_STATS_REPLY)
+        assert not transaction.replies
+        assert not napp.multipart_transactions.pending(switch_one.id)
+
+    @patch('napps.kytos.of_core.stats.settings')
+    @patch('napps.kytos.of_core.main.Main._decode_multipart_flows')
+    async def test_on_multipart_flow_stats_streaming_offloaded(
+        self,
+        mock_decode_multipart_flows,
+        mock_settings,
+        switch_one,
+        napp
+    ):
+        """Test streaming flow stats decoded by the worker processes."""
+        mock_settings.FLOW_STATS_STREAMING = True
+        mock_settings.COUNTER_HISTORY_SIZE = 0
+        napp.controller._buffers.app.aput = AsyncMock()
+        napp.multipart_transactions.begin(switch_one.id, 0xABC, 'flows')
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(flows_from_multipart_reply(FLOW_STATS_REPLY))
+        mock_decode_multipart_flows.return_value = future
+
+        assert await napp._handle_multipart_flow_stats(
+            LazyMessage(FLOW_STATS_REPLY), switch_one
+        )
+        event = napp.controller.buffers.app.aput.call_args[0][0]
+        assert event.content['index'] == 0
+        assert event.content['last']
+        assert all(flow.switch == switch_one
+                   for flow in event.content['flows'])
+
     @patch('napps.kytos.of_core.table.TableStats.from_of_table_stats')
-    @patch('napps.kytos.of_core.main.Main._is_multipart_reply_ours')
+    @patch('napps.kytos.of_core.main.Main._multipart_transaction')
     async def test_on_multipart_table_stats(
         self,
-        mock_is_multipart_reply_ours,
+        mock_multipart_transaction,
         mock_from_of_table_stats,
         switch_one,
         napp
     ):
         """Test on multipart table stats."""
-        mock_is_multipart_reply_ours.return_value = True
+        dpid = switch_one.id
+        xid_tables = 0xABC
+        transaction = napp.multipart_transactions.begin(dpid, xid_tables,
+                                                        'tables')
+        mock_multipart_transaction.return_value = transaction
 
         mock_buffer_aput = AsyncMock()
         napp.controller._buffers.app.aput = mock_buffer_aput
@@ -428,17 +1342,14 @@ class TestNApp:
         table_msg.body = "A"
         table_msg.flags.value = 2
         table_msg.body_type = MultipartType.OFPMP_TABLE
-        table_msg.header.xid = 0xABC
-
-        dpid = switch_one.id
-        xid_tables = 0xABC
-        napp._multipart_replies_xids = {dpid: {'tables': xid_tables}}
+        table_msg.header.xid = xid_tables
+        table_msg.header.length = 32
 
         await napp._handle_multipart_table_stats(table_msg, switch_one)
 
-        mock_is_multipart_reply_ours.assert_called_with(table_msg,
-                                                        switch_one,
-                                                        'tables')
+        mock_multipart_transaction.assert_called_with(table_msg, switch_one,
+                                                      'tables')
+        assert not napp.multipart_transactions.pending(dpid)
         mock_from_of_table_stats.assert_called_with(table_msg.body,
                                                     switch_one)
         assert mock_buffer_aput.call_count == 1
@@ -448,29 +1359,68 @@ class TestNApp:
         assert "replies_tables" in kytos_event.content
 
     @patch('napps.kytos.of_core.main.Main._new_port_stats')
-    @patch('napps.kytos.of_core.main.Main._is_multipart_reply_ours')
+    @patch('napps.kytos.of_core.port_stats.PortStats.from_of_port_stats')
+    @patch('napps.kytos.of_core.main.Main._multipart_transaction')
     async def test_handle_multipart_port_stats(
         self,
-        mock_is_multipart_reply_ours,
+        mock_multipart_transaction,
+        mock_from_of_port_stats,
         mock_new_port_stats,
         switch_one,
         napp,
     ):
         """Test handle multipart flow stats."""
-        mock_is_multipart_reply_ours.return_value = True
+        transaction = napp.multipart_transactions.begin(switch_one.id, 0xABC,
+                                                        'ports')
+        mock_multipart_transaction.return_value = transaction
+        port_stats = MagicMock()
+        mock_from_of_port_stats.return_value = port_stats
 
         port_stats_msg = MagicMock()
         port_stats_msg.body = "A"
         port_stats_msg.flags.value = 2
+        port_stats_msg.header.length = 128
         port_stats_msg.multipart_type = MultipartType.OFPMP_PORT_STATS
 
         await napp._handle_multipart_port_stats(port_stats_msg,
                                                 switch_one)
 
-        mock_is_multipart_reply_ours.assert_called_with(port_stats_msg,
-                                                        switch_one,
+        mock_multipart_transaction.assert_called_with(port_stats_msg,
+                                                      switch_one, 'ports')
+        mock_from_of_port_stats.assert_called_with("A")
+        mock_new_port_stats.assert_called_with(switch_one, transaction)
+        assert transaction.replies == [port_stats]
+        assert transaction.size == 128
+
+    async def test_new_port_stats(self, switch_one, napp):
+        """Test sending the port stats along with their rates."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        samples = [PortStats(1, duration_sec=10, rx_bytes=1000),
+                   PortStats(1, duration_sec=20, rx_bytes=2000)]
+        for sample in samples:
+            transaction = napp.multipart_transactions.begin(switch_one.id,
+                                                            0xABC, 'ports')
+            transaction.add([sample], 128)
+            await napp._new_port_stats(switch_one, transaction)
+        assert not napp.multipart_transactions.pending(switch_one.id)
+        events = [call[0][0] for call in
+                  napp.controller.buffers.app.aput.call_args_list]
+        assert events[0].name == 'kytos/of_core.port_stats'
+        assert events[0].content['port_stats'] == samples[:1]
+        assert events[0].content['port_rates'] == {}
+        assert events[1].content['port_stats'] == samples[1:]
+        assert events[1].content['port_rates'][1].rx_bps == 800
+
+    @patch('napps.kytos.of_core.settings.COUNTER_HISTORY_SIZE', 4)
+    async def test_new_port_stats_counter_history(self, switch_one, napp):
+        """Test keeping the port counters in the counter history."""
+        napp.controller._buffers.app.aput = AsyncMock()
+        transaction = napp.multipart_transactions.begin(switch_one.id, 0xABC,
                                                         'ports')
-        mock_new_port_stats.assert_called_with(switch_one)
+        transaction.add([PortStats(1, rx_bytes=1000)], 128)
+        await napp._new_port_stats(switch_one, transaction)
+        ring = napp.counter_histories[switch_one.id].ring('ports', 1)
+        assert [value for _, value in ring.samples('rx_bytes')] == [1000]
 
     @patch('napps.kytos.of_core.main.Main.update_port_status')
     @patch('napps.kytos.of_core.main.Main.update_links')
@@ -500,6 +1450,41 @@ class TestNApp:
         mock_update_links.assert_called_with(msg_packet_in_mock,
                                              mock_packet_in_connection)
 
+    @patch('napps.kytos.of_core.main.Main.update_port_status')
+    @patch('napps.kytos.of_core.main.Main.update_links')
+    async def test_aemit_messages_in(
+        self,
+        mock_update_links,
+        mock_update_port_status,
+        napp
+    ):
+        """Test aemit_messages_in."""
+        napp.controller._buffers.msg_in.aput = AsyncMock()
+        mock_connection = MagicMock()
+        msg_port_mock = MagicMock()
+        msg_port_mock.header.message_type = Type.OFPT_PORT_STATUS
+        msg_port_mock.header.version = 0x04
+        msg_packet_in_mock = MagicMock()
+        msg_packet_in_mock.header.message_type = Type.OFPT_PACKET_IN
+        msg_packet_in_mock.header.version = 0x04
+        messages = [msg_packet_in_mock, msg_port_mock]
+        await napp.aemit_messages_in(mock_connection, messages)
+
+        events = [call[0][0] for call in
+                  napp.controller.buffers.msg_in.aput.call_args_list]
+        assert [event.content['message'] for event in events] == messages
+        assert events[0].name == \
+            'kytos/of_core.v0x04.messages.in.ofpt_packet_in'
+        mock_update_port_status.assert_called_with(msg_port_mock,
+                                                   mock_connection)
+        mock_update_links.assert_called_with(msg_packet_in_mock,
+                                             mock_connection)
+
+        napp.controller.buffers.msg_in.aput.call_count = 0
+        mock_connection.is_alive.return_value = False
+        await napp.aemit_messages_in(mock_connection, messages)
+        napp.controller.buffers.msg_in.aput.assert_not_called()
+
     async def test_emit_message_out(self, napp):
         """Test emit message_out."""
         mock_aemit_message_out = AsyncMock()
@@ -515,13 +1500,37 @@ class TestNApp:
         dpid = "1"
         event, switch = MagicMock(), MagicMock(id=dpid)
         event.content["destination"].switch = switch
-        napp._multipart_replies_xids[dpid] = {"flows": 2, "ports": 3}
-        napp._multipart_replies_flows[dpid] = [MagicMock()]
-        napp._multipart_replies_ports[dpid] = [MagicMock()]
+        napp.multipart_transactions.begin(dpid, 2, 'flows').add(
+            [MagicMock()], 64)
+        napp.multipart_transactions.begin(dpid, 3, 'ports').add(
+            [MagicMock()], 64)
+        connection = event.content["destination"]
+        napp.connection_contexts.get_or_create(connection)
         await napp.on_openflow_connection_error(event)
-        assert dpid not in napp._multipart_replies_xids
-        assert dpid not in napp._multipart_replies_flows
-        assert dpid not in napp._multipart_replies_ports
+        assert not napp.multipart_transactions.pending(dpid)
+        assert connection.id not in napp.connection_contexts
+
+    async def test_on_openflow_connection_lost(self, napp) -> None:
+        """Test on_openflow_connection_lost."""
+        event = MagicMock()
+        connection = event.content["source"]
+        connection.switch.id = '00:00:00:00:00:00:00:01'
+        napp.connection_contexts.get_or_create(connection)
+        napp.counter_histories[connection.switch.id].record_ports([])
+        assert len(napp.connection_contexts) == 1
+        await napp.on_openflow_connection_lost(event)
+        assert not napp.connection_contexts
+        assert not napp.counter_histories
+
+    async def test_on_raw_in_dead_connection(self, napp) -> None:
+        """Test on_raw_in not creating contexts of dead connections."""
+        mock_connection = MagicMock()
+        mock_connection.is_alive.return_value = False
+        content = {'source': mock_connection, 'new_data': b'\x04'}
+        mock_event = get_kytos_event_mock(name='kytos/core.openflow.raw.in',
+                                          content=content)
+        await napp.on_raw_in(mock_event)
+        assert not napp.connection_contexts
 
     async def test_on_openflow_connection_error_no_sw(self, napp) -> None:
         """Test on_openflow_connection_error no switch."""
@@ -573,14 +1582,13 @@ class TestMain:
     @patch('napps.kytos.of_core.v0x04.utils.send_echo')
     def test_execute(self, mock_of_core_v0x04_utils):
         """Test execute."""
-        self.napp.request_stats = MagicMock()
         self.switch_v0x04.is_connected.return_value = True
 
         self.napp.controller.switches = {"00:00:00:00:00:00:00:01":
                                          self.switch_v0x04}
         self.napp.execute()
-        mock_of_core_v0x04_utils.assert_called()
-        assert self.napp.request_stats.call_count == 1
+        mock_of_core_v0x04_utils.assert_called_with(self.napp.controller,
+                                                    self.switch_v0x04)
 
     def _add_features_switch(self, switch):
         """Auxiliar function to get switch mock"""
@@ -589,115 +1597,70 @@ class TestMain:
         switch.features.capabilities.value = 2
         return switch
 
-    @patch('napps.kytos.of_core.main.settings')
-    def test_check_overlapping_multipart_request(self, mock_settings):
+    @patch('napps.kytos.of_core.stats.log')
+    def test_check_overlapping_multipart_request(self, mock_log):
         """Test check_overlapping_multipart_request."""
-        mock_settings.STATS_REQ_SKIP = 3
         dpid = '00:00:00:00:00:00:00:01'
         mock_switch = get_switch_mock(dpid)
         mock_switch.id = dpid
+        transactions = self.napp.multipart_transactions
 
         # Case 1: skipped due to delayed flow stats
-        self.napp._multipart_replies_xids = {dpid: {'flows': 0xABC}}
-        assert self.napp._check_overlapping_multipart_request(mock_switch)
-        assert self.napp._multipart_replies_xids[dpid]['skipped'] == 1
+        transactions.begin(dpid, 0xABC, 'flows')
+        transactions.begin(dpid, 0xABE, 'port_desc')
+        assert self.napp._check_overlapping_multipart_request(
+            mock_switch) == {'flows'}
+        transactions.finish(dpid, 0xABE)
 
         # Case 2: skipped due to delayed port stats
-        self.napp._multipart_replies_xids = {dpid: {'ports': 0xABC,
-                                                    'skipped': 1}}
+        transactions.pop(dpid)
+        transactions.begin(dpid, 0xABD, 'ports')
         assert self.napp._check_overlapping_multipart_request(mock_switch)
-        assert self.napp._multipart_replies_xids[dpid]['skipped'] == 2
-
-        # Case 3: delayed port or flow stats but already skipped X times
-        self.napp._multipart_replies_flows = {dpid: mock_switch}
-        self.napp._multipart_replies_ports = {dpid: mock_switch}
-        self.napp._multipart_replies_xids = {dpid: {'flows': 0xABC,
-                                                    'ports': 0xABC,
-                                                    'skipped': 3}}
+        assert mock_log.warning.call_count == 0
+
+        # Case 3: delayed port or flow stats that timed out
+        flows = transactions.begin(dpid, 0xABC, 'flows')
+        flows.add([MagicMock()], 64)
+        for transaction in transactions.pending(dpid):
+            transaction.deadline = 0
         assert not self.napp._check_overlapping_multipart_request(mock_switch)
-        assert not self.napp._multipart_replies_flows
-        assert not self.napp._multipart_replies_ports
+        assert not flows.replies
+        assert not transactions.pending(dpid)
+        assert mock_log.warning.call_count == 2
 
-    @patch('napps.kytos.of_core.main.settings')
-    def test_get_switch_req_stats_delay(self, mock_settings):
-        """Test _get_switch_req_stats_delay."""
-        mock_settings.STATS_INTERVAL = 60
+    def test_check_overlapping_multipart_request_restore(self):
+        """Test requesting again the changed tables of a timed out request.
+        """
         dpid = '00:00:00:00:00:00:00:01'
         mock_switch = get_switch_mock(dpid)
         mock_switch.id = dpid
+        self.napp.flow_stats_policy = FlowStatsPolicy('table_changes', [])
+        policy = self.napp.flow_stats_policy
+        policy.update_tables(dpid, [TableStats(mock_switch, 0, 5),
+                                    TableStats(mock_switch, 1, 2)])
+        policy.next_filter(dpid)
+        policy.update_tables(dpid, [TableStats(mock_switch, 1, 3)])
+        flow_filter = policy.next_filter(dpid)
+        assert flow_filter.table_id == 1
+
+        flows = self.napp.multipart_transactions.begin(dpid, 0xABC, 'flows',
+                                                       flow_filter)
+        flows.deadline = 0
+        ports = self.napp.multipart_transactions.begin(dpid, 0xABD, 'ports')
+        ports.deadline = 0
+        self.napp._aggregate_stats[dpid] = {'flow_count': 7}
+        assert not self.napp._check_overlapping_multipart_request(mock_switch)
+        assert policy.next_filter(dpid) == flow_filter
+        assert dpid not in self.napp._aggregate_stats
 
-        # Case 1: switch already known
-        self.napp.switch_req_stats_delay = {dpid: 9}
-        assert self.napp._get_switch_req_stats_delay(mock_switch) == 9
-
-        # Case 2: switch unknown, it should have a new delay based on
-        # STATS_INTERVAL
-        self.napp.switch_req_stats_delay = {}
-        assert self.napp._get_switch_req_stats_delay(mock_switch) == 3
-
-        # Case 3: switch unknown but there are other switches, it should have
-        # a new delay based on STATS_INTERVAL and different from others
-        dpid2 = '00:00:00:00:00:00:00:02'
-        mock_sw2 = get_switch_mock(dpid2)
-        mock_sw2.id = dpid2
-        self.napp.switch_req_stats_delay = {dpid: 3, 'last': 3}
-        assert self.napp._get_switch_req_stats_delay(mock_sw2) == 6
-
-    @patch('time.sleep', return_value=None)
-    @patch('napps.kytos.of_core.main.Main.'
-           '_check_overlapping_multipart_request')
-    @patch('napps.kytos.of_core.v0x04.utils.update_flow_list')
-    @patch('napps.kytos.of_core.v0x04.utils.request_table_stats')
-    def test_request_stats(self, *args):
-        """Test request flow list."""
-        (mock_request_table_stats_v0x4, mock_update_flow_list_v0x04,
-            mock_check_overlapping_multipart_request, _) = args
-        mock_update_flow_list_v0x04.return_value = 0xABC
-        mock_check_overlapping_multipart_request.return_value = False
-        self.switch_v0x04 = self._add_features_switch(self.switch_v0x04)
-        self.napp._request_stats(self.switch_v0x04)
-        mock_update_flow_list_v0x04.assert_called_with(self.napp.controller,
-                                                       self.switch_v0x04)
-        mock_request_table_stats_v0x4.return_value = 0xABC
-        mock_request_table_stats_v0x4.assert_called_with(self.napp.controller,
-                                                         self.switch_v0x04)
-
-        mock_update_flow_list_v0x04.call_count = 0
-        mock_check_overlapping_multipart_request.return_value = True
-        self.napp._request_stats(self.switch_v0x04)
-        mock_update_flow_list_v0x04.assert_not_called()
-
-    @patch('time.sleep', return_value=None)
-    @patch('napps.kytos.of_core.main.Main.'
-           '_check_overlapping_multipart_request')
-    @patch('napps.kytos.of_core.v0x04.utils.request_table_stats')
-    def test_request_stats_no_capabilities_for_table(self, *args):
-        """Test request flow list."""
-        (mock_request_table_stats_v0x4,
-            mock_check_overlapping_multipart_request, _) = args
-        mock_check_overlapping_multipart_request.return_value = False
-        self.napp._request_stats(self.switch_v0x04)
-        mock_request_table_stats_v0x4.return_value = 0xABC
-        mock_request_table_stats_v0x4.assert_not_called()
-
-    @patch('time.sleep', return_value=None)
-    @patch('napps.kytos.of_core.v0x04.utils.update_flow_list')
-    def test_on_handshake_completed_request_stats(self, *args):
-        """Test request flow list."""
-        (mock_update_flow_list_v0x04, _) = args
-        mock_update_flow_list_v0x04.return_value = 0xABC
-        sw = self._add_features_switch(self.switch_v0x04)
-        self.napp.handle_handshake_completed_request_stats(sw)
-        mock_update_flow_list_v0x04.assert_called_with(self.napp.controller,
-                                                       self.switch_v0x04)
-
+    @patch('napps.kytos.of_core.v0x04.utils.send_port_request')
     @patch('napps.kytos.of_core.v0x04.utils.send_set_config')
     @patch('napps.kytos.of_core.v0x04.utils.send_desc_request')
     @patch('napps.kytos.of_core.v0x04.utils.handle_features_reply')
     def test_handle_features_reply(self, *args):
         """Test handle features reply."""
         (mock_freply_v0x04, mock_send_desc_request_v0x04,
-         mock_send_set_config_v0x04) = args
+         mock_send_set_config_v0x04, mock_send_port_request_v0x04) = args
         mock_buffers_put = MagicMock()
         self.napp.controller._buffers.app.put = mock_buffers_put
         dpid = self.switch_v0x04.connection.switch.dpid
@@ -712,25 +1675,28 @@ class TestMain:
         assert count == 0
 
         # To simulate a few existing multipart replies for extra test cov
-        self.napp._multipart_replies_xids[dpid] = {"flows": 2, "ports": 3}
-        self.napp._multipart_replies_flows[dpid] = [MagicMock()]
-        self.napp._multipart_replies_ports[dpid] = [MagicMock()]
-        self.napp._multipart_replies_tables[dpid] = [MagicMock()]
+        self.napp.multipart_transactions.begin(dpid, 2, 'flows')
+        self.napp.multipart_transactions.begin(dpid, 3, 'ports')
+        self.napp.multipart_transactions.begin(dpid, 4, 'tables')
 
         self.napp.handle_features_reply(event)
         count = self.switch_v0x04.connection.switch.update_lastseen.call_count
         assert count == 1
-        mock_freply_v0x04.assert_called_with(self.napp.controller, event)
+        mock_freply_v0x04.assert_called_with(self.napp.controller, event,
+                                             request_port_desc=False)
+        xids = pending_xids(self.napp, dpid)
+        mock_send_port_request_v0x04.assert_called_with(
+            self.napp.controller, self.switch_v0x04.connection,
+            xid=xids['port_desc'])
         mock_send_desc_request_v0x04.assert_called_with(
-            self.napp.controller, self.switch_v0x04.connection.switch)
+            self.napp.controller, self.switch_v0x04.connection.switch,
+            xid=xids['desc'])
         mock_send_set_config_v0x04.assert_called_with(
             self.napp.controller, self.switch_v0x04.connection.switch)
 
-        # Make sure it was cleaned up when handling features reply
-        assert dpid not in self.napp._multipart_replies_xids
-        assert dpid not in self.napp._multipart_replies_flows
-        assert dpid not in self.napp._multipart_replies_ports
-        assert dpid not in self.napp._multipart_replies_tables
+        # Make sure the previous requests were cleaned up when handling
+        # features reply, and the desc and port desc ones are tracked
+        assert set(xids) == {'port_desc', 'desc'}
 
         mock_buffers_put.assert_called()
 
@@ -757,11 +1723,12 @@ class TestMain:
         dpid = '00:00:00:00:00:00:00:01'
         mock_switch = get_switch_mock(dpid)
         mock_switch.id = dpid
-        self.napp._multipart_replies_flows = {dpid: mock_switch}
-        self.napp._multipart_replies_xids = {dpid: {'flows': 0xABC}}
-        self.napp._update_switch_flows(mock_switch)
-        assert self.napp._multipart_replies_xids == {dpid: {}}
-        assert not self.napp._multipart_replies_flows
+        transaction = self.napp.multipart_transactions.begin(dpid, 0xABC,
+                                                             'flows')
+        transaction.add([MagicMock()], 64)
+        self.napp._update_switch_flows(mock_switch, transaction)
+        assert mock_switch.flows == transaction.replies
+        assert not self.napp.multipart_transactions.pending(dpid)
 
     def test_is_multipart_reply_ours(self):
         """Test _is_multipart_reply_ours."""
@@ -769,14 +1736,18 @@ class TestMain:
         dpid_b = '00:00:00:00:00:00:00:02'
         mock_switch = get_switch_mock(dpid_a)
         mock_reply = MagicMock()
-        mock_reply.header.xid = mock_switch
-        type(mock_switch).id = PropertyMock(side_effect=[dpid_a,
-                                                         dpid_a, dpid_b])
-        self.napp._multipart_replies_xids = {dpid_a: {'flows': mock_switch}}
+        mock_reply.header.xid = 0xABC
+        type(mock_switch).id = PropertyMock(side_effect=[dpid_a, dpid_a,
+                                                         dpid_b])
+        self.napp.multipart_transactions.begin(dpid_a, 0xABC, 'flows')
         response = self.napp._is_multipart_reply_ours(
             mock_reply, mock_switch, 'flows')
         assert response
 
+        response = self.napp._is_multipart_reply_ours(
+            mock_reply, mock_switch, 'ports')
+        assert not response
+
         response = self.napp._is_multipart_reply_ours(
             mock_reply, mock_switch, 'flows')
         assert not response
@@ -807,6 +1778,19 @@ class TestMain:
                                            data=mock_echo_request.data)
         mock_emit_message_out.assert_called_with(mock_event.source, "A")
 
+    @patch('napps.kytos.of_core.main.settings')
+    @patch('napps.kytos.of_core.main.Main.handle_echo_request')
+    def test_on_echo_request(self, mock_handle_echo_request, mock_settings):
+        """Test on_echo_request skipped by the echo reply fast path."""
+        mock_event = MagicMock()
+        mock_settings.ECHO_REPLY_FAST_PATH = True
+        self.napp.on_echo_request(mock_event)
+        mock_handle_echo_request.assert_not_called()
+
+        mock_settings.ECHO_REPLY_FAST_PATH = False
+        self.napp.on_echo_request(mock_event)
+        mock_handle_echo_request.assert_called_with(mock_event)
+
     def test_handle_features_request_sent(self):
         """Test tests_handle_features_request_sent."""
         mock_protocol = MagicMock()
@@ -833,6 +1817,20 @@ class TestMain:
         self.napp.shutdown()
         assert mock_log.debug.call_count == 1
 
+    @patch('napps.kytos.of_core.settings.MULTIPART_DECODE_WORKERS', 2)
+    @patch('napps.kytos.of_core.stats.ProcessPoolExecutor')
+    def test_setup_multipart_decode_pool(self, mock_pool):
+        """Test starting the decode workers with a fork server."""
+        assert self.napp._multipart_decode_pool is None
+        napp = type(self.napp)(get_controller_mock())
+        assert napp._multipart_decode_pool is mock_pool.return_value
+        kwargs = mock_pool.call_args[1]
+        assert kwargs['max_workers'] == 2
+        assert kwargs['mp_context'].get_start_method() == 'forkserver'
+        napp.shutdown()
+        mock_pool.return_value.shutdown.assert_called_once_with(
+            wait=False, cancel_futures=True)
+
     @patch('napps.kytos.of_core.main.Ethernet')
     def test_update_links(self, mock_ethernet):
         """Test update_links."""
@@ -125,3 +125,25 @@ class TestMatch:
             Match04(nw_src="192.168.260.1")
         with pytest.raises(TypeError):
             Match04(nw_dst="192.168.0.1/24")
+
+    def test_sparse_fields(self):
+        """Test storing only the fields that are set."""
+        match = Match04(in_port=1, nw_src='10.0.0.1/32')
+        assert vars(match) == {'in_port': 1, 'nw_src': '10.0.0.1'}
+        assert match.dl_vlan is None
+        assert match.nw_dst is None
+        with pytest.raises(AttributeError):
+            match.nw_srcs  # pylint: disable=pointless-statement
+
+        match.nw_src = None
+        match.dl_vlan = 2
+        assert vars(match) == {'in_port': 1, 'dl_vlan': 2}
+        assert Match04.from_dict({'dl_vlan': 2, 'unknown': 3,
+                                  'in_port': 1}).as_dict() == \
+            match.as_dict()
+
+        match.in_port = None
+        match.dl_vlan = None
+        assert not vars(match)
+        assert match.in_port is None
+        assert Match04.from_dict({'in_port': None}).as_dict() == {}
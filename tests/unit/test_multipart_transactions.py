@@ -0,0 +1,112 @@
+"""Test multipart_transactions module."""
+from unittest.mock import MagicMock, patch
+
+from napps.kytos.of_core.multipart_transactions import (MultipartTransaction,
+                                                        MultipartTransactions)
+
+DPID = '00:00:00:00:00:00:00:01'
+
+
+class TestMultipartTransaction:
+    """Test MultipartTransaction."""
+
+    @patch('napps.kytos.of_core.multipart_transactions.time.monotonic')
+    def test_add_and_expire(self, mock_monotonic):
+        """Test reassembling the replies until the deadline."""
+        mock_monotonic.return_value = 100
+        transaction = MultipartTransaction(0xABC, 'flows', 10)
+        transaction.add([1, 2], 64)
+        transaction.add([3], 32)
+        assert transaction.replies == [1, 2, 3]
+        assert transaction.size == 96
+        assert not transaction.is_expired()
+        assert not transaction.is_expired(109.9)
+        assert transaction.is_expired(110)
+
+    def test_add_decode_and_insert(self):
+        """Test keeping the order of the replies being decoded."""
+        transaction = MultipartTransaction(0xABC, 'flows', 10)
+        first, third = MagicMock(), MagicMock()
+        transaction.add_decode(first, 64)
+        transaction.add([3, 4], 64)
+        transaction.add_decode(third, 64)
+        transaction.add([6], 32)
+        assert transaction.decodes == [(0, first), (2, third)]
+        assert transaction.size == 224
+        assert transaction.messages == 4
+
+        transaction.insert([(0, [1, 2]), (2, [5])])
+        assert transaction.replies == [1, 2, 3, 4, 5, 6]
+
+    def test_discard(self):
+        """Test dropping the replies and the pending decodes."""
+        transaction = MultipartTransaction(0xABC, 'flows', 10)
+        decode = MagicMock()
+        transaction.add_decode(decode, 64)
+        transaction.add([1], 64)
+        transaction.discard()
+        decode.cancel.assert_called_once()
+        assert not transaction.decodes
+        assert not transaction.replies
+
+
+class TestMultipartTransactions:
+    """Test MultipartTransactions."""
+
+    def test_begin_get_finish(self):
+        """Test concurrent transactions of a switch."""
+        transactions = MultipartTransactions(10)
+        flows = transactions.begin(DPID, 0xABC, 'flows')
+        ports = transactions.begin(DPID, 0xABD, 'ports')
+        assert len(transactions) == 2
+        assert transactions.get(DPID, 0xABC) is flows
+        assert transactions.get(DPID, 0xABC, 'flows') is flows
+        assert transactions.get(DPID, 0xABC, 'ports') is None
+        assert transactions.get(DPID, 0xABE) is None
+        assert transactions.get('other', 0xABC) is None
+        assert transactions.pending(DPID) == [flows, ports]
+
+        assert transactions.finish(DPID, 0xABC) is flows
+        assert transactions.finish(DPID, 0xABC) is None
+        assert transactions.pending(DPID) == [ports]
+        assert transactions.finish(DPID, 0xABD) is ports
+        assert not transactions.pending(DPID)
+        assert not len(transactions)
+
+    @patch('napps.kytos.of_core.multipart_transactions.random.getrandbits')
+    def test_begin_new_xid(self, mock_getrandbits):
+        """Test beginning a transaction with a new unused xid."""
+        mock_getrandbits.side_effect = [0xABC, 0xABC, 0xABD]
+        transactions = MultipartTransactions(10)
+        assert transactions.begin(DPID, None, 'flows').xid == 0xABC
+        assert transactions.begin(DPID, None, 'ports').xid == 0xABD
+        assert transactions.get(DPID, 0xABC, 'flows')
+
+    @patch('napps.kytos.of_core.multipart_transactions.time.monotonic')
+    def test_expire(self, mock_monotonic):
+        """Test reclaiming the transactions without their last reply."""
+        transactions = MultipartTransactions(10)
+        mock_monotonic.return_value = 100
+        flows = transactions.begin(DPID, 0xABC, 'flows')
+        flows.add([1], 64)
+        mock_monotonic.return_value = 105
+        ports = transactions.begin(DPID, 0xABD, 'ports')
+        assert not transactions.expire(DPID)
+
+        mock_monotonic.return_value = 110
+        assert transactions.expire(DPID) == [flows]
+        assert not flows.replies
+        assert transactions.pending(DPID) == [ports]
+
+    def test_pop_and_size(self):
+        """Test the size of the replies and removing a switch."""
+        transactions = MultipartTransactions(10)
+        transactions.begin(DPID, 0xABC, 'flows').add([1], 64)
+        transactions.begin(DPID, 0xABD, 'ports').add([2], 32)
+        transactions.begin('other', 0xABC, 'flows').add([3], 16)
+        assert transactions.size(DPID) == 96
+        assert transactions.size() == 112
+
+        transactions.pop(DPID)
+        assert not transactions.pending(DPID)
+        assert transactions.size() == 16
@@ -0,0 +1,111 @@
+"""Test port_stats module."""
+import pytest
+from napps.kytos.of_core.port_stats import (DURATION_UNAVAILABLE,
+                                            PORT_STATS_COUNTERS, PortRates,
+                                            PortStats, PortStatsIndex)
+from pyof.v0x04.controller2switch.multipart_reply import \
+    PortStats as OFPortStats
+
+
+class TestPortStats:
+    """Test PortStats."""
+
+    def test_init(self):
+        """Test the counters defaulting to 0."""
+        port_stats = PortStats(1, duration_sec=3, rx_bytes=64)
+        assert port_stats.rx_bytes == 64
+        assert port_stats.tx_bytes == 0
+        assert not hasattr(port_stats, '__dict__')
+        with pytest.raises(TypeError):
+            PortStats(1, rx_bits=64)
+
+    def test_from_of_port_stats(self):
+        """Test converting an unpacked python-openflow PortStats."""
+        counters = {counter: 0 for counter in PORT_STATS_COUNTERS}
+        counters.update(rx_packets=5, rx_bytes=64, rx_crc_err=1)
+        packed = OFPortStats(port_no=1, duration_sec=3,
+                             duration_nsec=500000000, **counters).pack()
+        of_port_stats = OFPortStats()
+        of_port_stats.unpack(packed)
+
+        port_stats = PortStats.from_of_port_stats(of_port_stats)
+        assert port_stats == PortStats(1, 3, 500000000, **counters)
+        assert port_stats.duration == 3.5
+        assert port_stats.as_dict()['rx_crc_err'] == 1
+
+    def test_has_duration(self):
+        """Test the durations the switches report when they don't know it."""
+        assert PortStats(1, 3).has_duration
+        assert PortStats(1, 0, 500).has_duration
+        assert not PortStats(1).has_duration
+        assert not PortStats(1, DURATION_UNAVAILABLE,
+                             DURATION_UNAVAILABLE).has_duration
+
+
+class TestPortRates:
+    """Test PortRates."""
+
+    def test_rates(self):
+        """Test the rates between two samples."""
+        previous = PortStats(1, 10, rx_bytes=1000, tx_bytes=500,
+                             rx_packets=10, tx_packets=5, rx_errors=1)
+        current = PortStats(1, 12, rx_bytes=3000, tx_bytes=500,
+                            rx_packets=30, tx_packets=5, rx_errors=3)
+        assert PortRates.is_valid(previous, current)
+        rates = PortRates(previous, current)
+        assert rates.as_dict() == {
+            'port_no': 1, 'interval': 2, 'rx_bps': 8000, 'tx_bps': 0,
+            'rx_pps': 10, 'tx_pps': 0, 'rx_error_rate': 1, 'tx_error_rate': 0
+        }
+
+    def test_is_valid(self):
+        """Test samples without elapsed time or with reset counters."""
+        previous = PortStats(1, 10, rx_bytes=1000)
+        assert not PortRates.is_valid(previous, PortStats(1, 10,
+                                                          rx_bytes=2000))
+        assert not PortRates.is_valid(previous, PortStats(1, 2,
+                                                          rx_bytes=2000))
+        assert not PortRates.is_valid(previous, PortStats(1, 20,
+                                                          rx_bytes=10))
+        assert PortRates.is_valid(previous, PortStats(1, 10,
+                                                      rx_bytes=2000), 2)
+        assert not PortRates.is_valid(previous, PortStats(1, 20,
+                                                          rx_bytes=2000), 0)
+
+
+class TestPortStatsIndex:
+    """Test PortStatsIndex."""
+
+    def test_update(self):
+        """Test the rates of the ports with a previous sample."""
+        index = PortStatsIndex()
+        assert index.update([PortStats(1, 10), PortStats(2, 10)]) == {}
+        assert len(index) == 2
+
+        rates = index.update([PortStats(1, 20, tx_packets=100),
+                              PortStats(3, 20)])
+        assert list(rates) == [1]
+        assert rates[1].tx_pps == 10
+        assert 2 not in index
+        assert index.get(3) == PortStats(3, 20)
+
+    def test_update_without_duration(self):
+        """Test the rates over the time between the replies."""
+        index = PortStatsIndex()
+        unavailable = {'duration_sec': DURATION_UNAVAILABLE,
+                       'duration_nsec': DURATION_UNAVAILABLE}
+        assert index.update([PortStats(1), PortStats(2, **unavailable),
+                             PortStats(3, 10)], received=100.0) == {}
+
+        rates = index.update([PortStats(1, tx_packets=100),
+                              PortStats(2, tx_packets=50, **unavailable),
+                              PortStats(3, 30, tx_packets=100)],
+                             received=104.0)
+        assert rates[1].interval == 4
+        assert rates[1].tx_pps == 25
+        assert rates[2].tx_pps == 12.5
+        assert rates[3].interval == 20
+        assert rates[3].tx_pps == 5
+
+        assert index.update([PortStats(1, tx_packets=200)],
+                            received=104.0) == {}
@@ -0,0 +1,51 @@
+"""Test stats_interval module."""
+from napps.kytos.of_core.stats_interval import ReplyCost, StatsIntervalTuner
+
+
+class TestReplyCost:
+    """Test ReplyCost."""
+
+    def test_update(self):
+        """Test smoothing the cost of the replies."""
+        cost = ReplyCost(1000, 2, 0.5)
+        cost.update(ReplyCost(3000, 4, 1.5), 0.5)
+        assert cost.as_dict() == {'size': 2000, 'messages': 3,
+                                  'decode_time': 1.0}
+
+
+class TestStatsIntervalTuner:
+    """Test StatsIntervalTuner."""
+
+    def test_interval(self):
+        """Test sharing the CPU budget between the switches."""
+        tuner = StatsIntervalTuner(60, 600, 0.01, 60, 1)
+        assert tuner.interval('a') == 60
+        tuner.observe('a', 1000, 1, 0.001)
+        assert tuner.interval('a') == 60
+        tuner.observe('b', 10 ** 7, 100, 2.0)
+        assert tuner.interval('b') == 400
+        tuner.observe('b', 10 ** 8, 1000, 20.0)
+        assert tuner.interval('b') == 600
+        assert tuner.as_dict('b') == {'interval': 600, 'size': 10 ** 8,
+                                      'messages': 1000, 'decode_time': 20.0}
+
+        tuner.cpu_budget = 0
+        assert tuner.interval('b') == 60
+
+    def test_is_due(self):
+        """Test requesting the flow stats once the interval elapsed."""
+        tuner = StatsIntervalTuner(60, 600, 0.01, 60, 1)
+        tuner.observe('a', 10 ** 7, 100, 0.9)
+        assert tuner.interval('a') == 90
+        assert tuner.is_due('a', 0)
+        tuner.requested('a', 0)
+        assert not tuner.is_due('a', 59)
+        assert tuner.is_due('a', 61)
+
+        tuner.observe('a', 10 ** 7, 100, 1.8)
+        assert not tuner.is_due('a', 119)
+        assert tuner.is_due('a', 151)
+
+        tuner.pop('a')
+        assert not len(tuner)
+        assert tuner.is_due('a', 0)
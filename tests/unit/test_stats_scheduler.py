@@ -0,0 +1,84 @@
+"""Test stats_scheduler module."""
+import asyncio
+from unittest.mock import patch
+
+from napps.kytos.of_core.stats_scheduler import StatsScheduler
+
+
+class TestStatsScheduler:
+    """Test StatsScheduler."""
+
+    def test_phase(self):
+        """Test stable phases spread over the interval."""
+        scheduler = StatsScheduler(60, 0, 0)
+        dpids = [f'00:00:00:00:00:00:00:{i:02x}' for i in range(1, 101)]
+        phases = [scheduler.phase(dpid) for dpid in dpids]
+        assert phases == [scheduler.phase(dpid) for dpid in dpids]
+        assert all(0 <= phase < 60 for phase in phases)
+        assert len(set(phases)) == len(phases)
+        assert min(phases) < 15 and max(phases) > 45
+
+    @patch('napps.kytos.of_core.stats_scheduler.random.uniform')
+    def test_delay(self, mock_uniform):
+        """Test the delay adding the jitter to the phase."""
+        mock_uniform.return_value = 0.5
+        scheduler = StatsScheduler(60, 0, 1)
+        dpid = '00:00:00:00:00:00:00:01'
+        phase = scheduler.phase(dpid)
+        assert scheduler.delay(dpid, 0) == phase + 0.5
+        assert scheduler.delay(dpid, phase) == 0.5
+        assert scheduler.delay(dpid, phase + 1) == 59.5
+        assert scheduler.delay(dpid, phase + 60) == 0.5
+        mock_uniform.assert_called_with(0, 1)
+
+    async def test_acquire_release(self):
+        """Test bounding the switches with requests in flight."""
+        scheduler = StatsScheduler(60, 2, 0)
+        assert await scheduler.acquire('a')
+        assert await scheduler.acquire('b')
+        assert await scheduler.acquire('a')
+        assert not await scheduler.acquire('c', timeout=0)
+        assert len(scheduler) == 2
+
+        scheduler.release('a')
+        assert 'a' not in scheduler
+        assert await scheduler.acquire('c', timeout=0)
+
+    async def test_acquire_wait(self):
+        """Test waiting for a slot to be released."""
+        scheduler = StatsScheduler(60, 1, 0)
+        assert await scheduler.acquire('a')
+        waiting = asyncio.create_task(scheduler.acquire('b', timeout=1))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        scheduler.release('a')
+        assert await waiting
+        assert 'b' in scheduler
+
+    async def test_acquire_wait_released_by_thread(self):
+        """Test a slot released by another thread."""
+        scheduler = StatsScheduler(60, 1, 0)
+        assert await scheduler.acquire('a')
+        waiting = asyncio.create_task(scheduler.acquire('b', timeout=1))
+        await asyncio.sleep(0)
+        await asyncio.to_thread(scheduler.release, 'a')
+        assert await waiting
+
+    @patch('napps.kytos.of_core.stats_scheduler.time.monotonic')
+    async def test_acquire_expired(self, mock_monotonic):
+        """Test freeing the slots held for longer than the interval."""
+        mock_monotonic.return_value = 100
+        scheduler = StatsScheduler(60, 1, 0)
+        assert await scheduler.acquire('a')
+        assert not await scheduler.acquire('b', timeout=0)
+
+        mock_monotonic.return_value = 161
+        assert await scheduler.acquire('b', timeout=0)
+        assert 'a' not in scheduler
+
+    async def test_acquire_unbounded(self):
+        """Test a max_in_flight of 0 not limiting the requests."""
+        scheduler = StatsScheduler(60, 0, 0)
+        for i in range(100):
+            assert await scheduler.acquire(str(i), timeout=0)
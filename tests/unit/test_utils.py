@@ -1,15 +1,27 @@
 """Test utils methods."""
-from unittest.mock import MagicMock, patch
+import asyncio
+import pickle
+from unittest.mock import AsyncMock, MagicMock, patch
 
+import pytest
+from pyof.foundation.exceptions import UnpackException
 from pyof.v0x04.common.header import Type
+from pyof.v0x04.symmetric.echo_reply import EchoReply
+from pyof.v0x04.symmetric.echo_request import EchoRequest
 
 from kytos.lib.helpers import (get_connection_mock, get_controller_mock,
                                get_switch_mock)
 from napps.kytos.of_core.msg_prios import of_msg_prio
-from napps.kytos.of_core.utils import (GenericHello, _emit_message,
+from napps.kytos.of_core.utils import (FramerBufferOverflow, GenericHello,
+                                       LazyMessage, OFFramer, OFHeader,
+                                       _emit_message,
                                        _unpack_int, aemit_message_in,
-                                       aemit_message_out, emit_message_in,
-                                       emit_message_out, of_slicer)
+                                       aemit_message_out, aemit_messages_in,
+                                       echo_reply_from_request,
+                                       emit_message_in, emit_message_out,
+                                       event_name_prio, flow_stats_offsets,
+                                       multipart_reply_type_flags,
+                                       of_frame_offsets, of_slicer)
 
 
 @patch('kytos.core.buffers.KytosEventBuffer.aput')
@@ -34,6 +46,60 @@ async def test_aemit_message_out(controller, switch_one):
     assert kytos_event.priority == of_msg_prio(Type.OFPT_FLOW_MOD.value)
 
 
+@patch('kytos.core.buffers.KytosEventBuffer.aput')
+async def test_aemit_messages_in(controller, switch_one):
+    """Test aemit_messages_in keeping order and priorities."""
+    controller.buffers.msg_in._queue = None
+    message_types = [Type.OFPT_PACKET_IN, Type.OFPT_PORT_STATUS,
+                     Type.OFPT_BARRIER_REPLY]
+    messages = []
+    for message_type in message_types:
+        mock_message = MagicMock()
+        mock_message.header.message_type = message_type
+        mock_message.header.version = 0x04
+        messages.append(mock_message)
+    await aemit_messages_in(controller, switch_one.connection, messages)
+    assert controller.buffers.msg_in.aput.call_count == len(messages)
+    kytos_events = [call[0][0] for call in
+                    controller.buffers.msg_in.aput.call_args_list]
+    for kytos_event, message in zip(kytos_events, messages):
+        message_type = message.header.message_type
+        assert kytos_event.content['message'] == message
+        assert kytos_event.content['source'] == switch_one.connection
+        assert kytos_event.priority == of_msg_prio(message_type.value)
+        assert kytos_event.name == ('kytos/of_core.v0x04.messages.in.'
+                                    f'{message_type.name.lower()}')
+
+
+async def test_aemit_messages_in_queue(controller, switch_one):
+    """Test aemit_messages_in putting the batch in the buffer queue."""
+    message_buffer = controller.buffers.msg_in
+    message_buffer._queue = MagicMock()
+    message_buffer._queue.async_q = asyncio.Queue(maxsize=2)
+    message_buffer._reject_new_events = False
+    message_buffer.aput = AsyncMock()
+    messages = []
+    for message_type in (Type.OFPT_PACKET_IN, Type.OFPT_PORT_STATUS,
+                         Type.OFPT_BARRIER_REPLY):
+        mock_message = MagicMock()
+        mock_message.header.message_type = message_type
+        mock_message.header.version = 0x04
+        messages.append(mock_message)
+
+    await aemit_messages_in(controller, switch_one.connection, messages)
+    async_q = message_buffer._queue.async_q
+    assert [async_q.get_nowait().content['message'] for _ in range(2)] == \
+        messages[:2]
+    [kytos_event] = [call[0][0] for call in
+                     message_buffer.aput.call_args_list]
+    assert kytos_event.content['message'] == messages[2]
+
+    message_buffer._reject_new_events = True
+    await aemit_messages_in(controller, switch_one.connection, messages)
+    assert async_q.empty()
+    assert message_buffer.aput.call_count == 4
+
+
 class TestUtils:
     """Test utils."""
 
@@ -81,6 +147,63 @@ class TestUtils:
         assert sorted(response[0]) == sorted([])
         assert sorted(response[1]) == sorted([])
 
+    def test_of_frame_offsets(self):
+        """Test of_frame_offsets."""
+        pkt = b'\x04\x02\x00\x0b\x00\x00\x00\x05abc'
+        data = bytearray(b'\x00\x00\x00\x00' + pkt * 2 + pkt[:5])
+        frames, offset = of_frame_offsets(data)
+        assert frames == [(4, 11), (15, 11)]
+        assert offset == 26
+
+        frames, offset = of_frame_offsets(data, 15)
+        assert frames == [(15, 11)]
+        assert offset == 26
+
+    def test_echo_reply_from_request(self):
+        """Test echo_reply_from_request keeping xid and payload."""
+        echo_request = b'\x04\x02\x00\x0b\x00\x00\x00\x05abc'
+        echo_reply = echo_reply_from_request(echo_request)
+        assert echo_reply == b'\x04\x03\x00\x0b\x00\x00\x00\x05abc'
+
+    @pytest.mark.parametrize('message_type', list(Type))
+    @pytest.mark.parametrize('direction', ['in', 'out'])
+    def test_event_name_prio(self, message_type, direction):
+        """Test event_name_prio precomputed names and priorities."""
+        name, priority = event_name_prio(0x04, message_type, direction)
+        assert name == (f'kytos/of_core.v0x04.messages.{direction}.'
+                        f'{message_type.name.lower()}')
+        assert priority == of_msg_prio(message_type.value)
+        assert name is event_name_prio(0x04, message_type, direction)[0]
+
+    def test_event_name_prio_unknown(self):
+        """Test event_name_prio with a version missing from the table."""
+        name, priority = event_name_prio(0x05, Type.OFPT_PACKET_IN, 'in')
+        assert name == 'kytos/of_core.v0x05.messages.in.ofpt_packet_in'
+        assert priority == of_msg_prio(Type.OFPT_PACKET_IN.value)
+
+    def test_multipart_reply_type_flags(self):
+        """Test multipart_reply_type_flags reading the raw packet."""
+        packet = (b'\x04\x13\x00\x10\x00\x00\x0a\xbc'
+                  b'\x00\x01\x00\x01\x00\x00\x00\x00')
+        assert multipart_reply_type_flags(packet) == (1, 1)
+        with pytest.raises(UnpackException):
+            multipart_reply_type_flags(packet[:10])
+
+    def test_flow_stats_offsets(self):
+        """Test flow_stats_offsets walking the flow stats entries."""
+        packet = bytes.fromhex(
+            '0413008000000abc0001000000000000003801000000000000000000000a0000'
+            '0000000000000000000000000000000700000000000000000000000000000000'
+            '0001000400000000003802000000000000000000001400000000000000000000'
+            '0000000000000000000000000000000000000000000000000001000400000000'
+        )
+        assert flow_stats_offsets(packet) == [(16, 56), (72, 56)]
+        assert not flow_stats_offsets(packet[:16])
+        with pytest.raises(UnpackException):
+            flow_stats_offsets(packet[:-8])
+        with pytest.raises(UnpackException):
+            flow_stats_offsets(packet[:16] + b'\x00\x08' + packet[18:])
+
     def test_unpack_int(self):
         """Test test_unpack_int."""
         mock_packet = MagicMock()
@@ -110,6 +233,165 @@ class TestUtils:
         mock_message_in.assert_called()
 
 
+class TestOFFramer:
+    """Test OFFramer."""
+
+    pkt = b'\x04\x02\x00\x0b\x00\x00\x00\x05abc'
+
+    def test_feed_frames(self):
+        """Test feeding partial chunks and getting complete frames."""
+        framer = OFFramer()
+        framer.feed(self.pkt + self.pkt[:3])
+        assert list(framer.frames()) == [self.pkt]
+        assert framer.buffered == 3
+        assert not list(framer.frames())
+
+        framer.feed(self.pkt[3:] + self.pkt)
+        frames = list(framer.frames())
+        assert frames == [self.pkt, self.pkt]
+        assert all(isinstance(frame, bytes) for frame in frames)
+        assert framer.buffered == 0
+
+    def test_defer(self):
+        """Test deferred packets are yielded first on the next call."""
+        framer = OFFramer()
+        other = b'\x04\x03\x00\x08\x00\x00\x00\x06'
+        framer.feed(self.pkt)
+        for frame in framer.frames():
+            framer.defer(frame)
+        assert framer.buffered == len(self.pkt)
+
+        framer.feed(other)
+        assert list(framer.frames()) == [self.pkt, other]
+        assert framer.buffered == 0
+
+    def test_feed_while_walking(self):
+        """Test feeding chunks while the frames are being walked."""
+        framer = OFFramer()
+        framer.feed(self.pkt + self.pkt)
+        frames = []
+        for frame in framer.frames():
+            if not frames:
+                framer.feed(self.pkt[:4])
+            frames.append(frame)
+        assert frames == [self.pkt, self.pkt]
+        framer.feed(self.pkt[4:])
+        assert list(framer.frames()) == [self.pkt]
+        assert framer.buffered == 0
+
+    def test_shed(self):
+        """Test shedding frames by type, oldest first."""
+        packet_in = b'\x04\x0a\x00\x08\x00\x00\x00\x01'
+        barrier_reply = b'\x04\x15\x00\x08\x00\x00\x00\x02'
+        framer = OFFramer()
+        framer.feed(packet_in + self.pkt + barrier_reply + packet_in +
+                    packet_in + self.pkt[:3])
+        assert framer.shed([Type.OFPT_PACKET_IN.value], 100) == {}
+
+        shed = framer.shed([Type.OFPT_BARRIER_REPLY.value,
+                            Type.OFPT_PACKET_IN.value], 24)
+        assert shed == {Type.OFPT_BARRIER_REPLY.value: 1,
+                        Type.OFPT_PACKET_IN.value: 2}
+        assert framer.buffered == 22
+        framer.feed(self.pkt[3:])
+        assert list(framer.frames()) == [self.pkt, packet_in, self.pkt]
+
+        framer.feed(self.pkt)
+        assert framer.shed([Type.OFPT_PACKET_IN.value], 0) == {}
+        assert list(framer.frames()) == [self.pkt]
+
+    def test_take(self):
+        """Test taking the frames of some types out of the buffer."""
+        echo_request = b'\x04\x02\x00\x08\x00\x00\x00\x01'
+        packet_in = b'\x04\x0a\x00\x08\x00\x00\x00\x02'
+        framer = OFFramer()
+        framer.feed(packet_in + echo_request + packet_in + echo_request +
+                    self.pkt[:3])
+        assert framer.take({Type.OFPT_ECHO_REPLY.value}) == []
+        assert framer.take({Type.OFPT_ECHO_REQUEST.value}) == [
+            echo_request, echo_request]
+        assert framer.buffered == 19
+        framer.feed(self.pkt[3:])
+        assert list(framer.frames()) == [packet_in, packet_in, self.pkt]
+
+    def test_feed_overflow(self):
+        """Test feed exceeding the buffered bytes ceiling."""
+        framer = OFFramer(max_buffered=len(self.pkt) + 2)
+        framer.feed(self.pkt[:5])
+        with pytest.raises(FramerBufferOverflow):
+            framer.feed(self.pkt)
+        assert framer.buffered == 5
+        framer.feed(self.pkt[5:])
+        assert not framer.is_full
+        framer.feed(self.pkt, capped=False)
+        assert framer.is_full
+        assert list(framer.frames()) == [self.pkt, self.pkt]
+
+
+class TestLazyMessage:
+    """Test LazyMessage and OFHeader."""
+
+    packet = b'\x04\x02\x00\x0b\x00\x00\x00\x05abc'
+
+    def test_header(self):
+        """Test the header is decoded without unpacking the message."""
+        mock_unpack = MagicMock()
+        message = LazyMessage(self.packet, mock_unpack)
+        assert message.header.version == 4
+        assert message.header.message_type == Type.OFPT_ECHO_REQUEST
+        assert message.header.length.value == len(self.packet)
+        assert message.header.xid.value == 5
+        assert int(message.header.xid) == 5
+        assert message.header.pack() == self.packet[:8]
+        assert message.pack() == self.packet
+        assert not message.is_decoded
+        mock_unpack.assert_not_called()
+
+    def test_decode(self):
+        """Test accessing a body attribute unpacks the message once."""
+        mock_unpack = MagicMock()
+        mock_unpack.return_value.data = b'abc'
+        message = LazyMessage(self.packet, mock_unpack)
+        assert message.data == b'abc'
+        assert message.is_decoded
+        assert message.header == mock_unpack.return_value.header
+        assert message.pack() == mock_unpack.return_value.pack.return_value
+        assert message.data == b'abc'
+        mock_unpack.assert_called_once_with(self.packet)
+
+    def test_decode_real_unpack(self):
+        """Test decode with the default python-openflow unpack."""
+        message = LazyMessage(self.packet)
+        assert message.data.value == b'abc'
+        assert message.header.xid.value == 5
+
+    def test_isinstance(self):
+        """Test isinstance checks against the python-openflow classes."""
+        message = LazyMessage(self.packet)
+        assert isinstance(message, LazyMessage)
+        assert not message.is_decoded
+        assert isinstance(message, EchoRequest)
+        assert not isinstance(message, EchoReply)
+        assert message.is_decoded
+
+        message = pickle.loads(pickle.dumps(LazyMessage(self.packet)))
+        assert not message.is_decoded
+        assert message.data.value == b'abc'
+
+    @pytest.mark.parametrize(
+        "packet",
+        [
+            b'\x04\x02\x00',
+            b'\x04\xff\x00\x08\x00\x00\x00\x05',
+            b'\x7f\x02\x00\x08\x00\x00\x00\x05',
+        ],
+    )
+    def test_invalid_header(self, packet):
+        """Test invalid headers raising UnpackException."""
+        with pytest.raises(UnpackException):
+            OFHeader.from_packet(packet)
+
+
 class TestGenericHello:
     """Test GenericHello."""
 
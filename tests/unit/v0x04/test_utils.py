@@ -3,10 +3,13 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 from pyof.v0x04.common.port import PortNo, PortState
+from pyof.v0x04.controller2switch.common import MultipartType
 
 from kytos.lib.helpers import (get_connection_mock, get_controller_mock,
                                get_switch_mock)
-from napps.kytos.of_core.v0x04.utils import (handle_features_reply,
+from napps.kytos.of_core.v0x04.utils import (arequest_aggregate_stats,
+                                             aupdate_flow_list,
+                                             handle_features_reply,
                                              say_hello,
                                              send_desc_request, send_echo,
                                              send_port_request,
@@ -21,6 +24,35 @@ async def test_say_hello(mock_aemit_message_out, controller, switch_one):
     mock_aemit_message_out.assert_called()
 
 
+@patch('napps.kytos.of_core.v0x04.utils.aemit_message_out')
+async def test_aupdate_flow_list(mock_aemit_message_out, controller,
+                                 switch_one):
+    """Test aupdate_flow_list requesting a table and a cookie range."""
+    xid = await aupdate_flow_list(controller, switch_one, table_id=2,
+                                  cookie=0xaa00, cookie_mask=0xff00)
+    request = mock_aemit_message_out.call_args[0][2]
+    assert request.header.xid == xid
+    assert request.multipart_type == MultipartType.OFPMP_FLOW
+    assert request.body.table_id == 2
+    assert request.body.cookie == 0xaa00
+    assert request.body.cookie_mask == 0xff00
+
+
+@patch('napps.kytos.of_core.v0x04.utils.aemit_message_out')
+async def test_arequest_aggregate_stats(mock_aemit_message_out, controller,
+                                        switch_one):
+    """Test arequest_aggregate_stats."""
+    xid = await arequest_aggregate_stats(controller, switch_one)
+    request = mock_aemit_message_out.call_args[0][2]
+    assert request.header.xid == xid
+    assert request.multipart_type == MultipartType.OFPMP_AGGREGATE
+
+    assert await arequest_aggregate_stats(controller, switch_one,
+                                          xid=0xABC) == 0xABC
+    request = mock_aemit_message_out.call_args[0][2]
+    assert request.header.xid == 0xABC
+
+
 @pytest.mark.parametrize(
     "state,port_no,should_activate",
     [
@@ -62,17 +94,25 @@ class TestUtils:
     @patch('napps.kytos.of_core.v0x04.utils.emit_message_out')
     def test_port_request(self, mock_emit_message_out):
         """Test send_desc_request."""
-        send_port_request(self.mock_controller, self.mock_switch)
-        mock_emit_message_out.assert_called()
+        send_port_request(self.mock_controller, self.mock_switch, xid=0xABC)
+        request = mock_emit_message_out.call_args[0][2]
+        assert request.header.xid == 0xABC
+        assert request.multipart_type == MultipartType.OFPMP_PORT_DESC
 
     def test_handle_features_reply(self):
         """Test Handle features reply."""
         mock_controller = MagicMock()
         mock_event = MagicMock()
         mock_controller.get_switch_or_create.return_value = self.mock_switch
-        response = handle_features_reply(mock_controller, mock_event)
+        with patch('napps.kytos.of_core.v0x04.utils.send_port_request') \
+                as mock_send_port_request:
+            response = handle_features_reply(mock_controller, mock_event)
+            assert mock_send_port_request.call_count == 1
+            handle_features_reply(mock_controller, mock_event,
+                                  request_port_desc=False)
+            assert mock_send_port_request.call_count == 1
         assert self.mock_switch == response
-        assert self.mock_switch.update_features.call_count == 1
+        assert self.mock_switch.update_features.call_count == 2
 
     @patch('napps.kytos.of_core.v0x04.utils.emit_message_out')
     def test_send_echo(self, mock_emit_message_out):
@@ -1,35 +1,401 @@
 """of_core utility functions and classes."""
 # pylint: disable=broad-exception-raised
+import asyncio
 import struct
-from collections import OrderedDict
+import sys
+from collections import OrderedDict, deque
 
 from napps.kytos.of_core import settings
 from napps.kytos.of_core.msg_prios import of_msg_prio
+from pyof.foundation.basic_types import UBInt8, UBInt16, UBInt32
 from pyof.foundation.exceptions import PackException, UnpackException
+from pyof.utils import PYOF_VERSION_LIBS, unpack
 from pyof.v0x04.common.header import Type as OFPTYPE
 
 from kytos.core import KytosEvent
 
+_UNPACK_LENGTH = struct.Struct('!H').unpack_from
+_HEADER_STRUCT = struct.Struct('!BBHI')
+_HEADER_TYPES = {version: pyof_lib.common.header.Type
+                 for version, pyof_lib in PYOF_VERSION_LIBS.items()}
+_ECHO_REPLY_TYPE = bytes([OFPTYPE.OFPT_ECHO_REPLY.value])
+_MULTIPART_STRUCT = struct.Struct('!HH')
+# OpenFlow header, multipart type, flags and padding
+_MULTIPART_BODY_OFFSET = _HEADER_STRUCT.size + 8
+# ofp_flow_stats fields before the match, and the smallest match
+_FLOW_STATS_MIN_LENGTH = 48 + 8
 
-def of_slicer(remaining_data):
-    """Slice a raw `bytes` instance into OpenFlow packets."""
-    data_len = len(remaining_data)
-    pkts = []
-    while data_len > 3:
-        length_field = struct.unpack('!H', remaining_data[2:4])[0]
-        ofver = remaining_data[0]
+
+def _event_name(version, message_type, direction):
+    """Build the name of the KytosEvent of a message."""
+    # pylint: disable=consider-using-f-string
+    hex_version = 'v0x%0.2x' % version
+    name = message_type.name.lower()
+    return f"kytos/of_core.{hex_version}.messages.{direction}.{name}"
+
+
+#: (version, message type value, direction) -> (event name, priority)
+_EVENT_NAME_PRIOS = {
+    (version, message_type.value, direction): (
+        sys.intern(_event_name(version, message_type, direction)),
+        of_msg_prio(message_type.value))
+    for version, msg_types in _HEADER_TYPES.items()
+    for message_type in msg_types
+    for direction in ('in', 'out')
+}
+
+
+def of_frame_offsets(data, offset=0):
+    """Find the OpenFlow frames in ``data`` walking an offset cursor.
+
+    ``data`` is never sliced while it is walked, so the cost is linear in the
+    number of bytes regardless of how many frames a single read has.
+
+    Args:
+        data: any object supporting the buffer protocol (bytes, bytearray,
+              memoryview).
+        offset (int): position where the first frame is expected.
+
+    Returns:
+        tuple: list of ``(offset, length)`` descriptors of complete frames and
+               the offset where the unprocessed tail starts.
+
+    """
+    data_len = len(data)
+    frames = []
+    while data_len - offset > 3:
+        length_field = _UNPACK_LENGTH(data, offset + 2)[0]
+        ofver = data[offset]
         # sanity checks: badly formatted packet
         if ofver not in settings.ALL_OPENFLOW_VERSIONS or length_field == 0:
-            remaining_data = remaining_data[4:]
-            data_len = len(remaining_data)
+            offset += 4
             continue
-        if data_len >= length_field:
-            pkts.append(remaining_data[:length_field])
-            remaining_data = remaining_data[length_field:]
-            data_len = len(remaining_data)
+        if data_len - offset >= length_field:
+            frames.append((offset, length_field))
+            offset += length_field
         else:
             break
-    return pkts, remaining_data
+    return frames, offset
+
+
+def of_slicer(remaining_data):
+    """Slice a raw `bytes` instance into OpenFlow packets.
+
+    Args:
+        remaining_data: buffer with the raw OpenFlow stream.
+
+    Returns:
+        tuple: list of packets and the unprocessed tail as ``bytes``.
+
+    """
+    frames, offset = of_frame_offsets(remaining_data)
+    pkts = [remaining_data[start:start + length] for start, length in frames]
+    return pkts, bytes(remaining_data[offset:])
+
+
+class OFFramer:
+    """Stateful OpenFlow stream framer of a single connection.
+
+    Raw chunks are appended to a growable ``bytearray`` that is walked with an
+    offset cursor. The consumed head is compacted when the frames are walked
+    again, so the only bytes moved per read are the ones of an incomplete
+    tail, and chunks can be fed while the frames are being walked.
+
+    Packets that can't be handled yet (e.g., during the OpenFlow handshake)
+    are kept in a side queue and they are yielded first on the next call of
+    :meth:`frames` instead of being pushed back into the byte stream.
+    """
+
+    def __init__(self, max_buffered=None):
+        """Initialize an empty framer.
+
+        Args:
+            max_buffered (int): Ceiling of buffered bytes, including deferred
+                packets. Defaults to ``settings.MAX_CONN_BUFFERED_BYTES``.
+        """
+        if max_buffered is None:
+            max_buffered = settings.MAX_CONN_BUFFERED_BYTES
+        self.max_buffered = max_buffered
+        self._buffer = bytearray()
+        self._offset = 0
+        self._deferred = deque()
+        self._deferred_bytes = 0
+
+    @property
+    def buffered(self):
+        """Return the number of bytes that haven't been consumed yet."""
+        return len(self._buffer) - self._offset + self._deferred_bytes
+
+    @property
+    def is_full(self):
+        """Return whether the ceiling of buffered bytes has been reached."""
+        return self.buffered >= self.max_buffered
+
+    def feed(self, data, capped=True):
+        """Append a raw chunk received from the connection.
+
+        Args:
+            data (bytes): Raw chunk.
+            capped (bool): Whether the ceiling of buffered bytes applies.
+                While a connection is paused its reads are paused instead,
+                once the framer is full.
+
+        Raises:
+            FramerBufferOverflow: If the ceiling of buffered bytes would be
+                exceeded. The chunk is discarded in this case.
+        """
+        if capped and self.buffered + len(data) > self.max_buffered:
+            raise FramerBufferOverflow(self.buffered + len(data),
+                                       self.max_buffered)
+        self._buffer += data
+
+    def defer(self, packet):
+        """Keep a packet to be yielded again on the next :meth:`frames`."""
+        self._deferred.append(packet)
+        self._deferred_bytes += len(packet)
+
+    def frames(self):
+        """Yield deferred packets and then every complete OpenFlow frame."""
+        deferred, self._deferred = self._deferred, deque()
+        self._deferred_bytes = 0
+        yield from deferred
+
+        if self._offset:
+            del self._buffer[:self._offset]
+            self._offset = 0
+        frames, end = of_frame_offsets(self._buffer, self._offset)
+        for start, length in frames:
+            self._offset = start + length
+            yield bytes(memoryview(self._buffer)[start:self._offset])
+        self._offset = end
+
+    def shed(self, message_types, max_buffered):
+        """Drop buffered frames of the given types, oldest first.
+
+        Frames are dropped a type at a time, in the given order, until the
+        buffered bytes aren't above ``max_buffered``. Deferred packets and
+        the incomplete tail are always kept.
+
+        Args:
+            message_types (list): OpenFlow type values that can be dropped,
+                from the first to the last to be dropped.
+            max_buffered (int): Number of buffered bytes to shed down to.
+
+        Returns:
+            dict: Number of dropped frames by type value.
+        """
+        if self.buffered <= max_buffered:
+            return {}
+        frames, end = of_frame_offsets(self._buffer, self._offset)
+        dropped = set()
+        shed = {}
+        buffered = self.buffered
+        for message_type in message_types:
+            for index, (start, length) in enumerate(frames):
+                if buffered <= max_buffered:
+                    break
+                if self._buffer[start + 1] == message_type:
+                    dropped.add(index)
+                    shed[message_type] = shed.get(message_type, 0) + 1
+                    buffered -= length
+        self._remove(frames, end, dropped)
+        return shed
+
+    def take(self, message_types):
+        """Remove and return the buffered frames of the given types.
+
+        Deferred packets and the incomplete tail are always kept.
+
+        Args:
+            message_types (set): OpenFlow type values to be taken.
+
+        Returns:
+            list: The taken frames, oldest first.
+        """
+        frames, end = of_frame_offsets(self._buffer, self._offset)
+        taken = {index for index, (start, _) in enumerate(frames)
+                 if self._buffer[start + 1] in message_types}
+        packets = [bytes(self._buffer[start:start + length])
+                   for index, (start, length) in enumerate(frames)
+                   if index in taken]
+        self._remove(frames, end, taken)
+        return packets
+
+    def _remove(self, frames, end, removed):
+        """Rebuild the buffer without the frames of the given indexes."""
+        if not removed:
+            return
+        view = memoryview(self._buffer)
+        kept = bytearray()
+        for index, (start, length) in enumerate(frames):
+            if index not in removed:
+                kept += view[start:start + length]
+        kept += view[end:]
+        view.release()
+        self._buffer = kept
+        self._offset = 0
+
+
+class OFHeader:
+    """OpenFlow header decoded with ``struct``.
+
+    Attributes have the same types of a python-openflow ``Header`` after it's
+    been unpacked, so ``message_type`` is a ``Type`` and ``xid`` is an
+    ``UBInt32``.
+    """
+
+    __slots__ = ('version', 'message_type', 'length', 'xid')
+
+    def __init__(self, version, message_type, length, xid):
+        """Assign the already decoded header fields."""
+        self.version = version
+        self.message_type = message_type
+        self.length = length
+        self.xid = xid
+
+    @classmethod
+    def from_packet(cls, packet):
+        """Decode the first 8 bytes of a raw OpenFlow packet.
+
+        Raises:
+            UnpackException: If the header can't be decoded.
+        """
+        try:
+            version, msg_type, length, xid = _HEADER_STRUCT.unpack_from(packet)
+            message_type = _HEADER_TYPES[version](msg_type)
+        except (struct.error, KeyError, ValueError) as exc:
+            raise UnpackException(f"invalid header: {exc}") from exc
+        return cls(UBInt8(version), message_type, UBInt16(length),
+                   UBInt32(xid))
+
+    def pack(self):
+        """Encode the header."""
+        return _HEADER_STRUCT.pack(self.version.value,
+                                   self.message_type.value,
+                                   self.length.value, self.xid.value)
+
+    def __repr__(self):
+        return (f"OFHeader(version={self.version}, "
+                f"message_type={self.message_type}, "
+                f"length={self.length}, xid={self.xid})")
+
+
+class LazyMessage:
+    """OpenFlow message that is only fully unpacked on demand.
+
+    Only the header is decoded when it's created, which is enough to route,
+    sequence and prioritize the message. The python-openflow message is
+    unpacked the first time an attribute beyond the header is accessed, and
+    from then on every attribute is looked up on it. Unpack errors are only
+    raised then, as ``UnpackException``.
+    """
+
+    __slots__ = ('header', 'packet', '_unpack', '_message')
+
+    def __init__(self, packet, unpack_func=unpack):
+        """Decode the header of a raw OpenFlow packet.
+
+        Args:
+            packet (bytes): A complete OpenFlow packet.
+            unpack_func: Function used to unpack the whole message, usually
+                ``connection.protocol.unpack``.
+
+        Raises:
+            UnpackException: If the header can't be decoded.
+        """
+        self.header = OFHeader.from_packet(packet)
+        self.packet = packet
+        self._unpack = unpack_func
+        self._message = None
+
+    @property
+    def is_decoded(self):
+        """Return whether the python-openflow message was unpacked."""
+        return self._message is not None
+
+    def decode(self):
+        """Return the python-openflow message, unpacking it if needed.
+
+        Raises:
+            UnpackException: If the message can't be unpacked.
+        """
+        if self._message is None:
+            self._message = self._unpack(self.packet)
+            self.header = self._message.header
+        return self._message
+
+    def pack(self):
+        """Encode the message, reusing the raw packet if it wasn't decoded."""
+        if self._message is None:
+            return self.packet
+        return self._message.pack()
+
+    @property
+    def __class__(self):
+        """Return the python-openflow message class, unpacking the message.
+
+        ``isinstance`` checks against python-openflow classes then behave as
+        if the message had been unpacked right away.
+        """
+        return self.decode().__class__
+
+    def __reduce__(self):
+        return (LazyMessage, (self.packet, self._unpack))
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.decode(), name)
+
+    def __repr__(self):
+        return f"LazyMessage({self.header!r}, decoded={self.is_decoded})"
+
+
+def echo_reply_from_request(packet):
+    """Build a raw echo reply from a raw echo request.
+
+    The version, length, xid and payload are kept, only the type byte is
+    changed, so no python-openflow message has to be built.
+    """
+    return packet[:1] + _ECHO_REPLY_TYPE + packet[2:]
+
+
+def multipart_reply_type_flags(packet):
+    """Return the multipart type and flags of a raw multipart reply.
+
+    Both are read with ``struct`` right after the OpenFlow header, so the
+    body doesn't have to be unpacked.
+    """
+    try:
+        return _MULTIPART_STRUCT.unpack_from(packet, _HEADER_STRUCT.size)
+    except struct.error as err:
+        raise UnpackException(f"Invalid multipart reply: {err}") from err
+
+
+def flow_stats_offsets(packet):
+    """Return the ``(offset, length)`` of each flow stats entry of a raw
+    OFPMP_FLOW multipart reply.
+
+    Only the length of each entry is read, so the entries can be compared or
+    unpacked one by one.
+
+    Raises:
+        UnpackException: If an entry is truncated or its length is invalid.
+    """
+    offsets = []
+    offset = _MULTIPART_BODY_OFFSET
+    end = len(packet)
+    while offset < end:
+        if end - offset < _FLOW_STATS_MIN_LENGTH:
+            raise UnpackException("Truncated flow stats entry at offset "
+                                  f"{offset}")
+        length = _UNPACK_LENGTH(packet, offset)[0]
+        if length < _FLOW_STATS_MIN_LENGTH or length > end - offset:
+            raise UnpackException(f"Invalid flow stats entry length {length}"
+                                  f" at offset {offset}")
+        offsets.append((offset, length))
+        offset += length
+    return offsets
 
 
 def _unpack_int(packet, offset=0, size=None):
@@ -40,49 +406,98 @@ def _unpack_int(packet, offset=0, size=None):
     return int.from_bytes(packet[offset:offset + size], byteorder='big')
 
 
-async def _aemit_message(controller, connection, message, direction):
-    """Async emit a KytosEvent for every incoming or outgoing message."""
-    if direction == 'in':
-        address_type = 'source'
-        message_buffer = controller.buffers.msg_in
-    elif direction == 'out':
-        address_type = 'destination'
-        message_buffer = controller.buffers.msg_out
-    else:
-        raise Exception("direction must be 'in' or 'out'")
-
-    name = message.header.message_type.name.lower()
-    # pylint: disable=consider-using-f-string
-    hex_version = 'v0x%0.2x' % (message.header.version + 0)
-    priority = of_msg_prio(message.header.message_type.value)
-    of_event = KytosEvent(
-        name=f"kytos/of_core.{hex_version}.messages.{direction}.{name}",
+def event_name_prio(version, message_type, direction):
+    """Return the KytosEvent name and priority of a message.
+
+    Known OpenFlow versions and types are looked up in a table built at
+    import time, anything else has its name and priority computed.
+
+    Args:
+        version (int): OpenFlow version of the message.
+        message_type (Type): Message type from the message header.
+        direction (str): 'in' or 'out'.
+
+    Returns:
+        tuple: The event name and priority.
+    """
+    try:
+        return _EVENT_NAME_PRIOS[(version, message_type.value, direction)]
+    except KeyError:
+        return (_event_name(version, message_type, direction),
+                of_msg_prio(message_type.value))
+
+
+def _message_event(connection, message, direction):
+    """Build the KytosEvent of an incoming or outgoing message."""
+    address_type = 'source' if direction == 'in' else 'destination'
+    header = message.header
+    name, priority = event_name_prio(header.version + 0, header.message_type,
+                                     direction)
+    return KytosEvent(
+        name=name,
         priority=priority,
         content={'message': message,
                  address_type: connection})
+
+
+def _message_buffer(controller, direction):
+    """Return the controller buffer of the given direction."""
+    if direction == 'in':
+        return controller.buffers.msg_in
+    if direction == 'out':
+        return controller.buffers.msg_out
+    raise Exception("direction must be 'in' or 'out'")
+
+
+async def _aemit_message(controller, connection, message, direction):
+    """Async emit a KytosEvent for every incoming or outgoing message."""
+    message_buffer = _message_buffer(controller, direction)
+    of_event = _message_event(connection, message, direction)
     await message_buffer.aput(of_event)
 
 
+async def _aput_events(message_buffer, events):
+    """Async put a batch of events in a buffer, in order.
+
+    While the queue under the buffer has room, the events are put in it
+    without awaiting, so the whole batch is enqueued at once. The events
+    that don't fit are put by ``aput``, which awaits the room, and so are
+    all of them if the buffer has no such queue or rejects new events.
+    """
+    # pylint: disable=protected-access
+    queue = getattr(message_buffer, '_queue', None)
+    if queue is not None and not getattr(message_buffer,
+                                         '_reject_new_events', True):
+        put_nowait = queue.async_q.put_nowait
+        for index, event in enumerate(events):
+            try:
+                put_nowait(event)
+            except asyncio.QueueFull:
+                events = events[index:]
+                break
+        else:
+            return
+    for event in events:
+        await message_buffer.aput(event)
+
+
+async def _aemit_messages(controller, connection, messages, direction):
+    """Async emit the KytosEvents of a batch of messages.
+
+    The events are built in one pass before any of them is enqueued, and
+    they are put in the buffer at once by ``_aput_events``, in the same
+    order as the messages.
+    """
+    message_buffer = _message_buffer(controller, direction)
+    of_events = [_message_event(connection, message, direction)
+                 for message in messages]
+    await _aput_events(message_buffer, of_events)
+
+
 def _emit_message(controller, connection, message, direction):
     """Emit a KytosEvent for every incoming or outgoing message."""
-    if direction == 'in':
-        address_type = 'source'
-        message_buffer = controller.buffers.msg_in
-    elif direction == 'out':
-        address_type = 'destination'
-        message_buffer = controller.buffers.msg_out
-    else:
-        raise Exception("direction must be 'in' or 'out'")
-
-    name = message.header.message_type.name.lower()
-    # pylint: disable=consider-using-f-string
-    hex_version = 'v0x%0.2x' % (message.header.version + 0)
-    priority = of_msg_prio(message.header.message_type.value)
-    of_event = KytosEvent(
-        name=f"kytos/of_core.{hex_version}.messages.{direction}.{name}",
-        priority=priority,
-        content={'message': message,
-                 address_type: connection})
+    message_buffer = _message_buffer(controller, direction)
+    of_event = _message_event(connection, message, direction)
     message_buffer.put(of_event)
 
 
@@ -106,6 +521,15 @@ async def aemit_message_out(controller, connection, message):
     await _aemit_message(controller, connection, message, 'out')
 
 
+async def aemit_messages_in(controller, connection, messages):
+    """Async emit a KytosEvent for every message of a batch of incoming ones.
+
+    Meant for the messages sliced from a single read, keeping their order
+    and priorities.
+    """
+    await _aemit_messages(controller, connection, messages, 'in')
+
+
 class GenericHello:
     """Version agnostic OpenFlow Hello Message."""
 
@@ -223,3 +647,16 @@ class NegotiationException(Exception):
 
     def __str__(self):
         return "OF version negotiation failed: " + super().__str__()
+
+
+class FramerBufferOverflow(Exception):
+    """Exception raised when a connection buffers too many bytes."""
+
+    def __init__(self, buffered, max_buffered):
+        super().__init__(buffered, max_buffered)
+        self.buffered = buffered
+        self.max_buffered = max_buffered
+
+    def __str__(self):
+        return (f"Buffered {self.buffered} bytes, more than the "
+                f"{self.max_buffered} bytes allowed per connection")
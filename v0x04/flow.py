@@ -1,13 +1,17 @@
 """Deal with OpenFlow 1.3 specificities related to flows."""
+import struct
 from itertools import chain
 from typing import Callable, Optional, Type
 
 from napps.kytos.of_core.flow import (ActionBase, ActionFactoryBase, FlowBase,
                                       FlowStats, InstructionBase,
                                       InstructionFactoryBase, MatchBase,
-                                      PortStats)
-from napps.kytos.of_core.v0x04.match_fields import MatchFieldFactory
+                                      PortStats, attributes, pack_value)
+from napps.kytos.of_core.utils import flow_stats_offsets
+from napps.kytos.of_core.v0x04.match_fields import (MatchField,
+                                                    MatchFieldFactory)
 from pyof.foundation.network_types import EtherType
+from pyof.utils import unpack
 from pyof.v0x04.common.action import ActionExperimenter
 from pyof.v0x04.common.action import ActionOutput as OFActionOutput
 from pyof.v0x04.common.action import ActionPopVLAN as OFActionPopVLAN
@@ -32,9 +36,17 @@ from pyof.v0x04.common.flow_match import Match as OFMatch
 from pyof.v0x04.common.flow_match import (OxmMatchFields, OxmOfbMatchField,
                                           OxmTLV, VlanId)
 from pyof.v0x04.controller2switch.flow_mod import FlowMod
+from pyof.v0x04.controller2switch.multipart_reply import \
+    FlowStats as OFFlowStats
 
 __all__ = ('ActionOutput', 'ActionSetVlan', 'ActionSetQueue', 'ActionPushVlan',
-           'ActionPopVlan', 'Action', 'Flow', 'FlowStats', 'PortStats')
+           'ActionPopVlan', 'Action', 'Flow', 'FlowInterner', 'FlowStats',
+           'PortStats')
+
+# duration_sec and duration_nsec, and packet_count and byte_count of an
+# ofp_flow_stats entry
+_FLOW_STATS_DURATION = struct.Struct('!II')
+_FLOW_STATS_COUNTERS = struct.Struct('!QQ')
 
 
 class Match(MatchBase):
@@ -62,10 +74,25 @@ class Match(MatchBase):
                     oxm_fields.append(tlv)
         return OFMatch(oxm_match_fields=oxm_fields)
 
+    @classmethod
+    def _field_codes(cls):
+        """Return the OXM field of each field name.
+
+        Fields without an OXM TLV class keep their position, after the OXM
+        fields.
+        """
+        codes = {name: 0x100 + code
+                 for name, code in super()._field_codes().items()}
+        codes.update((field.name, int(field.oxm_field))
+                     for field in MatchField.__subclasses__())
+        return codes
+
 
 class ActionOutput(ActionBase):
     """Action with an output port."""
 
+    __slots__ = ('port', 'action_type')
+
     def __init__(self, port):
         """Require an output port.
 
@@ -88,6 +115,8 @@ class ActionOutput(ActionBase):
 class ActionSetQueue(ActionBase):
     """Action to set a queue for the packet."""
 
+    __slots__ = ('queue_id', 'action_type')
+
     def __init__(self, queue_id):
         """Require the id of the queue.
 
@@ -110,6 +139,8 @@ class ActionSetQueue(ActionBase):
 class ActionPopVlan(ActionBase):
     """Action to pop the outermost VLAN tag."""
 
+    __slots__ = ('action_type',)
+
     def __init__(self, *args):  # pylint: disable=unused-argument
         """Initialize the action with the correct action_type."""
         self.action_type = 'pop_vlan'
@@ -127,6 +158,8 @@ class ActionPopVlan(ActionBase):
 class ActionPushVlan(ActionBase):
     """Action to push a VLAN tag."""
 
+    __slots__ = ('action_type', 'tag_type')
+
     def __init__(self, tag_type):
         """Require a tag_type for the VLAN."""
         self.action_type = 'push_vlan'
@@ -151,6 +184,8 @@ class ActionPushVlan(ActionBase):
 class ActionSetVlan(ActionBase):
     """Action to set VLAN ID."""
 
+    __slots__ = ('vlan_id', 'action_type')
+
     def __init__(self, vlan_id):
         """Require a VLAN ID."""
         self.vlan_id = vlan_id
@@ -355,6 +390,29 @@ class Flow(FlowBase):
         self.cookie_mask = cookie_mask
         self.instructions = instructions or []
 
+    def _hashed_state(self):
+        """Add the cookie mask and the instructions to the snapshot."""
+        state = super()._hashed_state()
+        state.append(self.cookie_mask)
+        for instruction in self.instructions:
+            state.append(type(instruction))
+            for value in vars(instruction).values():
+                if value.__class__ is list:
+                    state.append(len(value))
+                    for action in value:
+                        if action:
+                            state.append(type(action))
+                            state.extend(attributes(action).values())
+                else:
+                    state.append(value)
+        return state
+
+    def _pack_canonical(self, append):
+        """Add the cookie mask and the instructions."""
+        super()._pack_canonical(append)
+        pack_value(self.cookie_mask, append)
+        pack_value(self.instructions, append)
+
     def as_dict(self, include_id=True):
         """Return a representation of a Flow as a dictionary."""
         flow_dict = super().as_dict(include_id=include_id)
@@ -412,3 +470,88 @@ class Flow(FlowBase):
         flow = super().from_of_flow_stats(of_flow_stats, switch)
         flow.instructions = instructions
         return flow
+
+
+def flows_from_multipart_reply(packet):
+    """Decode the flows of a raw OFPMP_FLOW multipart reply.
+
+    It's meant to run in a worker process, so the flows are returned without
+    a switch, which has to be set once they're back in the NApp.
+
+    Args:
+        packet (bytes): Raw OFPMP_FLOW multipart reply.
+
+    Returns:
+        list: Flows of the reply with ``switch`` set to None.
+
+    """
+    reply = unpack(packet)
+    return [Flow.from_of_flow_stats(of_flow_stats, None)
+            for of_flow_stats in reply.body]
+
+
+class FlowInterner:
+    """Flows of the last flow stats replies of a switch by the raw bytes of
+    their entries, without the duration and the counters.
+
+    The entries of a new reply that only differ in their duration and
+    counters reuse the previous Flow, whose stats are updated in place, so
+    only the new or changed entries are unpacked and allocate a new Flow.
+    """
+
+    def __init__(self):
+        """Initialize an interner without flows."""
+        self._flows = {}
+        self._new_flows = {}
+
+    def __len__(self):
+        return len(self._flows)
+
+    @staticmethod
+    def _key(packet, offset, length):
+        """Return the bytes of an entry without duration and counters."""
+        return (packet[offset + 2:offset + 4] +
+                packet[offset + 12:offset + 32] +
+                packet[offset + 48:offset + length])
+
+    def flows_from_multipart_reply(self, packet, switch):
+        """Return the flows of a raw OFPMP_FLOW multipart reply.
+
+        Args:
+            packet (bytes): Raw OFPMP_FLOW multipart reply.
+            switch (kytos.core.switch.Switch): Switch of the flows.
+
+        Raises:
+            UnpackException: If an entry can't be unpacked.
+        """
+        flows = []
+        for offset, length in flow_stats_offsets(packet):
+            key = self._key(packet, offset, length)
+            flow = self._flows.get(key)
+            if flow is None:
+                of_flow_stats = OFFlowStats()
+                of_flow_stats.unpack(packet[offset:offset + length])
+                flow = Flow.from_of_flow_stats(of_flow_stats, switch)
+            else:
+                stats = flow.stats
+                stats.duration_sec, stats.duration_nsec = \
+                    _FLOW_STATS_DURATION.unpack_from(packet, offset + 4)
+                stats.packet_count, stats.byte_count = \
+                    _FLOW_STATS_COUNTERS.unpack_from(packet, offset + 32)
+            self._new_flows[key] = flow
+            flows.append(flow)
+        return flows
+
+    def retain(self, flows):
+        """Keep the flows of the last replies that are still in use.
+
+        Args:
+            flows (list): Flows kept by the switch, the flows interned
+                before that aren't among them are dropped.
+        """
+        kept = {id(flow) for flow in flows}
+        candidates = self._flows
+        candidates.update(self._new_flows)
+        self._flows = {key: flow for key, flow in candidates.items()
+                       if id(flow) in kept}
+        self._new_flows = {}
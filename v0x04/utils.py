@@ -3,10 +3,11 @@ from napps.kytos.of_core.utils import aemit_message_out, emit_message_out
 from pyof.v0x04.common.action import ControllerMaxLen
 from pyof.v0x04.common.port import PortNo, PortState
 from pyof.v0x04.controller2switch.common import ConfigFlag, MultipartType
-from pyof.v0x04.controller2switch.multipart_request import (FlowStatsRequest,
-                                                            MultipartRequest,
-                                                            PortStatsRequest)
+from pyof.v0x04.controller2switch.multipart_request import (
+    AggregateStatsRequest, FlowStatsRequest, MultipartRequest,
+    PortStatsRequest)
 from pyof.v0x04.controller2switch.set_config import SetConfig
+from pyof.v0x04.controller2switch.table_mod import Table
 from pyof.v0x04.symmetric.echo_request import EchoRequest
 from pyof.v0x04.symmetric.hello import Hello
 
@@ -23,7 +24,8 @@ def try_to_activate_interface(interface, port):
     return interface
 
 
-def update_flow_list(controller, switch):
+def update_flow_list(controller, switch, table_id=Table.OFPTT_ALL,
+                     cookie=0, cookie_mask=0):
     """Request flow stats from switches.
 
     Args:
@@ -31,6 +33,9 @@ def update_flow_list(controller, switch):
             the controller being used.
         switch(:class:`~kytos.core.switch.Switch`):
             target to send a stats request.
+        table_id(int): table of the flows, all tables by default.
+        cookie(int): cookie of the flows, compared under cookie_mask.
+        cookie_mask(int): cookie bits that must match, any cookie by default.
 
     Returns:
         int: multipart request xid
@@ -38,7 +43,9 @@ def update_flow_list(controller, switch):
     """
     multipart_request = MultipartRequest()
     multipart_request.multipart_type = MultipartType.OFPMP_FLOW
-    multipart_request.body = FlowStatsRequest()
+    multipart_request.body = FlowStatsRequest(table_id=table_id,
+                                              cookie=cookie,
+                                              cookie_mask=cookie_mask)
     emit_message_out(controller, switch.connection, multipart_request)
     return multipart_request.header.xid
 
@@ -82,7 +89,96 @@ def request_table_stats(controller, switch):
     return multipart_request.header.xid
 
 
-def send_desc_request(controller, switch):
+async def arequest_aggregate_stats(controller, switch, xid=None):
+    """Async request the aggregate stats of all flows from switches.
+
+    Args:
+        controller(:class:`~kytos.core.controller.Controller`):
+            the controller being used.
+        switch(:class:`~kytos.core.switch.Switch`):
+            target to send a stats request.
+        xid(int): xid of the request, a random one by default.
+
+    Returns:
+        int: multipart request xid
+
+    """
+    multipart_request = MultipartRequest(xid)
+    multipart_request.multipart_type = MultipartType.OFPMP_AGGREGATE
+    multipart_request.body = AggregateStatsRequest()
+    await aemit_message_out(controller, switch.connection, multipart_request)
+    return multipart_request.header.xid
+
+
+async def aupdate_flow_list(controller, switch, table_id=Table.OFPTT_ALL,
+                            cookie=0, cookie_mask=0, xid=None):
+    """Async request flow stats from switches.
+
+    Args:
+        controller(:class:`~kytos.core.controller.Controller`):
+            the controller being used.
+        switch(:class:`~kytos.core.switch.Switch`):
+            target to send a stats request.
+        table_id(int): table of the flows, all tables by default.
+        cookie(int): cookie of the flows, compared under cookie_mask.
+        cookie_mask(int): cookie bits that must match, any cookie by default.
+        xid(int): xid of the request, a random one by default.
+
+    Returns:
+        int: multipart request xid
+
+    """
+    multipart_request = MultipartRequest(xid)
+    multipart_request.multipart_type = MultipartType.OFPMP_FLOW
+    multipart_request.body = FlowStatsRequest(table_id=table_id,
+                                              cookie=cookie,
+                                              cookie_mask=cookie_mask)
+    await aemit_message_out(controller, switch.connection, multipart_request)
+    return multipart_request.header.xid
+
+
+async def arequest_port_stats(controller, switch, xid=None):
+    """Async request port stats from switches.
+
+    Args:
+        controller(:class:`~kytos.core.controller.Controller`):
+            the controller being used.
+        switch(:class:`~kytos.core.switch.Switch`):
+            target to send a stats request.
+        xid(int): xid of the request, a random one by default.
+
+    Returns:
+        int: multipart request xid
+
+    """
+    multipart_request = MultipartRequest(xid)
+    multipart_request.multipart_type = MultipartType.OFPMP_PORT_STATS
+    multipart_request.body = PortStatsRequest()
+    await aemit_message_out(controller, switch.connection, multipart_request)
+    return multipart_request.header.xid
+
+
+async def arequest_table_stats(controller, switch, xid=None):
+    """Async request table stats from switches.
+
+    Args:
+        controller(:class:`~kytos.core.controller.Controller`):
+            the controller being used.
+        switch(:class:`~kytos.core.switch.Switch`):
+            target to send a stats request.
+        xid(int): xid of the request, a random one by default.
+
+    Returns:
+        int: multipart request xid
+
+    """
+    multipart_request = MultipartRequest(xid)
+    multipart_request.multipart_type = MultipartType.OFPMP_TABLE
+    await aemit_message_out(controller, switch.connection, multipart_request)
+    return multipart_request.header.xid
+
+
+def send_desc_request(controller, switch, xid=None):
     """Request vendor-specific switch description.
 
     Args:
@@ -90,20 +186,21 @@ def send_desc_request(controller, switch):
             the controller being used.
         switch(:class:`~kytos.core.switch.Switch`):
             target to send a stats request.
+        xid(int): xid of the request, a random one by default.
     """
-    multipart_request = MultipartRequest()
+    multipart_request = MultipartRequest(xid)
     multipart_request.multipart_type = MultipartType.OFPMP_DESC
     emit_message_out(controller, switch.connection, multipart_request)
 
 
-def send_port_request(controller, connection):
+def send_port_request(controller, connection, xid=None):
     """Send a Port Description Request after the Features Reply."""
-    port_request = MultipartRequest()
+    port_request = MultipartRequest(xid)
     port_request.multipart_type = MultipartType.OFPMP_PORT_DESC
     emit_message_out(controller, connection, port_request)
 
 
-def handle_features_reply(controller, event):
+def handle_features_reply(controller, event, request_port_desc=True):
     """Handle OF v0x04 features_reply message events.
 
     This is the end of the Handshake workflow of the OpenFlow Protocol.
@@ -111,13 +208,16 @@ def handle_features_reply(controller, event):
     Parameters:
         controller (Controller): Controller being used.
         event (KytosEvent): Event with features reply message.
+        request_port_desc (bool): Whether to send the port description
+            request, otherwise it's left to the caller.
 
     """
     connection = event.source
     features_reply = event.content['message']
     dpid = features_reply.datapath_id.value
     switch = controller.get_switch_or_create(dpid=dpid, connection=connection)
-    send_port_request(controller, connection)
+    if request_port_desc:
+        send_port_request(controller, connection)
 
     switch.update_features(features_reply)
 